@@ -2,29 +2,36 @@ from interfaces.agents import Agent
 from algorithms.astar import AStarPlanner
 
 class AStarAgent(Agent):
-    def __init__(self, planner=None):
+    def __init__(self, planner=None, ordering=None):
         super().__init__()
-        self.planner = planner or AStarPlanner()
+        self.planner = planner or AStarPlanner(reuse_tree=True)
+        self.ordering = ordering
 
-    def run(self, env, start_node, goal_nodes: list):
+    def run(self, env, start_node, goal_nodes: list, stats=None):
         """
         Repeatedly A* from the same start_node to each store
         in ascending manhattan order, accumulating totals, until
         we hit the store with the goal item.
+        With an ordering (a StoreOrdering), the stores are instead
+        visited along its route, each leg planned from the previous store.
         Returns: (final_path, total_expanded, total_length, total_cost)
         """
-        # sort stores by straight‐line (manhattan) distance from the start
-        remaining = sorted(
-            goal_nodes,
-            key=lambda s: abs(start_node.row - s.row) + abs(start_node.column - s.column)
-        )
+        if self.ordering is not None:
+            remaining = self.ordering.order(env, start_node, goal_nodes)
+        else:
+            # sort stores by straight‐line (manhattan) distance from the start
+            remaining = sorted(
+                goal_nodes,
+                key=lambda s: abs(start_node.row - s.row) + abs(start_node.column - s.column)
+            )
+        origin = start_node
 
         total_expanded = 0
         total_length   = 0
         total_cost     = 0.0
 
         for target in remaining:
-            path, expanded = self.planner.plan(env, start_node, target)
+            path, expanded = self.planner.plan(env, origin, target, stats=stats)
             total_expanded += expanded
 
             if not path:
@@ -44,6 +51,8 @@ class AStarAgent(Agent):
 
             total_length += sub_length
             total_cost   += sub_cost
+            if self.ordering is not None:
+                origin = target
 
             if getattr(target, "has_goal_item", False):
                 return path, total_expanded, total_length, total_cost
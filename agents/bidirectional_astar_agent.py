@@ -0,0 +1,12 @@
+from agents.astar_agent import AStarAgent
+from algorithms.bidirectional_astar import BidirectionalAStarPlanner
+
+class BidirectionalAStarAgent(AStarAgent):
+    """
+    AStarAgent that answers each start -> store query with bidirectional A*,
+    using landmark (ALT) bounds the planner builds on its first query when
+    the mall has none.
+    """
+    def __init__(self, planner=None, ordering=None):
+        super().__init__(planner=planner or BidirectionalAStarPlanner(build_landmarks=True),
+                         ordering=ordering)
@@ -3,20 +3,26 @@ from algorithms.dstarlite import DStarLitePlanner
 from utils.path       import compute_path_cost
 
 class DStarLiteAgent(Agent):
-    def __init__(self, planner=None):
+    def __init__(self, planner=None, ordering=None):
         super().__init__()
-        self.planner = planner or DStarLitePlanner()
+        self.planner = planner or DStarLitePlanner(reuse_tree=True)
+        self.ordering = ordering
 
-    def run(self, env, start_node, goal_nodes: list):
+    def run(self, env, start_node, goal_nodes: list, stats=None):
 
         assert goal_nodes, "Need at least one goal"
 
-        # sort all the stores once
-        remaining = sorted(
-            goal_nodes,
-            key=lambda s: abs(start_node.row - s.row)
-                        + abs(start_node.column - s.column)
-        )
+        if self.ordering is not None:
+            # visit the stores along the ordering's route, leg by leg
+            remaining = self.ordering.order(env, start_node, goal_nodes)
+        else:
+            # sort all the stores once
+            remaining = sorted(
+                goal_nodes,
+                key=lambda s: abs(start_node.row - s.row)
+                            + abs(start_node.column - s.column)
+            )
+        origin = start_node
 
         total_expanded = 0
         total_length   = 0
@@ -25,7 +31,7 @@ class DStarLiteAgent(Agent):
 
         # loop until we find the store with the item
         for target in remaining:
-            path, expanded = self.planner.plan(env, start_node, target)
+            path, expanded = self.planner.plan(env, origin, target, stats=stats)
             total_expanded += expanded
 
             if not path:
@@ -37,6 +43,8 @@ class DStarLiteAgent(Agent):
 
             total_length += sub_length
             total_cost   += sub_cost
+            if self.ordering is not None:
+                origin = target
 
             if getattr(target, "has_goal_item", False):
                 final_path = path
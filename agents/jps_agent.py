@@ -0,0 +1,7 @@
+from agents.astar_agent import AStarAgent
+from algorithms.jps import JumpPointPlanner
+
+class JumpPointAgent(AStarAgent):
+    """AStarAgent that answers each start -> store query with jump point search."""
+    def __init__(self, planner=None, ordering=None):
+        super().__init__(planner=planner or JumpPointPlanner(), ordering=ordering)
@@ -2,20 +2,26 @@ from interfaces.agents import Agent
 from algorithms.mgastar import MultiGoalAStarPlanner
 
 class MultiGoalAStarAgent(Agent):
-    def __init__(self, planner=None):
+    def __init__(self, planner=None, ordering=None):
         super().__init__()
         self.planner = planner or MultiGoalAStarPlanner()
+        self.ordering = ordering
 
-    def run(self, env, start_node, goal_nodes: list):
+    def run(self, env, start_node, goal_nodes: list, stats=None):
         """
         Run one multi-goal A* from start_node to ALL goal_nodes,
         then accumulate length & cost of each sub-path in ascending
         order until we hit the store with the goal item.
+        With an ordering (a StoreOrdering), the stores are instead
+        visited along its route, each leg a search from the previous store.
         Returns: (path_to_goal, total_expanded, total_length, total_cost)
         """
+        if self.ordering is not None:
+            return self.run_route(env, start_node, goal_nodes, stats)
+
         # single planning pass
         sorted_goals, total_expanded = self.planner.plan(
-            env, start_node, goal_nodes
+            env, start_node, goal_nodes, stats=stats
         )
 
         total_length = 0
@@ -33,4 +39,27 @@ class MultiGoalAStarAgent(Agent):
                 final_path = path
                 break
 
-        return final_path, total_expanded, total_length, total_cost
\ No newline at end of file
+        return final_path, total_expanded, total_length, total_cost
+
+    def run_route(self, env, start_node, goal_nodes, stats=None):
+        total_expanded = 0
+        total_length   = 0
+        total_cost     = 0.0
+        origin         = start_node
+
+        for target in self.ordering.order(env, start_node, goal_nodes):
+            results, expanded = self.planner.plan(env, origin, [target], stats=stats,
+                                                  exhaustive=False)
+            total_expanded += expanded
+            if not results:
+                continue
+
+            path = results[0]["path"]
+            total_length += len(path)
+            total_cost   += results[0]["cost"]
+            origin = target
+
+            if getattr(target, "has_goal_item", False):
+                return path, total_expanded, total_length, total_cost
+
+        return [], total_expanded, total_length, total_cost
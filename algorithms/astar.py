@@ -1,45 +1,141 @@
 import heapq
+from functools import partial
+from utils.bucket_queue import BucketQueue, check_queue
 
 class AStarPlanner:
-    def __init__(self):
-        pass
+    """
+    A* on the compiled mall.
 
-    def plan(self, env, start_node, goal_node):
-        open_set = []  
-        heapq.heappush(open_set, (0, start_node))
+    With reuse_tree=True the planner keeps its search (g-values, parents
+    and closed set) between plan() calls that share the same start node
+    on an unedited mall. Closed nodes already carry exact distances from
+    the start, so the next target is answered by re-keying the frontier
+    with the new heuristic and resuming; a target that is already closed
+    costs no expansions. An agent trying k stores from one start then pays
+    for roughly one search instead of k.
 
-        came_from = {}
-        g_score = {start_node: 0}
-        f_score = {start_node: self.heuristic(start_node, goal_node)}
+    queue="buckets" keeps the open set in a BucketQueue instead of a heap:
+    edge weights are scaled to integers (the mall's 1.0 / 1.5 / 2.5 links
+    become 2 / 3 / 5) so f-values index buckets directly. Path costs are
+    the same; ties between equal f-values are broken differently, so
+    expansion counts can differ slightly. Falls back to the heap when the
+    weights have no small integer scale.
+    """
+    def __init__(self, reuse_tree: bool = False, queue: str = "heap"):
+        check_queue(queue)
+        self.reuse_tree = reuse_tree
+        self.queue = queue
+        self.tree = None    # (graph, version, start, came_from, g_score, closed)
+
+    def plan(self, env, start_node, goal_node, stats=None):
+        """
+        Returns (path, expanded), expanded being the number of heap pops.
+        Pass a SearchStats as stats to also get comparable search counters.
+        """
+        graph = env.compile()
+        offsets, targets, weights, rows, columns = graph.adjacency()
+
+        start = graph.id_of(start_node)
+        goal = graph.id_of(goal_node)
+        goal_row, goal_column = goal_node.row, goal_node.column
+
+        # floor-aware ALT bound if landmarks were built for this mall
+        landmarks = getattr(env, "landmarks", None)
+        alt = landmarks.heuristic_to(goal) if landmarks is not None and landmarks.graph is graph else None
+
+        # bucket queue: g and h in integer units of 1 / scale
+        scale = None
+        if self.queue == "buckets":
+            scale, scaled = graph.scaled_weights()
+            if scale is not None:
+                weights = scaled
+                if alt is not None:
+                    exact = alt
+                    def alt(node):
+                        bound = exact(node)
+                        return int(bound * scale) if bound != float('inf') else bound
+        unit = scale or 1
+
+        tree = self.tree
+        if (self.reuse_tree and tree is not None and tree[0] is graph
+                and tree[1] == graph.version and tree[2] == start):
+            _, _, _, came_from, g_score, visited_nodes = tree
+            if goal in visited_nodes:
+                if stats is not None:
+                    stats.record(0, 0, 0, 0, 0, (came_from, g_score, visited_nodes))
+                return graph.to_nodes(self.reconstruct_path(came_from, goal)), 0
+
+            # resume: re-key the frontier for the new target
+            entries = []
+            for node, g in g_score.items():
+                if node not in visited_nodes:
+                    h = unit * (abs(rows[node] - goal_row) + abs(columns[node] - goal_column))
+                    if alt is not None:
+                        h = max(h, alt(node))
+                    entries.append((g + h, node))
+        else:
+            entries = [(0, start)]
+
+            came_from = {}
+            g_score = {start: 0}
+
+            visited_nodes = set()
+            if self.reuse_tree:
+                self.tree = (graph, graph.version, start, came_from, g_score, visited_nodes)
+
+        if scale is not None:
+            open_set = BucketQueue(entries)
+            push, pop = open_set.push, open_set.pop
+        else:
+            open_set = entries
+            heapq.heapify(open_set)
+            push, pop = partial(heapq.heappush, open_set), partial(heapq.heappop, open_set)
 
-        visited_nodes = set()
         expanded = 0
+        found = False
+        track = stats is not None
+        initial, closed_before, peak_open = len(open_set), len(visited_nodes), len(open_set)
 
         while open_set:
-            _, current = heapq.heappop(open_set)
+            if track and len(open_set) > peak_open:
+                peak_open = len(open_set)
+            _, current = pop()
             expanded += 1
 
-            if current == goal_node:
-                return self.reconstruct_path(came_from, current), expanded
+            if current == goal:
+                found = True
+                break
 
             visited_nodes.add(current)
+            current_g = g_score[current]
 
-            for neighbor_link in current.get_neighbors():
-                neighbor = neighbor_link.node
-                weight = neighbor_link.weight
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
 
                 if neighbor in visited_nodes:
                     continue
 
-                tentative_g = g_score[current] + weight
+                tentative_g = current_g + weights[edge]
 
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                if tentative_g < g_score.get(neighbor, float('inf')):
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + self.heuristic(neighbor, goal_node)
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                    h = unit * (abs(rows[neighbor] - goal_row) + abs(columns[neighbor] - goal_column))
+                    if alt is not None:
+                        h = max(h, alt(neighbor))
+                    push((tentative_g + h, neighbor))
+
+        if track:
+            # every push is either still queued or was popped; a pop is
+            # stale when its node had already been closed
+            pushes = expanded + len(open_set)
+            distinct = len(visited_nodes) - closed_before + found
+            stats.record(pushes, expanded, expanded - distinct, pushes - initial, peak_open,
+                         (came_from, g_score, visited_nodes))
 
-        return [], expanded 
+        if found:
+            return graph.to_nodes(self.reconstruct_path(came_from, goal)), expanded
+        return [], expanded
 
     def heuristic(self, node_a, node_b):
         return abs(node_a.row - node_b.row) + abs(node_a.column - node_b.column)
@@ -49,4 +145,4 @@ class AStarPlanner:
         while current in came_from:
             current = came_from[current]
             path.append(current)
-        return path[::-1]
\ No newline at end of file
+        return path[::-1]
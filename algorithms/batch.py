@@ -0,0 +1,105 @@
+from algorithms.dijkstra import shortest_distances
+
+def group_queries(pairs):
+    """
+    Splits (source, target) id pairs into searches: ("forward", s, targets)
+    answers s against targets with one search from s, ("reverse", t, sources)
+    answers sources against t with one backwards search from t.
+
+    Every pair has to be covered by the search of its source or of its
+    target, and each search costs about the same, so this is a vertex
+    cover of the bipartite source/target graph. It is built greedily:
+    take the source or target with the most pairs still uncovered (ties
+    go to forward searches) until none are left.
+    """
+    by_source, by_target = {}, {}
+    for s, t in pairs:
+        by_source.setdefault(s, set()).add(t)
+        by_target.setdefault(t, set()).add(s)
+
+    searches = []
+    while by_source:
+        source = max(by_source, key=lambda s: len(by_source[s]))
+        target = max(by_target, key=lambda t: len(by_target[t]))
+        if len(by_source[source]) >= len(by_target[target]):
+            targets = by_source.pop(source)
+            for t in targets:
+                by_target[t].discard(source)
+                if not by_target[t]:
+                    del by_target[t]
+            searches.append(("forward", source, targets))
+        else:
+            sources = by_target.pop(target)
+            for s in sources:
+                by_source[s].discard(target)
+                if not by_source[s]:
+                    del by_source[s]
+            searches.append(("reverse", target, sources))
+    return searches
+
+
+def shortest_paths(graph, pairs, paths: bool = True, queue: str = "heap") -> dict:
+    """
+    Exact distances (and id paths, None with paths=False) for many
+    (source, target) node id pairs, grouped with group_queries so pairs
+    sharing a source or target share one Dijkstra, each stopped as soon
+    as the nodes it has to answer are settled. Returns
+    {(source, target): (cost, path)} for the reachable pairs.
+    """
+    answers = {}
+    for direction, root, others in group_queries(pairs):
+        reverse = direction == "reverse"
+        distance, parent = shortest_distances(graph, root, reverse=reverse, with_parents=True,
+                                              queue=queue, until=others)
+        for other in others:
+            cost = distance[other]
+            if cost == float('inf'):
+                continue
+            path = None
+            if paths:
+                path = [other]
+                while path[-1] != root:
+                    path.append(parent[path[-1]])
+                if not reverse:
+                    path.reverse()
+            answers[(other, root) if reverse else (root, other)] = (cost, path)
+    return answers
+
+
+def plan_batch(graph, queries, paths: bool = True, queue: str = "heap"):
+    """
+    Answers many (start_node, goal_nodes) queries on one compiled mall.
+
+    The (start, goal) pairs of all queries go through shortest_paths, so a
+    start shared by many shoppers costs one forward Dijkstra and a store
+    on many shopping lists costs one reverse Dijkstra.
+
+    Returns one list per query in the MultiGoalAStarPlanner format: a dict
+    {"goal", "path", "cost"} per reachable goal, sorted by cost. With
+    paths=False, "path" is None and no Node lists are built.
+    """
+    requests = []
+    for start_node, goal_nodes in queries:
+        goal_by_id = {}
+        for goal in goal_nodes:
+            goal_by_id.setdefault(graph.id_of(goal), goal)
+        requests.append((graph.id_of(start_node), goal_by_id))
+
+    pairs = {(start, goal) for start, goal_by_id in requests for goal in goal_by_id}
+    answers = shortest_paths(graph, pairs, paths=paths, queue=queue)
+
+    results = []
+    for start, goal_by_id in requests:
+        reached = []
+        for goal, goal_node in goal_by_id.items():
+            answer = answers.get((start, goal))
+            if answer is not None:
+                cost, path = answer
+                reached.append({
+                    "goal": goal_node,
+                    "path": graph.to_nodes(path) if path is not None else None,
+                    "cost": cost
+                })
+        reached.sort(key=lambda x: x["cost"])
+        results.append(reached)
+    return results
@@ -0,0 +1,173 @@
+import heapq
+from algorithms.landmarks import LandmarkTable
+
+class BidirectionalAStarPlanner:
+    """
+    A* run from both ends at once: forward from the start over the CSR
+    edges and backward from the goal over the reverse CSR, so one-way stair
+    links are walked against their direction by the backward search.
+
+    Both searches use the average potential
+
+        p(v) = (h_goal(v) - h_start(v)) / 2
+
+    (forward keys g + p, backward keys g - p), where h_goal bounds the
+    distance from v to the goal and h_start the distance from the start to
+    v (Manhattan, or ALT if landmarks were built for the mall). With
+    consistent bounds both searches see non-negative reduced edge costs,
+    and the best meeting cost mu found so far is optimal as soon as
+
+        top forward key + top backward key >= mu.
+
+    Each search expands the side with the smaller open set, so the two
+    frontiers stay about the same size and meet in the middle of the mall.
+
+    With Manhattan bounds alone this is no faster than A*: p ignores floors,
+    so on cross-floor queries both frontiers flood their floor looking for
+    a portal. With build_landmarks=True the planner builds and caches its
+    own LandmarkTable whenever env has none for the current graph (and
+    rebuilds it after any edit), without touching env. Even then every
+    node costs two ALT evaluations, so on large floors it can take longer
+    than A* while expanding fewer nodes.
+    """
+
+    def __init__(self, build_landmarks: bool = False):
+        self.build_landmarks = build_landmarks
+        self.landmarks = None       # own ALT tables, if build_landmarks
+        self.version = None         # graph.version they were built on
+
+    def landmarks_for(self, env, graph):
+        """env's landmarks for graph, else the planner's own (if enabled), else None."""
+        landmarks = getattr(env, "landmarks", None)
+        if landmarks is not None and landmarks.graph is graph:
+            return landmarks
+        if not self.build_landmarks:
+            return None
+        if self.landmarks is None or self.landmarks.graph is not graph or self.version != graph.version:
+            self.landmarks = LandmarkTable.build(graph)
+            self.version = graph.version
+        return self.landmarks
+
+    def plan(self, env, start_node, goal_node, stats=None):
+        """
+        Returns (path, expanded), expanded being the number of heap pops of
+        both searches. Pass a SearchStats as stats to also get comparable
+        search counters.
+        """
+        graph = env.compile()
+        offsets, targets, weights, rows, columns = graph.adjacency()
+        rev_offsets, rev_sources, rev_weights = graph.reverse_adjacency()
+
+        start = graph.id_of(start_node)
+        goal = graph.id_of(goal_node)
+        if start == goal:
+            return graph.to_nodes([start]), 0
+
+        start_row, start_column = rows[start], columns[start]
+        goal_row, goal_column = rows[goal], columns[goal]
+
+        # floor-aware ALT bounds if landmarks were built for this mall
+        landmarks = self.landmarks_for(env, graph)
+        if landmarks is not None:
+            alt_to, alt_from = landmarks.heuristic_to(goal), landmarks.heuristic_from(start)
+        else:
+            alt_to = alt_from = None
+
+        potentials = {}
+
+        def potential(v):
+            p = potentials.get(v)
+            if p is None:
+                to_goal = abs(rows[v] - goal_row) + abs(columns[v] - goal_column)
+                from_start = abs(rows[v] - start_row) + abs(columns[v] - start_column)
+                if alt_to is not None:
+                    to_goal = max(to_goal, alt_to(v))
+                    from_start = max(from_start, alt_from(v))
+                p = potentials[v] = (to_goal - from_start) / 2
+            return p
+
+        # forward: g and parent towards the start; backward: g and the next
+        # node towards the goal
+        g_forward, g_backward = {start: 0}, {goal: 0}
+        came_from, goes_to = {}, {}
+        closed_forward, closed_backward = set(), set()
+        open_forward = [(potential(start), start)]
+        open_backward = [(-potential(goal), goal)]
+
+        best, meeting = float('inf'), None
+        expanded = 0
+        track = stats is not None
+        peak_open = 2
+
+        while open_forward and open_backward:
+            if open_forward[0][0] + open_backward[0][0] >= best:
+                break
+            if track and len(open_forward) + len(open_backward) > peak_open:
+                peak_open = len(open_forward) + len(open_backward)
+
+            if len(open_forward) <= len(open_backward):
+                _, current = heapq.heappop(open_forward)
+                expanded += 1
+                if current in closed_forward:
+                    continue
+                closed_forward.add(current)
+                current_g = g_forward[current]
+
+                for edge in range(offsets[current], offsets[current + 1]):
+                    neighbor = targets[edge]
+                    if neighbor in closed_forward:
+                        continue
+                    tentative_g = current_g + weights[edge]
+                    if tentative_g < g_forward.get(neighbor, float('inf')):
+                        came_from[neighbor] = current
+                        g_forward[neighbor] = tentative_g
+                        heapq.heappush(open_forward, (tentative_g + potential(neighbor), neighbor))
+                        other = g_backward.get(neighbor)
+                        if other is not None and tentative_g + other < best:
+                            best, meeting = tentative_g + other, neighbor
+            else:
+                _, current = heapq.heappop(open_backward)
+                expanded += 1
+                if current in closed_backward:
+                    continue
+                closed_backward.add(current)
+                current_g = g_backward[current]
+
+                for edge in range(rev_offsets[current], rev_offsets[current + 1]):
+                    neighbor = rev_sources[edge]
+                    if neighbor in closed_backward:
+                        continue
+                    tentative_g = current_g + rev_weights[edge]
+                    if tentative_g < g_backward.get(neighbor, float('inf')):
+                        goes_to[neighbor] = current
+                        g_backward[neighbor] = tentative_g
+                        heapq.heappush(open_backward, (tentative_g - potential(neighbor), neighbor))
+                        other = g_forward.get(neighbor)
+                        if other is not None and tentative_g + other < best:
+                            best, meeting = tentative_g + other, neighbor
+
+        if track:
+            # every push is either still queued or was popped; a pop is
+            # stale when its node had already been closed on that side
+            pushes = expanded + len(open_forward) + len(open_backward)
+            distinct = len(closed_forward) + len(closed_backward)
+            stats.record(pushes, expanded, expanded - distinct, pushes - 2, peak_open,
+                         (g_forward, g_backward, came_from, goes_to,
+                          closed_forward, closed_backward, potentials))
+
+        if meeting is None:
+            return [], expanded
+        return graph.to_nodes(self.reconstruct_path(came_from, goes_to, meeting)), expanded
+
+    def reconstruct_path(self, came_from, goes_to, meeting):
+        path = [meeting]
+        current = meeting
+        while current in came_from:
+            current = came_from[current]
+            path.append(current)
+        path.reverse()
+        current = meeting
+        while current in goes_to:
+            current = goes_to[current]
+            path.append(current)
+        return path
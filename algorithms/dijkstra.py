@@ -0,0 +1,129 @@
+import heapq
+from utils.bucket_queue import BucketQueue, check_queue
+
+def shortest_distances(graph, sources, reverse: bool = False, with_parents: bool = False,
+                       queue: str = "heap", until=None, stats=None):
+    """
+    Single/multi-source Dijkstra over a compiled mall.
+
+    sources:  node id or iterable of node ids, all at distance 0
+    reverse:  follow edges backwards, giving distances *to* the sources
+              (needed wherever one-way stair links matter)
+
+    Returns a list of distances indexed by node id (inf if unreachable),
+    and with with_parents=True also the list of tree parents (-1 for
+    roots/unreached). In a reverse search the parent of v is the next
+    node on v's shortest path towards the sources.
+
+    queue="buckets" runs Dial's algorithm on the integer-scaled weights
+    (see CompiledMall.scaled_weights); the distances are the same.
+
+    until:    optional node ids; the search stops as soon as all of them
+              are settled, so only their distances (and the parents along
+              their paths) are guaranteed exact
+    stats:    optional SearchStats the search's counters are added to
+    """
+    check_queue(queue)
+    if reverse:
+        offsets, targets, weights = graph.reverse_adjacency()
+    else:
+        offsets, targets, weights, _, _ = graph.adjacency()
+
+    scale = None
+    if queue == "buckets":
+        scale, scaled = graph.scaled_weights(reverse=reverse)
+        if scale is not None:
+            weights = scaled
+
+    if isinstance(sources, int):
+        sources = (sources,)
+
+    inf = float('inf')
+    distance = [inf] * graph.num_nodes
+    parent = [-1] * graph.num_nodes if with_parents else None
+
+    remaining = set(until) if until is not None else None
+    if scale is not None:
+        return _bucket_distances(offsets, targets, weights, sources, scale, distance, parent,
+                                 remaining, stats)
+
+    heap = []
+    for source in sources:
+        distance[source] = 0.0
+        heap.append((0.0, source))
+    heapq.heapify(heap)
+    initial = len(heap)
+    track = stats is not None
+    pops = settled = 0
+    peak_open = initial
+
+    while heap:
+        if track and len(heap) > peak_open:
+            peak_open = len(heap)
+        d, u = heapq.heappop(heap)
+        pops += 1
+        if d > distance[u]:
+            continue
+        settled += 1
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for edge in range(offsets[u], offsets[u + 1]):
+            v = targets[edge]
+            nd = d + weights[edge]
+            if nd < distance[v]:
+                distance[v] = nd
+                if parent is not None:
+                    parent[v] = u
+                heapq.heappush(heap, (nd, v))
+
+    if track:
+        # every push is either still queued or was popped
+        pushes = pops + len(heap)
+        stats.record(pushes, pops, pops - settled, pushes - initial, peak_open)
+    if with_parents:
+        return distance, parent
+    return distance
+
+
+def _bucket_distances(offsets, targets, weights, sources, scale, distance, parent, remaining,
+                      stats=None):
+    """Dial's algorithm for shortest_distances; weights are integers in units of 1 / scale."""
+    queue = BucketQueue()
+    for source in sources:
+        distance[source] = 0
+        queue.push((0, source))
+    initial = len(queue)
+    track = stats is not None
+    pops = settled = 0
+    peak_open = initial
+
+    while queue:
+        if track and len(queue) > peak_open:
+            peak_open = len(queue)
+        d, u = queue.pop()
+        pops += 1
+        if d > distance[u]:
+            continue
+        settled += 1
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for edge in range(offsets[u], offsets[u + 1]):
+            v = targets[edge]
+            nd = d + weights[edge]
+            if nd < distance[v]:
+                distance[v] = nd
+                if parent is not None:
+                    parent[v] = u
+                queue.push((nd, v))
+
+    if track:
+        pushes = pops + len(queue)
+        stats.record(pushes, pops, pops - settled, pushes - initial, peak_open)
+    distance = [d / scale for d in distance]
+    if parent is not None:
+        return distance, parent
+    return distance
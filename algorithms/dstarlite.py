@@ -1,109 +1,300 @@
-import heapq
-from collections import defaultdict
+from utils.priority_queue import IndexedPriorityQueue
 
 class DStarLitePlanner:
-    def __init__(self):
+    """
+    D* Lite searching backwards from the goal, so the search tree stays
+    valid while the agent walks and the mall changes underneath it.
+
+    One-shot use:   path, expanded = planner.plan(env, start, goal)
+    Session use:    planner.plan(...) once, then any mix of
+                    planner.move_start(node)
+                    planner.update_edges(mall.place_obstacle(...) or [])
+                    path, expanded = planner.replan()
+    where replan only repairs the part of the search the changes touch.
+
+    By default a search stops as soon as the start is locally consistent
+    and no queued key is smaller than its key; the queue is kept, so a
+    later replan/move resumes from there. Pass full_tree=True to keep
+    expanding until U is empty and get the cost-to-goal of every node
+    (cost_to_goal) as a reusable distance field.
+
+    With reuse_tree=True, plan() calls that share a start node reuse one
+    search rooted at that start instead: edges are followed forwards from
+    the root, each new target is handled like a moved query point (km),
+    and only the part of the tree the new target needs is expanded.
+    """
+    def __init__(self, full_tree: bool = False, reuse_tree: bool = False):
+        self.full_tree = full_tree
+        self.reuse_tree = reuse_tree
         self.km = 0                # heuristic
         self.rhs = {}              # one-step lookahead values
         self.g   = {}              # current best path values
-        self.U   = []              # priority queue of (key, node)
-        self.start = None
-        self.goal  = None
+        self.U   = IndexedPriorityQueue()  # addressable queue of (key, node id)
+        self.env = None            # environment of the current search
+        self.graph = None          # compiled view of the environment
+        self.version = None        # graph.version the search was built on
+        self.landmarks = None      # optional ALT tables of the environment
+        self.start = None          # query point (where paths are read from)
+        self.goal  = None          # root of the search tree
+        self.last  = None          # start at the time km was last updated
+        self.rooted_at_source = False
+        self.restart = False       # replan() must search from scratch
         self.expanded = 0          # *** correct expansion count ***
+        self.pushes = 0            # U.push calls, re-keys included
+        self.stale_pops = 0        # pops whose key had changed (re-queued)
+        self.updates = 0           # rhs recomputations
+        self.reported = (0, 0, 0, 0)   # counters() when the last search ended
 
-    def initialize(self, start_node, goal_node):
-        # reset everything for a fresh run
-        self.start = start_node
-        self.goal  = goal_node
+    def initialize(self, start, goal, rooted_at_source: bool = False):
+        # reset everything for a fresh run (start/goal are node ids)
+        self.start = start
+        self.goal  = goal
+        self.last  = start
         self.km    = 0
         self.expanded = 0
+        self.pushes = self.stale_pops = self.updates = 0
+        self.reported = (0, 0, 0, 0)
+        self.rooted_at_source = rooted_at_source
+        self.restart = False
+        self.version = self.graph.version
 
         self.rhs.clear()
         self.g.clear()
         self.U.clear()
 
         # goal’s one-step cost is 0; all others inf
-        self.rhs[goal_node] = 0
-        self.g[goal_node]   = float('inf')
-        self.g[start_node]  = float('inf')
-        self.rhs[start_node]= float('inf')
+        self.g[start]  = float('inf')
+        self.rhs[start]= float('inf')
+        self.rhs[goal] = 0
+        self.g[goal]   = float('inf')
 
         # seed the queue with the goal
-        heapq.heappush(self.U, (self.calculate_key(goal_node), goal_node))
+        self.U.push(goal, self.calculate_key(goal))
+        self.pushes += 1
 
     def calculate_key(self, node):
         g_rhs = min(self.g.get(node, float('inf')),
                     self.rhs.get(node, float('inf')))
-        return (g_rhs + self.heuristic(self.start, node) + self.km,
+        return (g_rhs + self.query_heuristic(self.start, node) + self.km,
                 g_rhs)
 
     def heuristic(self, a, b):
-        return abs(a.row - b.row) + abs(a.column - b.column)
+        _, _, _, rows, columns = self.graph.adjacency()
+        h = abs(rows[a] - rows[b]) + abs(columns[a] - columns[b])
+        if self.landmarks is not None:
+            h = max(h, self.landmarks.lower_bound(a, b))
+        return h
+
+    def query_heuristic(self, query, node):
+        # lower bound on the distance between the query point and node,
+        # in the direction paths are walked for the current orientation
+        if self.rooted_at_source:
+            return self.heuristic(node, query)
+        return self.heuristic(query, node)
+
+    def successors(self, u):
+        offsets, targets, weights, _, _ = self.graph.adjacency()
+        return zip(targets[offsets[u]:offsets[u + 1]], weights[offsets[u]:offsets[u + 1]])
+
+    def predecessors(self, u):
+        rev_offsets, rev_sources, _ = self.graph.reverse_adjacency()
+        return rev_sources[rev_offsets[u]:rev_offsets[u + 1]]
+
+    def lookahead(self, u):
+        """(neighbor, weight) pairs rhs(u) is computed from."""
+        if self.rooted_at_source:
+            rev_offsets, rev_sources, rev_weights = self.graph.reverse_adjacency()
+            return zip(rev_sources[rev_offsets[u]:rev_offsets[u + 1]],
+                       rev_weights[rev_offsets[u]:rev_offsets[u + 1]])
+        return self.successors(u)
+
+    def dependents(self, u):
+        """Nodes whose rhs depends on g(u)."""
+        if self.rooted_at_source:
+            offsets, targets, _, _, _ = self.graph.adjacency()
+            return targets[offsets[u]:offsets[u + 1]]
+        return self.predecessors(u)
 
     def update_vertex(self, u):
         if u != self.goal:
+            self.updates += 1
             # one-step lookahead: min over neighbors
             self.rhs[u] = min(
-                link.weight + self.g.get(link.node, float('inf'))
-                for link in u.get_neighbors()
+                (weight + self.g.get(nbr, float('inf'))
+                 for nbr, weight in self.lookahead(u)),
+                default=float('inf')
             )
-        # remove u from U if it’s in there
-        self.U = [(k,n) for k,n in self.U if n is not u]
-        heapq.heapify(self.U)
-
-        # re-insert if g ≠ rhs
+        # (re-)queue u if g ≠ rhs, otherwise drop it from U
         if self.g.get(u, float('inf')) != self.rhs.get(u, float('inf')):
-            heapq.heappush(self.U, (self.calculate_key(u), u))
+            self.U.push(u, self.calculate_key(u))
+            self.pushes += 1
+        else:
+            self.U.remove(u)
 
-    def compute_shortest_path(self):
-        # keep going until queue is empty (static run)
-        while self.U:
-            k_old, u = heapq.heappop(self.U)
+    def compute_shortest_path(self, track: bool = False):
+        """Runs the search; with track=True returns the largest size U reached."""
+        peak_open = len(self.U)
+        # stop once the start is settled, unless the whole tree was asked for
+        while self.U and (
+            self.full_tree
+            or self.U.top_key() < self.calculate_key(self.start)
+            or self.rhs.get(self.start, float('inf')) != self.g.get(self.start, float('inf'))
+        ):
+            if track and len(self.U) > peak_open:
+                peak_open = len(self.U)
+            k_old, u = self.U.pop()
             # ** count this as one expansion **
             self.expanded += 1
 
             k_new = self.calculate_key(u)
             if k_old < k_new:
                 # key changed, push back
-                heapq.heappush(self.U, (k_new, u))
+                self.U.push(u, k_new)
+                self.pushes += 1
+                self.stale_pops += 1
 
             elif self.g.get(u, float('inf')) > self.rhs.get(u, float('inf')):
                 # improve g to match rhs
                 self.g[u] = self.rhs[u]
-                # propagate changes
-                for link in u.get_neighbors():
-                    self.update_vertex(link.node)
+                # propagate changes to everything that can step onto u
+                for pred in self.dependents(u):
+                    self.update_vertex(pred)
 
             else:
                 # make g infinite and propagate
                 self.g[u] = float('inf')
                 self.update_vertex(u)
-                for link in u.get_neighbors():
-                    self.update_vertex(link.node)
+                for pred in self.dependents(u):
+                    self.update_vertex(pred)
+        return peak_open
+
+    def counters(self):
+        return self.pushes, self.expanded, self.stale_pops, self.updates
+
+    def finish_search(self, stats, peak_open):
+        """
+        Adds the work since the previous search ended to stats, which
+        includes queue updates made by update_edges in between.
+        """
+        now = self.counters()
+        if stats is not None:
+            pushes, pops, stale_pops, updates = (a - b for a, b in zip(now, self.reported))
+            stats.record(pushes, pops, stale_pops, updates, peak_open,
+                         (self.g, self.rhs, self.U.position))
+        self.reported = now
 
-    def plan(self, env, start_node, goal_node):
+    def plan(self, env, start_node, goal_node, stats=None):
+        """
+        Returns (path, expanded), expanded being the number of queue pops.
+        Pass a SearchStats as stats to also get comparable search counters.
+        """
+        graph = env.compile()
+        landmarks = self.current_landmarks(env, graph)
+
+        if self.reuse_tree:
+            source, target = graph.id_of(start_node), graph.id_of(goal_node)
+            if source == target:
+                # nothing to search; leave the tree as it is for the next target
+                if stats is not None:
+                    stats.record(0, 0, 0, 0, 0)
+                return [start_node], 0
+            if (self.rooted_at_source and graph is self.graph and self.version == graph.version
+                    and self.goal == source and landmarks is self.landmarks and not self.restart):
+                # same source: treat the new target as a moved query point
+                before = self.expanded
+                self.move_start(goal_node)
+                peak_open = self.compute_shortest_path(track=stats is not None)
+                self.finish_search(stats, peak_open)
+                path = self.reconstruct_path(target, source)
+                return self.graph.to_nodes(path[::-1]), self.expanded - before
+
+            self.env, self.graph, self.landmarks = env, graph, landmarks
+            self.initialize(target, source, rooted_at_source=True)
+            peak_open = self.compute_shortest_path(track=stats is not None)
+            self.finish_search(stats, peak_open)
+            path = self.reconstruct_path(target, source)
+            return self.graph.to_nodes(path[::-1]), self.expanded
+
+        self.env, self.graph, self.landmarks = env, graph, landmarks
+        start = self.graph.id_of(start_node)
+        goal = self.graph.id_of(goal_node)
         # Reset
-        self.initialize(start_node, goal_node)
-        # Build the full shortest‐path tree (static case)
-        self.compute_shortest_path()
+        self.initialize(start, goal)
+        # Search until the start is settled (or the full tree is built)
+        peak_open = self.compute_shortest_path(track=stats is not None)
+        self.finish_search(stats, peak_open)
         # Walk it out
-        path = self.reconstruct_path(start_node, goal_node)
-        return path, self.expanded
+        path = self.reconstruct_path(start, goal)
+        return self.graph.to_nodes(path), self.expanded
+
+    @staticmethod
+    def current_landmarks(env, graph):
+        """env's ALT tables if they were built on graph, else None."""
+        landmarks = getattr(env, "landmarks", None)
+        return landmarks if landmarks is not None and landmarks.graph is graph else None
+
+    def move_start(self, start_node):
+        """Moves the search start (the agent walked); keys stay valid through km."""
+        start = self.graph.id_of(start_node)
+        self.km += self.query_heuristic(self.last, start)
+        self.last = start
+        self.start = start
+
+    def update_edges(self, changed_edges):
+        """
+        Reports (u, v) edge ids whose weight changed in the compiled view,
+        e.g. the list returned by Mall.place_obstacle (which returns None
+        for a refused obstacle), Mall.set_edge_weight or Mall.close_elevator.
+        Only the tail of each edge needs a new rhs (the head, when the
+        search is rooted at the source).
+
+        A lowered weight makes the mall drop its landmark tables; the keys
+        in U were computed from them and may overestimate, so the next
+        replan() then searches from scratch without them.
+        """
+        if self.landmarks is not None and self.current_landmarks(self.env, self.graph) is not self.landmarks:
+            self.landmarks = None
+            self.restart = True
+        if not self.restart:
+            for u, v in changed_edges:
+                self.update_vertex(v if self.rooted_at_source else u)
+        self.version = self.graph.version
+
+    def replan(self, stats=None):
+        """Repairs the search after moves/edge changes; returns (path, expanded)."""
+        if self.restart:
+            self.initialize(self.start, self.goal, rooted_at_source=self.rooted_at_source)
+        before = self.expanded
+        peak_open = self.compute_shortest_path(track=stats is not None)
+        self.finish_search(stats, peak_open)
+        path = self.reconstruct_path(self.start, self.goal)
+        if self.rooted_at_source:
+            path = path[::-1]
+        return self.graph.to_nodes(path), self.expanded - before
+
+    def cost_to_goal(self, node) -> float:
+        """g of node; exact for every node only after a full_tree search."""
+        return self.g.get(self.graph.id_of(node), float('inf'))
+
+    def reconstruct_path(self, start, goal):
+        if start == goal:
+            return [start]
+        if self.g.get(start, float('inf')) == float('inf'):
+            return []    # no path
 
-    def reconstruct_path(self, start_node, goal_node):
-        path = [start_node]
-        current = start_node
-        while current is not goal_node:
+        path = [start]
+        current = start
+        while current != goal:
             # choose neighbor minimizing g[nbr]+cost
             candidates = [
-                link for link in current.get_neighbors()
-                if self.g.get(link.node, float('inf')) < float('inf')
+                (nbr, weight) for nbr, weight in self.lookahead(current)
+                if self.g.get(nbr, float('inf')) + weight < float('inf')
             ]
             if not candidates:
                 return []    # no path
             current = min(
                 candidates,
-                key=lambda link: self.g[link.node] + link.weight
-            ).node
+                key=lambda link: self.g[link[0]] + link[1]
+            )[0]
             path.append(current)
-        return path
\ No newline at end of file
+        return path
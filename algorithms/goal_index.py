@@ -0,0 +1,44 @@
+import numpy as np
+
+class GoalIndex:
+    """
+    Lookup structure for a set of goal nodes on a compiled mall.
+
+    - goal_by_id: hash map from node id to the goal Node (membership test)
+    - nearest:    for every (row, column) cell, the 2D Manhattan distance
+                  to the closest goal on any floor, as a flat list indexed
+                  by cell = node_id // num_floors
+
+    nearest is the same value MultiGoalAStarPlanner used to compute with a
+    min() over all goals, but it is built once with a two-pass L1 distance
+    transform (O(rows * columns)), so the heuristic is one list lookup per
+    node no matter how many goals there are.
+    """
+
+    def __init__(self, graph, goal_nodes):
+        self.graph = graph
+        self.goal_by_id = {}
+        for goal in goal_nodes:
+            self.goal_by_id.setdefault(graph.id_of(goal), goal)
+        self.key = tuple(sorted(self.goal_by_id))
+
+        rows, columns = graph.rows, graph.columns
+        distance = np.full((rows, columns), rows + columns, dtype=np.int64)
+        for goal in self.goal_by_id.values():
+            distance[goal.row, goal.column] = 0
+
+        # forward/backward sweeps along each axis give the exact L1 transform
+        for column in range(1, columns):
+            np.minimum(distance[:, column], distance[:, column - 1] + 1, out=distance[:, column])
+        for column in range(columns - 2, -1, -1):
+            np.minimum(distance[:, column], distance[:, column + 1] + 1, out=distance[:, column])
+        for row in range(1, rows):
+            np.minimum(distance[row], distance[row - 1] + 1, out=distance[row])
+        for row in range(rows - 2, -1, -1):
+            np.minimum(distance[row], distance[row + 1] + 1, out=distance[row])
+
+        self.nearest = distance.ravel().tolist()
+
+    def matches(self, graph, goal_nodes) -> bool:
+        """True if this index was built for the same graph and goal set."""
+        return graph is self.graph and self.key == tuple(sorted({graph.id_of(g) for g in goal_nodes}))
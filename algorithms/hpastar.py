@@ -0,0 +1,243 @@
+import heapq
+from mallcomponents.compiled import TYPE_CODES
+
+class HierarchicalPlanner:
+    """
+    Hierarchical (HPA*-style) planner over the mall's floor/portal
+    structure.
+
+    Floors only meet at elevators (up_floor/down_floor) and stair pairs
+    (up_stairs/down_stairs). The abstract graph has one node per point of
+    interest (elevators, stairs, stores, start nodes) with
+      - intra-floor edges: exact shortest distances between POIs on the
+        same floor, computed once by floor-restricted Dijkstra
+      - inter-floor edges: the elevator/stair links themselves
+    Any path splits into floor segments that start and end at POIs, so a
+    shortest abstract path is a shortest mall path. A query searches the
+    small abstract graph, then refines only the chosen floor segments with
+    floor-restricted A*. Start/goal nodes that are not POIs are attached
+    with one floor-restricted search each.
+
+    The abstract graph is cached per compiled graph and rebuilt when the
+    mall is recompiled or edited.
+    """
+
+    POI_TYPES = ("elevator", "stairs", "store", "start")
+
+    def __init__(self):
+        self.graph = None
+        self.version = None
+        self.abstract = None        # POI id -> list of (POI id, cost)
+        self.floor_pois = None      # f_number -> list of POI ids
+
+    def build(self, graph):
+        """Precomputes the abstract POI graph of a compiled mall."""
+        offsets, targets, weights, _, _ = graph.adjacency()
+        floor_of = graph.floor_of.tolist()
+        poi_codes = {TYPE_CODES[name] for name in self.POI_TYPES}
+        pois = [v for v, t in enumerate(graph.types.tolist()) if t in poi_codes]
+
+        self.floor_pois = {}
+        for v in pois:
+            self.floor_pois.setdefault(floor_of[v], []).append(v)
+
+        self.abstract = {}
+        for p in pois:
+            same_floor = self.floor_pois[floor_of[p]]
+            distance, _ = self._floor_search(graph, p, set(same_floor))
+            edges = [(q, distance[q]) for q in same_floor if q != p and q in distance]
+            for edge in range(offsets[p], offsets[p + 1]):
+                q = targets[edge]
+                if floor_of[q] != floor_of[p]:
+                    edges.append((q, weights[edge]))
+            self.abstract[p] = edges
+        self.graph = graph
+        self.version = graph.version
+
+    def plan(self, env, start_node, goal_node, stats=None):
+        """
+        Returns (path, expanded). Pass a SearchStats as stats to also get
+        comparable search counters; they add up the endpoint searches, the
+        abstract search and the refinements, but not build().
+        """
+        graph = env.compile()
+        if self.graph is not graph or self.version != graph.version:
+            self.build(graph)
+        floor_of = graph.floor_of
+
+        start, goal = graph.id_of(start_node), graph.id_of(goal_node)
+        expanded = 0
+
+        # attach non-POI endpoints to the POIs of their floor
+        extra_out = []
+        if start not in self.abstract:
+            pois = set(self.floor_pois.get(int(floor_of[start]), ()))
+            if floor_of[start] == floor_of[goal]:
+                pois.add(goal)
+            distance, popped = self._floor_search(graph, start, pois, stats=stats)
+            expanded += popped
+            extra_out = [(q, d) for q, d in distance.items() if q in pois]
+
+        extra_in = {}
+        if goal not in self.abstract:
+            pois = set(self.floor_pois.get(int(floor_of[goal]), ()))
+            if floor_of[start] == floor_of[goal]:
+                pois.add(start)
+            distance, popped = self._floor_search(graph, goal, pois, reverse=True, stats=stats)
+            expanded += popped
+            extra_in = {q: d for q, d in distance.items() if q in pois}
+
+        route, popped = self._abstract_search(start, goal, extra_out, extra_in, stats)
+        expanded += popped
+        if not route:
+            return [], expanded
+
+        # refine: vertical hops are single links, floor segments get A*
+        path = [start]
+        for a, b in zip(route, route[1:]):
+            if floor_of[a] != floor_of[b]:
+                path.append(b)
+                continue
+            segment, popped = self._floor_astar(graph, a, b, stats)
+            expanded += popped
+            if not segment:
+                return [], expanded
+            path.extend(segment[1:])
+
+        return graph.to_nodes(path), expanded
+
+    def _abstract_search(self, start, goal, extra_out, extra_in, stats=None):
+        distance = {start: 0.0}
+        came_from = {}
+        heap = [(0.0, start)]
+        popped = pops = 0
+        track = stats is not None
+        peak_open = 1
+        route = []
+
+        while heap:
+            if track and len(heap) > peak_open:
+                peak_open = len(heap)
+            d, u = heapq.heappop(heap)
+            pops += 1
+            if d > distance[u]:
+                continue
+            popped += 1
+            if u == goal:
+                route = [u]
+                while u in came_from:
+                    u = came_from[u]
+                    route.append(u)
+                route.reverse()
+                break
+
+            edges = self.abstract.get(u, extra_out if u == start else ())
+            if u in extra_in:
+                edges = list(edges) + [(goal, extra_in[u])]
+            for v, cost in edges:
+                nd = d + cost
+                if nd < distance.get(v, float('inf')):
+                    distance[v] = nd
+                    came_from[v] = u
+                    heapq.heappush(heap, (nd, v))
+
+        if track:
+            pushes = pops + len(heap)
+            stats.record(pushes, pops, pops - popped, pushes - 1, peak_open, (distance, came_from))
+        return route, popped
+
+    def _floor_search(self, graph, source, wanted, reverse=False, stats=None):
+        """
+        Dijkstra restricted to source's floor, stopping once every node in
+        wanted is settled. Returns ({settled id: distance}, pops of a node
+        not yet settled).
+        """
+        if reverse:
+            offsets, targets, weights = graph.reverse_adjacency()
+        else:
+            offsets, targets, weights, _, _ = graph.adjacency()
+        num_floors = graph.num_floors
+        floor = source % num_floors
+
+        settled = {}
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        remaining = len(wanted - {source})
+        popped = pops = 0
+        track = stats is not None
+        peak_open = 1
+
+        while heap and remaining > 0:
+            if track and len(heap) > peak_open:
+                peak_open = len(heap)
+            d, u = heapq.heappop(heap)
+            pops += 1
+            if u in settled:
+                continue
+            settled[u] = d
+            popped += 1
+            if u != source and u in wanted:
+                remaining -= 1
+            for edge in range(offsets[u], offsets[u + 1]):
+                v = targets[edge]
+                if v % num_floors != floor or v in settled:
+                    continue
+                nd = d + weights[edge]
+                if nd < best.get(v, float('inf')):
+                    best[v] = nd
+                    heapq.heappush(heap, (nd, v))
+
+        if track:
+            pushes = pops + len(heap)
+            stats.record(pushes, pops, pops - popped, pushes - 1, peak_open, (settled, best))
+        settled.setdefault(source, 0.0)
+        return settled, popped
+
+    def _floor_astar(self, graph, source, target, stats=None):
+        """Floor-restricted A* used to refine one abstract edge."""
+        offsets, targets, weights, rows, columns = graph.adjacency()
+        num_floors = graph.num_floors
+        floor = source % num_floors
+        target_row, target_column = rows[target], columns[target]
+
+        g_score = {source: 0.0}
+        came_from = {}
+        closed = set()
+        heap = [(0.0, source)]
+        popped = pops = 0
+        track = stats is not None
+        peak_open = 1
+        path = []
+
+        while heap:
+            if track and len(heap) > peak_open:
+                peak_open = len(heap)
+            _, u = heapq.heappop(heap)
+            pops += 1
+            if u in closed:
+                continue
+            closed.add(u)
+            popped += 1
+            if u == target:
+                path = [u]
+                while u in came_from:
+                    u = came_from[u]
+                    path.append(u)
+                path.reverse()
+                break
+            for edge in range(offsets[u], offsets[u + 1]):
+                v = targets[edge]
+                if v % num_floors != floor or v in closed:
+                    continue
+                tentative_g = g_score[u] + weights[edge]
+                if tentative_g < g_score.get(v, float('inf')):
+                    g_score[v] = tentative_g
+                    came_from[v] = u
+                    h = abs(rows[v] - target_row) + abs(columns[v] - target_column)
+                    heapq.heappush(heap, (tentative_g + h, v))
+
+        if track:
+            pushes = pops + len(heap)
+            stats.record(pushes, pops, pops - popped, pushes - 1, peak_open,
+                         (g_score, came_from, closed))
+        return path, popped
@@ -0,0 +1,328 @@
+import heapq
+import numpy as np
+from mallcomponents.compiled import TYPE_CODES, DIRECTION_CODES
+
+# heading bits: how a jump point was reached
+UP, DOWN, LEFT, RIGHT, ANY = 1, 2, 4, 8, 16
+
+
+class JumpGrid:
+    """
+    Per-cell classification of a compiled mall for jump point search.
+
+    - regular: generic interior cells whose only links are unit-cost
+               moves to every non-obstacle 4-neighbor on their floor, i.e.
+               cells a jump can run through without missing anything
+    - dead:    cells a path can only end in: at most one link in and
+               none out, or one link back to the only cell that links in
+               (perimeter cells, perimeter stores, obstacles)
+
+    Everything else (stores, start, elevators, stairs, cells next to an
+    edited edge) is irregular and stops a jump, so portal transitions and
+    changed weights are always handled by ordinary edge expansion.
+
+    Where a jump stops does not depend on the goal (as long as the goal is
+    not dead), so it is tabulated: stops[step][n] is the first cell at or
+    after n, moving by step, where a jump entering n from n - step stops
+    (its id) or runs into a dead cell (~its id), and turns[step][n] holds
+    the UP/DOWN bits of the forced neighbors of n for a horizontal step.
+    Planners only add the goal check on top.
+    Built with NumPy in O(nodes + edges); rebuilt when the graph version
+    changes.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.version = graph.version
+
+        n, rows, columns, floors = graph.num_nodes, graph.rows, graph.columns, graph.num_floors
+        # id steps of the four in-floor moves
+        self.up, self.down, self.left, self.right = -columns * floors, columns * floors, -floors, floors
+        self.steps = {DIRECTION_CODES["up"]: (self.up, UP), DIRECTION_CODES["down"]: (self.down, DOWN),
+                      DIRECTION_CODES["left"]: (self.left, LEFT), DIRECTION_CODES["right"]: (self.right, RIGHT)}
+
+        degree = np.diff(graph.offsets)
+        source = np.repeat(np.arange(n, dtype=np.int64), degree)
+        step_of = np.zeros(len(DIRECTION_CODES), dtype=np.int64)
+        for code, (step, _) in self.steps.items():
+            step_of[code] = step
+        in_floor = np.isin(graph.directions, list(self.steps))
+        good = in_floor & (graph.weights == 1.0) & (graph.targets == source + step_of[graph.directions])
+        bad = np.bincount(source, weights=~good, minlength=n)
+
+        free = (graph.types != TYPE_CODES["obstacle"]).reshape(rows, columns, floors)
+        open_sides = np.zeros((rows, columns, floors), dtype=np.int64)
+        open_sides[1:] += free[:-1]
+        open_sides[:-1] += free[1:]
+        open_sides[:, 1:] += free[:, :-1]
+        open_sides[:, :-1] += free[:, 1:]
+        interior = np.zeros((rows, columns, floors), dtype=bool)
+        interior[1:-1, 1:-1] = True
+
+        regular = ((graph.types == TYPE_CODES["generic"]) & interior.ravel()
+                   & (bad == 0) & (degree == open_sides.ravel()))
+
+        in_degree = np.diff(graph.rev_offsets)
+        first_target = graph.targets[np.minimum(graph.offsets[:-1], max(len(graph.targets) - 1, 0))]
+        first_source = graph.rev_sources[np.minimum(graph.rev_offsets[:-1], max(len(graph.rev_sources) - 1, 0))]
+        dead = (((degree == 0) & (in_degree <= 1))
+                | ((degree == 1) & ((in_degree == 0) | ((in_degree == 1) & (first_source == first_target)))))
+
+        self.regular = regular.tolist()
+        self.dead = dead.tolist()
+        self.directions = graph.directions.tolist()
+        self.floor_of = graph.floor_of.tolist()
+        self.turns = {}
+        self.stops = self._stop_tables(regular.reshape(rows, columns, floors),
+                                       dead.reshape(rows, columns, floors))
+
+    def _stop_tables(self, regular, dead):
+        rows, columns, floors = regular.shape
+        ids = np.arange(rows * columns * floors, dtype=np.int64).reshape(regular.shape)
+
+        def padded(a):
+            return np.pad(a, ((1, 1), (1, 1), (0, 0)), constant_values=False)
+
+        def at(a, dr, dc):
+            # a (padded) at (row + dr, column + dc) of every cell
+            return a[1 + dr:1 + dr + rows, 1 + dc:1 + dc + columns]
+
+        def sweep(stop, axis, backwards):
+            # first stop (id) or dead cell (~id) at or after each cell
+            code = np.where(stop, ids, ~ids)
+            halt = stop | dead
+            out = np.empty_like(ids)
+            length = regular.shape[axis]
+            carry = None
+            for i in (range(length - 1, -1, -1) if backwards else range(length)):
+                index = (slice(None), i) if axis == 1 else (i,)
+                here = code[index] if carry is None else np.where(halt[index], code[index], carry)
+                out[index] = here
+                carry = here
+            return out.ravel().tolist()
+
+        regular_p, open_p = padded(regular), padded(~dead)
+        irregular = ~regular
+        stops = {}
+        for step, dc in ((self.left, -1), (self.right, 1)):
+            # forced neighbor: an open cell above/below whose way round,
+            # through the cells behind, is not regular
+            turns = np.zeros(regular.shape, dtype=np.int64)
+            for dr, bit in ((-1, UP), (1, DOWN)):
+                side = at(open_p, dr, 0) & ~(at(regular_p, 0, -dc) & at(regular_p, dr, -dc))
+                turns |= np.where(side & regular, bit, 0)
+            self.turns[step] = turns.ravel().tolist()
+            forced = turns != 0
+            stops[step] = sweep((irregular | forced) & ~dead, axis=1, backwards=dc > 0)
+
+        # a vertical jump stops where a sideways jump would find a stop
+        found_left = padded((np.asarray(stops[self.left]) >= 0).reshape(regular.shape))
+        found_right = padded((np.asarray(stops[self.right]) >= 0).reshape(regular.shape))
+        sideways = at(found_left, 0, -1) | at(found_right, 0, 1)
+        for step, dr in ((self.up, -1), (self.down, 1)):
+            stops[step] = sweep((irregular | sideways) & ~dead, axis=0, backwards=dr > 0)
+        return stops
+
+    def matches(self, graph) -> bool:
+        """True if this grid was built for graph at its current version."""
+        return graph is self.graph and graph.version == self.version
+
+
+class JumpPointPlanner:
+    """
+    Jump point search (4-connected) on the compiled mall.
+
+    Among equally short grid paths only the canonical one that makes its
+    vertical moves as early as possible is followed, so
+      - a horizontal move continues straight, and turns up/down only where
+        the cell diagonally behind is not a regular cell (forced neighbor)
+      - a vertical move continues straight and scans sideways at each step
+    A jump runs through regular cells until it hits the goal, a forced
+    neighbor, a vertical step whose sideways scan finds a jump point, or
+    an irregular cell (store, start, elevator, stairs, edited edge). Only
+    those cells go on the heap; irregular ones are expanded over their
+    real links, so floor changes and weights other than 1 stay exact.
+
+    Returns the same optimal paths as AStarPlanner with far fewer heap
+    operations on open floors.
+    """
+
+    def __init__(self):
+        self.jump_grid = None
+
+    def get_jump_grid(self, graph):
+        if self.jump_grid is None or not self.jump_grid.matches(graph):
+            self.jump_grid = JumpGrid(graph)
+        return self.jump_grid
+
+    def plan(self, env, start_node, goal_node, stats=None):
+        """
+        Returns (path, expanded), expanded being the number of heap pops.
+        Pass a SearchStats as stats to also get comparable search counters.
+        """
+        graph = env.compile()
+        offsets, targets, weights, rows, columns = graph.adjacency()
+        grid = self.get_jump_grid(graph)
+        regular, dead, steps, directions = grid.regular, grid.dead, grid.steps, grid.directions
+        stops, turns, floor_of = grid.stops, grid.turns, grid.floor_of
+        up, down, left, right = grid.up, grid.down, grid.left, grid.right
+
+        start = graph.id_of(start_node)
+        goal = graph.id_of(goal_node)
+
+        # a dead-end goal (a perimeter store) can only be entered from its
+        # one neighbor; search for that cell instead, which keeps the jump
+        # tables exact, and append the goal to the path afterwards
+        tail = []
+        if dead[goal] and goal != start:
+            rev_offsets, rev_sources, rev_weights = graph.reverse_adjacency()
+            slot = rev_offsets[goal]
+            if rev_offsets[goal + 1] - slot != 1 or rev_weights[slot] == float('inf'):
+                return [], 0
+            tail.append(goal)
+            goal = rev_sources[slot]
+            if dead[goal] and goal != start:
+                return [], 0
+        goal_row, goal_column, goal_floor = rows[goal], columns[goal], floor_of[goal]
+
+        # floor-aware ALT bound if landmarks were built for this mall
+        landmarks = getattr(env, "landmarks", None)
+        alt = landmarks.heuristic_to(goal) if landmarks is not None and landmarks.graph is graph else None
+
+        def jump(n, step):
+            """
+            Jumps from n - step onto n and on; returns (jump point, cells
+            walked) or (None, 0) if the jump runs into a dead end.
+            """
+            code = stops[step][n]
+            end = code if code >= 0 else ~code
+            if floor_of[n] == goal_floor:
+                row, column = rows[n], columns[n]
+                if step == left or step == right:
+                    if row == goal_row and min(column, columns[end]) <= goal_column <= max(column, columns[end]):
+                        return goal, abs(goal_column - column) + 1
+                elif min(row, rows[end]) <= goal_row <= max(row, rows[end]):
+                    if column == goal_column:
+                        return goal, abs(goal_row - row) + 1
+                    # the cell in the goal's row stops the jump if a
+                    # sideways jump from it reaches the goal
+                    cell = n + (goal_row - row) * down
+                    if cell != end:
+                        side = right if goal_column > column else left
+                        m = cell + side
+                        if m == goal:
+                            return cell, abs(goal_row - row) + 1
+                        if not dead[m]:
+                            side_code = stops[side][m]
+                            side_end = side_code if side_code >= 0 else ~side_code
+                            if min(columns[m], columns[side_end]) <= goal_column <= max(columns[m], columns[side_end]):
+                                return cell, abs(goal_row - row) + 1
+            if code < 0:
+                return None, 0
+            return end, abs(rows[end] - rows[n]) + abs(columns[end] - columns[n]) + 1
+
+        open_set = [(0, start)]
+        came_from = {}      # jump point -> (parent jump point, step of the jump)
+        g_score = {start: 0}
+        headings = {start: ANY}
+        visited_nodes = set()
+        expanded = reopened = 0
+        found = False
+        track = stats is not None
+        peak_open = 1
+
+        def relax(node, parent, step, heading, tentative_g):
+            g = g_score.get(node, float('inf'))
+            if tentative_g < g:
+                g_score[node] = tentative_g
+                came_from[node] = (parent, step)
+                headings[node] = heading
+            elif tentative_g == g and not headings[node] & heading:
+                # equally short but arriving another way: expand for both
+                headings[node] |= heading
+                if node in visited_nodes:
+                    visited_nodes.remove(node)
+                    nonlocal reopened
+                    reopened += 1
+            else:
+                return
+            h = abs(rows[node] - goal_row) + abs(columns[node] - goal_column)
+            if alt is not None:
+                h = max(h, alt(node))
+            heapq.heappush(open_set, (tentative_g + h, node))
+
+        while open_set:
+            if track and len(open_set) > peak_open:
+                peak_open = len(open_set)
+            _, current = heapq.heappop(open_set)
+            expanded += 1
+
+            if current == goal:
+                found = True
+                break
+            if current in visited_nodes:
+                continue
+            visited_nodes.add(current)
+            current_g = g_score[current]
+            heading = headings[current]
+
+            if regular[current] and not heading & ANY:
+                # pruned successors of the canonical ways current was reached
+                moves = 0
+                if heading & UP:
+                    moves |= UP | LEFT | RIGHT
+                if heading & DOWN:
+                    moves |= DOWN | LEFT | RIGHT
+                if heading & LEFT:
+                    moves |= LEFT | turns[left][current]
+                if heading & RIGHT:
+                    moves |= RIGHT | turns[right][current]
+                for step, bit in ((up, UP), (down, DOWN), (left, LEFT), (right, RIGHT)):
+                    if not moves & bit:
+                        continue
+                    n = current + step
+                    if n != goal and dead[n]:
+                        continue
+                    point, walked = jump(n, step)
+                    if point is not None:
+                        relax(point, current, step, bit, current_g + walked)
+                continue
+
+            # irregular cell (or no heading): follow its real links
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                weight = weights[edge]
+                if weight == float('inf') or (neighbor != goal and dead[neighbor]):
+                    continue
+                move = steps.get(directions[edge])
+                if move is not None and neighbor - current == move[0] and regular[neighbor]:
+                    step, bit = move
+                    point, walked = jump(neighbor, step)
+                    if point is not None:
+                        relax(point, current, step, bit, current_g + weight + walked - 1)
+                else:
+                    relax(neighbor, current, None, ANY, current_g + weight)
+
+        if track:
+            pushes = expanded + len(open_set)
+            distinct = len(visited_nodes) + reopened + found
+            stats.record(pushes, expanded, expanded - distinct, pushes - 1, peak_open,
+                         (came_from, g_score, headings, visited_nodes))
+
+        if found:
+            return graph.to_nodes(self.reconstruct_path(came_from, goal) + tail), expanded
+        return [], expanded
+
+    def reconstruct_path(self, came_from, current):
+        """Fills in the straight runs between consecutive jump points."""
+        path = [current]
+        while current in came_from:
+            parent, step = came_from[current]
+            if step is not None:
+                cell = current - step
+                while cell != parent:
+                    path.append(cell)
+                    cell -= step
+            path.append(parent)
+            current = parent
+        return path[::-1]
@@ -0,0 +1,134 @@
+from algorithms.dijkstra import shortest_distances
+from mallcomponents.compiled import TYPE_CODES
+
+class LandmarkTable:
+    """
+    Exact distance tables for a few landmark nodes, used for the ALT
+    (A*, Landmarks, Triangle inequality) lower bound
+
+        d(v, t) >= max over landmarks L of
+                   max(d(L, t) - d(L, v),  d(v, L) - d(t, L))
+
+    which, unlike the 2D Manhattan distance, knows about floors, elevator
+    and stair positions and walls. Both directions are stored because
+    stair links are one-way.
+
+    Landmarks are picked among elevators and stairs (the portals every
+    cross-floor path has to use) by farthest-point selection, and topped
+    up with far-away cells if there are too few portals.
+    """
+
+    def __init__(self, graph, landmark_ids):
+        self.graph = graph
+        self.landmarks = list(landmark_ids)
+        # forward[i][v] = d(L_i, v); backward[i][v] = d(v, L_i)
+        self.forward = [shortest_distances(graph, l) for l in self.landmarks]
+        self.backward = [shortest_distances(graph, l, reverse=True) for l in self.landmarks]
+
+    @classmethod
+    def build(cls, graph, count: int = 8, anchor: int = None) -> "LandmarkTable":
+        """
+        Picks up to count landmarks in the component of anchor (defaults to
+        the first portal) and computes their distance tables.
+        """
+        portal_types = (TYPE_CODES["elevator"], TYPE_CODES["stairs"])
+        portals = [v for v, t in enumerate(graph.types.tolist()) if t in portal_types]
+        if anchor is None:
+            anchor = portals[0] if portals else next(
+                v for v in range(graph.num_nodes) if graph.offsets[v + 1] > graph.offsets[v])
+
+        # farthest-point selection: each new landmark maximizes its distance
+        # to the closest landmark chosen so far
+        reach = shortest_distances(graph, anchor)
+        candidates = [v for v in portals if reach[v] < float('inf')]
+        everything = [v for v, d in enumerate(reach) if d < float('inf')]
+
+        chosen = []
+        closest = reach
+        while len(chosen) < count:
+            pool = [v for v in candidates if v not in chosen] or [v for v in everything if v not in chosen]
+            if not pool:
+                break
+            best = max(pool, key=lambda v: closest[v])
+            chosen.append(best)
+            distances = shortest_distances(graph, best)
+            closest = [min(a, b) for a, b in zip(closest, distances)] if len(chosen) > 1 else distances
+
+        return cls(graph, chosen)
+
+    def lower_bound(self, a: int, b: int) -> float:
+        """Admissible lower bound on the distance from node a to node b."""
+        best = 0.0
+        for forward, backward in zip(self.forward, self.backward):
+            bound = forward[b] - forward[a]
+            if bound > best:
+                best = bound
+            bound = backward[a] - backward[b]
+            if bound > best:
+                best = bound
+        return best
+
+    def heuristic_to(self, target: int):
+        """Returns h(v), a lower bound on d(v, target), for A*-style searches."""
+        terms = [
+            (forward, forward[target], backward, backward[target])
+            for forward, backward in zip(self.forward, self.backward)
+            if forward[target] < float('inf') and backward[target] < float('inf')
+        ]
+
+        def h(v):
+            best = 0.0
+            for forward, forward_t, backward, backward_t in terms:
+                bound = forward_t - forward[v]
+                if bound > best:
+                    best = bound
+                bound = backward[v] - backward_t
+                if bound > best:
+                    best = bound
+            return best
+        return h
+
+    def heuristic_from(self, source: int):
+        """Returns h(v), a lower bound on d(source, v), for searches run backwards."""
+        terms = [
+            (forward, forward[source], backward, backward[source])
+            for forward, backward in zip(self.forward, self.backward)
+            if forward[source] < float('inf') and backward[source] < float('inf')
+        ]
+
+        def h(v):
+            best = 0.0
+            for forward, forward_s, backward, backward_s in terms:
+                bound = forward[v] - forward_s
+                if bound > best:
+                    best = bound
+                bound = backward_s - backward[v]
+                if bound > best:
+                    best = bound
+            return best
+        return h
+
+    def heuristic_to_any(self, targets):
+        """
+        Returns h(v), a lower bound on the distance from v to the closest
+        of targets: d(v, g) >= min_g d(L, g) - d(L, v) and
+        d(v, g) >= d(v, L) - max_g d(g, L).
+        """
+        terms = []
+        for forward, backward in zip(self.forward, self.backward):
+            forward_t = min(forward[t] for t in targets)
+            backward_t = max(backward[t] for t in targets)
+            if forward_t < float('inf') and backward_t < float('inf'):
+                terms.append((forward, forward_t, backward, backward_t))
+
+        def h(v):
+            best = 0.0
+            for forward, forward_t, backward, backward_t in terms:
+                bound = forward_t - forward[v]
+                if bound > best:
+                    best = bound
+                bound = backward[v] - backward_t
+                if bound > best:
+                    best = bound
+            return best
+        return h
@@ -1,59 +1,123 @@
 import heapq
+from functools import partial
+from algorithms.goal_index import GoalIndex
+from utils.bucket_queue import BucketQueue, check_queue
 
 class MultiGoalAStarPlanner:
-    def __init__(self):
-        pass
-
-    def plan(self, env, start_node, goal_nodes):
-
-        open_set = []
-        heapq.heappush(open_set, (0, start_node))
+    """
+    One A* search from the start to every goal, guided by the distance to
+    the nearest goal. queue="buckets" swaps the heap for a BucketQueue
+    over integer-scaled weights, like AStarPlanner.
+    """
+    def __init__(self, queue: str = "heap"):
+        check_queue(queue)
+        self.queue = queue
+        self.goal_index = None
+
+    def get_goal_index(self, graph, goal_nodes):
+        """Reuses the goal index while the graph and goal set stay the same."""
+        if self.goal_index is None or not self.goal_index.matches(graph, goal_nodes):
+            self.goal_index = GoalIndex(graph, goal_nodes)
+        return self.goal_index
+
+    def plan(self, env, start_node, goal_nodes, stats=None, exhaustive=True):
+        """
+        Returns (results sorted by cost, expanded), expanded being the
+        number of heap pops. Pass a SearchStats as stats to also get
+        comparable search counters. The search runs until the heap is
+        empty; with exhaustive=False it stops once every goal is reached.
+        """
+        graph = env.compile()
+        offsets, targets, weights, _, _ = graph.adjacency()
+
+        start = graph.id_of(start_node)
+        goal_index = self.get_goal_index(graph, goal_nodes)
+        goal_by_id = goal_index.goal_by_id
+        nearest = goal_index.nearest
+        num_floors = graph.num_floors
+
+        # floor-aware ALT bound if landmarks were built for this mall
+        landmarks = getattr(env, "landmarks", None)
+        alt = landmarks.heuristic_to_any(list(goal_by_id)) if landmarks is not None and landmarks.graph is graph else None
+
+        # bucket queue: g and h in integer units of 1 / scale
+        scale = None
+        if self.queue == "buckets":
+            scale, scaled = graph.scaled_weights()
+            if scale is not None:
+                weights = scaled
+                if alt is not None:
+                    exact = alt
+                    def alt(node):
+                        bound = exact(node)
+                        return int(bound * scale) if bound != float('inf') else bound
+        unit = scale or 1
+
+        if scale is not None:
+            open_set = BucketQueue([(0, start)])
+            push, pop = open_set.push, open_set.pop
+        else:
+            open_set = [(0, start)]
+            push, pop = partial(heapq.heappush, open_set), partial(heapq.heappop, open_set)
 
         came_from = {}
-        g_score = {start_node: 0}
-        f_score = {start_node: self.heuristic(start_node, goal_nodes)}
+        g_score = {start: 0}
 
         visited_nodes = set()
         expanded = 0
         reached_goals = {}
+        track = stats is not None
+        peak_open = 1
 
         while open_set:
-            _, current = heapq.heappop(open_set)
+            if track and len(open_set) > peak_open:
+                peak_open = len(open_set)
+            _, current = pop()
             expanded += 1
 
             if current in visited_nodes:
                 continue
             visited_nodes.add(current)
 
-            if self.is_goal_node(current, goal_nodes):
-                matched_goal = next(
-                    (g for g in goal_nodes if g.row == current.row and g.column == current.column and g.f_number == current.f_number),
-                    current
-                )
-
-                if matched_goal not in reached_goals:
-                    path = self.reconstruct_path(came_from, current)
-                    reached_goals[matched_goal] = {
-                        "goal": matched_goal,
-                        "path": path,
-                        "cost": g_score[current],
-                        "expanded": expanded
-                    }
-
-            for neighbor_link in current.get_neighbors():
-                neighbor = neighbor_link.node
-                weight = neighbor_link.weight
+            matched_goal = goal_by_id.get(current)
+            if matched_goal is not None and matched_goal not in reached_goals:
+                path = graph.to_nodes(self.reconstruct_path(came_from, current))
+                cost = g_score[current]
+                if scale is not None:
+                    cost /= scale
+                reached_goals[matched_goal] = {
+                    "goal": matched_goal,
+                    "path": path,
+                    "cost": cost,
+                    "expanded": expanded
+                }
+                if not exhaustive and len(reached_goals) == len(goal_by_id):
+                    break
+
+            current_g = g_score[current]
+
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
 
                 if neighbor in visited_nodes:
                     continue
 
-                tentative_g = g_score[current] + weight
+                tentative_g = current_g + weights[edge]
 
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                if tentative_g < g_score.get(neighbor, float('inf')):
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + self.heuristic(neighbor, goal_nodes)
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                    h = unit * nearest[neighbor // num_floors]
+                    if alt is not None:
+                        h = max(h, alt(neighbor))
+                    push((tentative_g + h, neighbor))
+
+        if track:
+            # every push was popped or is still queued; a pop is stale
+            # when its node had already been closed
+            pushes = expanded + len(open_set)
+            stats.record(pushes, expanded, expanded - len(visited_nodes), pushes - 1, peak_open,
+                         (came_from, g_score, visited_nodes, reached_goals))
 
         # Sort by cost and return
         sorted_goals = sorted(reached_goals.values(), key=lambda x: x["cost"])
@@ -0,0 +1,156 @@
+import numpy as np
+
+class StoreOrdering:
+    """
+    Picks the order in which an agent visits its candidate stores.
+
+    The agents used to rank stores by 2D Manhattan distance from the
+    start, which ignores floors: a store straight above the start looked
+    closer than one three cells away on the same floor. This ranks them
+    on exact network distances instead, read from the mall's cached
+    DistanceTable (one Dijkstra row for the start and each store, shared
+    by every agent on the same mall), and plans a route through all of
+    them starting at the start:
+
+      - up to exact_limit stores: the shortest route (Held-Karp dynamic
+        programming, O(2^k k^2))
+      - more stores: nearest neighbor, improved by 2-opt until no segment
+        reversal shortens the route (at most max_passes passes)
+
+    Distances are not symmetric (stair links are one-way), so 2-opt
+    prices a reversed segment with its backward edges. Stores the start
+    cannot reach go last, nearest (Manhattan) first.
+
+    After order(), route holds the order it returned and setup_expanded
+    the nodes expanded by the distance rows it read (see
+    DistanceTable.expansions). Each row stops once the start and every
+    store are settled. That work is not part of the agents' own expanded
+    counts.
+    """
+
+    def __init__(self, exact_limit: int = 10, max_passes: int = 50):
+        self.exact_limit = exact_limit
+        self.max_passes = max_passes
+        self.route = []
+        self.setup_expanded = 0
+
+    def order(self, env, start_node, stores) -> list:
+        """Returns stores (duplicates removed) in visiting order."""
+        graph = env.compile()
+        stores = list({graph.id_of(s): s for s in stores}.values())
+        self.route = []
+        self.setup_expanded = 0
+        if not stores:
+            return []
+
+        table = env.distance_table()
+        distance = table.matrix([start_node, *stores])
+        self.setup_expanded = table.expansions([start_node, *stores])
+        reachable = [i for i in range(len(stores)) if np.isfinite(distance[0, i + 1])]
+        unreachable = sorted(
+            (stores[i] for i in range(len(stores)) if i not in set(reachable)),
+            key=lambda s: abs(start_node.row - s.row) + abs(start_node.column - s.column)
+        )
+        if not reachable:
+            self.route = unreachable
+            return unreachable
+
+        keep = [0] + [i + 1 for i in reachable]
+        distance = distance[np.ix_(keep, keep)]
+        # a store that cannot reach another one is a very long detour
+        finite = distance[np.isfinite(distance)]
+        distance[~np.isfinite(distance)] = (finite.max() + 1) * len(keep)
+
+        if len(reachable) <= self.exact_limit:
+            route = held_karp(distance)
+        else:
+            route = two_opt(distance, nearest_neighbor(distance), self.max_passes)
+        self.route = [stores[reachable[i - 1]] for i in route] + unreachable
+        return self.route
+
+
+def route_length(distance, route) -> float:
+    """Length of the open route 0 -> route[0] -> route[1] -> ..."""
+    stops = [0, *route]
+    return float(sum(distance[a, b] for a, b in zip(stops, stops[1:])))
+
+
+def held_karp(distance) -> list:
+    """
+    Shortest open route from node 0 through every other node of the
+    distance matrix. dp[mask, j] is the shortest way from 0 through the
+    stores in mask ending at store j; each mask is relaxed with one
+    vectorized (k x k) step.
+    """
+    k = len(distance) - 1
+    legs = distance[1:, 1:]
+    bits = 1 << np.arange(k)
+    dp = np.full((1 << k, k), np.inf)
+    parent = np.full((1 << k, k), -1, dtype=np.int64)
+    dp[bits, np.arange(k)] = distance[0, 1:]
+
+    for mask in range(1, 1 << k):
+        row = dp[mask]
+        through = row[:, None] + legs           # [via j, to n]
+        via = np.argmin(through, axis=0)
+        value = through[via, np.arange(k)]
+        free = (mask & bits) == 0
+        grown = mask | bits
+        better = free & (value < dp[grown, np.arange(k)])
+        if better.any():
+            to = np.flatnonzero(better)
+            dp[grown[to], to] = value[to]
+            parent[grown[to], to] = via[to]
+
+    mask = (1 << k) - 1
+    last = int(np.argmin(dp[mask]))
+    route = []
+    while last >= 0:
+        route.append(last + 1)
+        mask, last = mask & ~(1 << last), int(parent[mask, last])
+    return route[::-1]
+
+
+def nearest_neighbor(distance) -> list:
+    """Open route from node 0 that always walks to the closest unvisited node."""
+    unvisited = set(range(1, len(distance)))
+    route, current = [], 0
+    while unvisited:
+        current = min(unvisited, key=lambda v: (distance[current, v], v))
+        unvisited.remove(current)
+        route.append(current)
+    return route
+
+
+def two_opt(distance, route, max_passes: int = 50) -> list:
+    """
+    Reverses route segments while that shortens the open route. With
+    prefix sums of the forward and backward leg lengths each candidate
+    reversal is priced in O(1), so a pass costs O(k^2).
+    """
+    tour = [0, *route]
+    n = len(tour)
+
+    def prefix_sums():
+        forward = np.concatenate([[0.0], np.cumsum(distance[tour[:-1], tour[1:]])])
+        backward = np.concatenate([[0.0], np.cumsum(distance[tour[1:], tour[:-1]])])
+        return forward, backward
+
+    for _ in range(max_passes):
+        forward, backward = prefix_sums()
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                # reverse tour[i..j]
+                old = distance[tour[i - 1], tour[i]] + forward[j] - forward[i]
+                new = distance[tour[i - 1], tour[j]] + backward[j] - backward[i]
+                if j + 1 < n:
+                    old += distance[tour[j], tour[j + 1]]
+                    new += distance[tour[i], tour[j + 1]]
+                if new < old - 1e-9:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    forward, backward = prefix_sums()
+                    improved = True
+        if not improved:
+            break
+    return tour[1:]
@@ -0,0 +1,146 @@
+"""
+Crowd simulation benchmark: tick rate against shopper count.
+
+For every agent count a fresh CrowdSimulation is filled with shoppers
+that start on random walkable cells and visit --stores random stores,
+then ticked --ticks times (after --warmup unrecorded ticks). Every
+--edit-every ticks an obstacle is dropped on a busy cell and the
+affected shoppers are replanned, which is timed separately. Reports
+p50/p90/p99/mean seconds per tick, ticks per second and the planning
+time.
+
+Usage (from the repository root):
+    python -m benchmarks.crowd --agents 1000,5000,10000,20000
+    python -m benchmarks.crowd --rows 80 --columns 80 --output crowd.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+from mallcomponents.layout import LayoutGenerator
+from mallcomponents.compiled import TYPE_CODES
+from mallcomponents.crowd import CrowdSimulation
+from benchmarks.scaling import summarize
+
+BASE_CONFIG = {
+    "num_floors": 4, "rows": 60, "columns": 60, "stores_per_floor": 15,
+    "obstacle_density": 0.15, "num_elevators": 4, "num_stairs": 4,
+}
+
+
+def build_crowd(mall, agents, stores, seed):
+    graph = mall.compile()
+    rng = random.Random(seed)
+    generic = np.flatnonzero((graph.types == TYPE_CODES["generic"]) & (np.diff(graph.offsets) > 0))
+    shops = mall.get_all_stores()
+    starts = [graph.nodes[int(v)] for v in rng.choices(generic.tolist(), k=agents)]
+    lists = [rng.sample(shops, min(stores, len(shops))) for _ in range(agents)]
+
+    sim = CrowdSimulation(mall, seed=seed)
+    t0 = time.perf_counter()
+    sim.add_shoppers(starts, lists)
+    return sim, time.perf_counter() - t0
+
+
+def drop_obstacle(mall, sim):
+    """Blocks the generic cell most shoppers step onto next; returns the changed edges."""
+    graph = sim.graph
+    active = np.flatnonzero(sim.active & (sim.step < sim.end))
+    busy = np.bincount(sim.path_node[sim.step[active] + 1], minlength=graph.num_nodes)
+    busy[(graph.types != TYPE_CODES["generic"]) | (sim.occupancy > 0)] = 0
+    for cell in np.argsort(-busy)[:20].tolist():
+        node = graph.nodes[cell]
+        changed = mall.place_obstacle(node.f_number, node.row, node.column)
+        if changed:
+            return changed
+    return []
+
+
+def bench_point(cfg, agents, stores, ticks, warmup, edit_every, seed):
+    mall = LayoutGenerator(**cfg).generate(seed).to_mall()
+    sim, plan_time = build_crowd(mall, agents, stores, seed)
+
+    for _ in range(warmup):
+        sim.tick()
+    samples, replan_times, replanned = [], [], 0
+    for i in range(ticks):
+        if edit_every and i and i % edit_every == 0:
+            changed = drop_obstacle(mall, sim)
+            t0 = time.perf_counter()
+            replanned += len(sim.apply_changes(changed))
+            replan_times.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        sim.tick()
+        samples.append(time.perf_counter() - t0)
+
+    row = summarize(samples)
+    row.update({
+        "agents": agents,
+        "ticks_per_second": float(len(samples) / np.sum(samples)),
+        "plan_time": plan_time,
+        "replanned": replanned,
+        "replan_time": float(np.sum(replan_times)),
+        "active_at_end": int(np.count_nonzero(sim.active)),
+        "mean_wait": float(sim.waited.mean()),
+    })
+    return row
+
+
+def print_table(results):
+    print(f"\n{'Agents':>8} {'ticks/s':>9} {'p50(ms)':>9} {'p99(ms)':>9} {'plan(s)':>9} "
+          f"{'replanned':>10} {'replan(s)':>10} {'active':>8}")
+    for r in results:
+        print(f"{r['agents']:>8} {r['ticks_per_second']:9.1f} {r['p50'] * 1e3:9.3f} {r['p99'] * 1e3:9.3f} "
+              f"{r['plan_time']:9.2f} {r['replanned']:>10} {r['replan_time']:10.3f} {r['active_at_end']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crowd simulation tick rate against shopper count.")
+    parser.add_argument("--agents", default="1000,2500,5000,10000,20000",
+                        help="comma-separated shopper counts")
+    parser.add_argument("--stores", type=int, default=3, help="stores on every shopping list")
+    parser.add_argument("--ticks", type=int, default=200, help="recorded ticks per point")
+    parser.add_argument("--warmup", type=int, default=10, help="unrecorded ticks per point")
+    parser.add_argument("--edit-every", type=int, default=50,
+                        help="ticks between obstacle drops (0 disables edits)")
+    parser.add_argument("--rows", type=int, default=BASE_CONFIG["rows"])
+    parser.add_argument("--columns", type=int, default=BASE_CONFIG["columns"])
+    parser.add_argument("--floors", type=int, default=BASE_CONFIG["num_floors"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="crowd_results.json")
+    args = parser.parse_args(argv)
+
+    cfg = dict(BASE_CONFIG, rows=args.rows, columns=args.columns, num_floors=args.floors)
+    results = []
+    for agents in (int(a) for a in args.agents.split(",") if a):
+        t0 = time.perf_counter()
+        results.append(bench_point(cfg, agents, args.stores, args.ticks, args.warmup,
+                                   args.edit_every, args.seed))
+        print(f"{agents:>8} agents  done in {time.perf_counter() - t0:6.2f}s")
+    print_table(results)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "config": cfg,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
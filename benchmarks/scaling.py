@@ -0,0 +1,235 @@
+"""
+Scaling benchmarks for mall generation and the planners.
+
+Each sweep varies one parameter of BASE_CONFIG and keeps the others fixed.
+For every point it times
+  - generate   Mall.run_mall_setup (object generator)
+  - compile    CompiledMall.from_mall
+  - layout     LayoutGenerator.generate + compile (NumPy generator)
+  - one entry per planner: start -> store queries (multi-goal A*: one
+    start -> all stores query), plus hpastar-build for the abstract graph
+with warmup runs that are not recorded and repeated measurements, and
+reports p50/p90/p99/mean seconds per sample.
+
+Usage (from the repository root):
+    python -m benchmarks.scaling --output bench.json
+    python -m benchmarks.scaling --sweeps size,floors --baseline bench.json
+
+With --baseline the run is compared point by point to an earlier output
+file; a point regresses if its p50 grew by more than --threshold (and by
+at least --min-delta seconds). The exit status is 1 if anything
+regressed, so the suite can gate CI.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+from mallcomponents.mall import Mall
+from mallcomponents.compiled import CompiledMall
+from mallcomponents.layout import LayoutGenerator
+from algorithms.astar import AStarPlanner
+from algorithms.dstarlite import DStarLitePlanner
+from algorithms.mgastar import MultiGoalAStarPlanner
+from algorithms.hpastar import HierarchicalPlanner
+
+BASE_CONFIG = {
+    "num_floors": 3, "rows": 40, "columns": 40, "stores_per_floor": 10,
+    "obstacle_density": 0.2, "num_elevators": 4, "num_stairs": 4,
+}
+
+# sweep name -> (values, how a value maps onto the config)
+SWEEPS = {
+    "size":      ([20, 40, 80, 120], lambda v: {"rows": v, "columns": v}),
+    "floors":    ([1, 2, 4, 8],      lambda v: {"num_floors": v}),
+    "obstacles": ([0.0, 0.1, 0.2, 0.3, 0.4], lambda v: {"obstacle_density": v}),
+    "stores":    ([5, 10, 20, 40],   lambda v: {"stores_per_floor": v}),
+    "portals":   ([1, 2, 4, 8],      lambda v: {"num_elevators": v, "num_stairs": v}),
+}
+
+PLANNERS = {
+    "astar": AStarPlanner,
+    "dstarlite": DStarLitePlanner,
+    "hpastar": HierarchicalPlanner,
+}
+
+PERCENTILES = (50, 90, 99)
+WARMUP_SEED = 10**6     # never one of the measured seeds
+
+
+def build_mall(seed, cfg):
+    random.seed(seed)
+    mall = Mall(**cfg)
+    mall.run_mall_setup()
+    return mall
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t0, result
+
+
+def summarize(samples, expanded=None):
+    samples = np.asarray(samples, dtype=np.float64)
+    row = {"samples": int(len(samples)), "mean": float(samples.mean())}
+    for p, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES)):
+        row[f"p{p}"] = float(value)
+    if expanded:
+        row["expanded_mean"] = float(np.mean(expanded))
+    return row
+
+
+def bench_point(cfg, seeds, warmup, repeats, queries):
+    """Times every component on one configuration; returns {component: summary}."""
+    samples = {name: [] for name in ("generate", "compile", "layout", "hpastar-build",
+                                     "mgastar", *PLANNERS)}
+    expanded = {name: [] for name in samples}
+
+    # generation: warmup on an unused seed, then one sample per seed and repeat
+    for _ in range(warmup):
+        build_mall(WARMUP_SEED, cfg)
+        LayoutGenerator(**cfg).generate(WARMUP_SEED).compile()
+    malls = []
+    for seed in seeds:
+        for _ in range(repeats):
+            t, mall = timed(build_mall, seed, cfg)
+            samples["generate"].append(t)
+            t, _ = timed(CompiledMall.from_mall, mall)
+            samples["compile"].append(t)
+            t, _ = timed(lambda: LayoutGenerator(**cfg).generate(seed).compile())
+            samples["layout"].append(t)
+        mall.compile()
+        malls.append(mall)
+
+    for mall in malls:
+        start = mall.floors[mall.agent_start_floor].start_node
+        stores = sorted(mall.get_all_stores())[:queries]
+        graph = mall.compile()
+
+        for _ in range(warmup):
+            HierarchicalPlanner().build(graph)
+        for _ in range(repeats):
+            t, _ = timed(HierarchicalPlanner().build, graph)
+            samples["hpastar-build"].append(t)
+
+        for name, planner_cls in PLANNERS.items():
+            planner = planner_cls()
+            for _ in range(warmup):
+                planner.plan(mall, start, stores[0])
+            for _ in range(repeats):
+                for store in stores:
+                    t, (_, n) = timed(planner.plan, mall, start, store)
+                    samples[name].append(t)
+                    expanded[name].append(n)
+
+        planner = MultiGoalAStarPlanner()
+        for _ in range(warmup):
+            planner.plan(mall, start, stores)
+        for _ in range(repeats):
+            t, (_, n) = timed(planner.plan, mall, start, stores)
+            samples["mgastar"].append(t)
+            expanded["mgastar"].append(n)
+
+    return {name: summarize(values, expanded[name]) for name, values in samples.items() if values}
+
+
+def run(sweeps, seeds, warmup, repeats, queries, log=print):
+    results = []
+    for sweep in sweeps:
+        values, apply = SWEEPS[sweep]
+        for value in values:
+            cfg = dict(BASE_CONFIG, **apply(value))
+            t0 = time.perf_counter()
+            for component, row in bench_point(cfg, seeds, warmup, repeats, queries).items():
+                results.append(dict(sweep=sweep, value=value, component=component, config=cfg, **row))
+            log(f"{sweep:<10} {str(value):>6}  done in {time.perf_counter() - t0:6.2f}s")
+    return results
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Rows of (result, baseline row, ratio, regressed) for points present in both."""
+    old = {(r["sweep"], json.dumps(r["value"]), r["component"]): r for r in baseline["results"]}
+    rows = []
+    for r in results:
+        b = old.get((r["sweep"], json.dumps(r["value"]), r["component"]))
+        if b is None:
+            continue
+        ratio = r["p50"] / b["p50"] if b["p50"] > 0 else float("inf")
+        regressed = ratio > 1 + threshold and r["p50"] - b["p50"] > min_delta
+        rows.append((r, b, ratio, regressed))
+    return rows
+
+
+def print_table(results):
+    print(f"\n{'Sweep':<10} {'Value':>6} {'Component':<14} {'p50(ms)':>10} {'p90(ms)':>10} "
+          f"{'p99(ms)':>10} {'Expanded':>10}")
+    for r in results:
+        exp = f"{r['expanded_mean']:10.1f}" if "expanded_mean" in r else f"{'':>10}"
+        print(f"{r['sweep']:<10} {str(r['value']):>6} {r['component']:<14} {r['p50'] * 1e3:10.3f} "
+              f"{r['p90'] * 1e3:10.3f} {r['p99'] * 1e3:10.3f} {exp}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for generation and planners.")
+    parser.add_argument("--sweeps", default=",".join(SWEEPS),
+                        help=f"comma-separated subset of {', '.join(SWEEPS)}")
+    parser.add_argument("--seeds", type=int, default=3, help="malls per point")
+    parser.add_argument("--warmup", type=int, default=1, help="unrecorded runs per measurement")
+    parser.add_argument("--repeats", type=int, default=3, help="recorded runs per measurement")
+    parser.add_argument("--queries", type=int, default=10, help="start -> store queries per mall")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative p50 growth that counts as a regression")
+    parser.add_argument("--min-delta", type=float, default=5e-4,
+                        help="absolute p50 growth (s) below which nothing is flagged")
+    args = parser.parse_args(argv)
+
+    sweeps = [s for s in args.sweeps.split(",") if s]
+    unknown = [s for s in sweeps if s not in SWEEPS]
+    if unknown:
+        parser.error(f"unknown sweep(s): {', '.join(unknown)}")
+
+    results = run(sweeps, list(range(args.seeds)), args.warmup, args.repeats, args.queries)
+    print_table(results)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "base_config": BASE_CONFIG,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nWrote {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold, args.min_delta)
+    regressions = [row for row in rows if row[3]]
+    print(f"\nCompared {len(rows)} points with {args.baseline}")
+    for r, b, ratio, regressed in rows:
+        if regressed or ratio < 1 - args.threshold:
+            tag = "REGRESSION" if regressed else "improved"
+            print(f"  {tag:<10} {r['sweep']:<10} {str(r['value']):>6} {r['component']:<14} "
+                  f"p50 {b['p50'] * 1e3:.3f} -> {r['p50'] * 1e3:.3f} ms (x{ratio:.2f})")
+    print(f"{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
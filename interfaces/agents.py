@@ -3,5 +3,5 @@ class Agent:
         self.agent_pos = []
         self.expanded_nodes = 0
 
-    def run(self, env, start_node, goal_nodes):
+    def run(self, env, start_node, goal_nodes, stats=None):
             raise NotImplementedError
\ No newline at end of file
@@ -1,3 +1,5 @@
 class Edge:
+    __slots__ = ("weight",)
+
     def __init__(self, weight: float = 1.0):
-        self.weight = weight
\ No newline at end of file
+        self.weight = weight
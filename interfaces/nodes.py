@@ -1,19 +1,25 @@
 from typing import List
 from nodecomponents.neighbors import Neighbor
 
+# bits per coordinate in Node.key; keeps (row, column, f_number) order
+KEY_BITS = 21
+KEY_MASK = (1 << KEY_BITS) - 1
+
 class Node:
-    
+    __slots__ = ("row", "column", "f_number", "name", "node_type", "neighbors", "key")
+
     def __init__(self, row: int, column: int, f_number: int = 0, name: str = "", node_type: str = "generic"):
         self.row = row
         self.column = column
         self.f_number = f_number
         self.name = name  
         self.node_type = node_type  # e.g., "store", "elevator", "hallway"
-        self.visited = False
         self.neighbors: List[Neighbor] = []
+        # packed (row, column, f_number), used for hashing and ordering
+        self.key = (row << (2 * KEY_BITS)) | (column << KEY_BITS) | f_number
 
     def add_neighbor(self, direction: str, node: "Node", weight: float = 1.0):
-        self.neighbors.append(Neighbor(direction, node, weight = 1.0))
+        self.neighbors.append(Neighbor(direction, node, weight = weight))
 
     def remove_neighbor(self, direction: str):
         self.neighbors = [n for n in self.neighbors if n.direction != direction]
@@ -24,10 +30,12 @@ class Node:
 
     ## For A* algorithm, comparison methods for the priority queue    
     def __lt__(self, other):
-        return (self.row, self.column, self.f_number) < (other.row, other.column, other.f_number)
+        return self.key < other.key
     
     def __eq__(self, other):
-        return (self.row, self.column, self.f_number) == (other.row, other.column, other.f_number)
+        if not isinstance(other, Node):
+            return NotImplemented
+        return self.key == other.key
 
     def __hash__(self):
-        return hash((self.row, self.column, getattr(self, 'f_number', 0)))
+        return self.key
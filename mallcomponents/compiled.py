@@ -0,0 +1,221 @@
+from array import array
+import numpy as np
+from utils.bucket_queue import integer_scale
+
+NODE_TYPES = ("generic", "start", "store", "elevator", "stairs", "obstacle")
+DIRECTIONS = ("up", "down", "left", "right", "up_floor", "down_floor", "up_stairs", "down_stairs")
+
+TYPE_CODES = {name: code for code, name in enumerate(NODE_TYPES)}
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTIONS)}
+
+
+class CompiledMall:
+    """
+    Frozen, array-backed view of a Mall's node graph.
+
+    Every cell of every floor gets a dense integer id
+
+        id = (row * columns + column) * num_floors + f_number
+
+    so integer order matches Node.__lt__ and planners break heap ties
+    exactly like they did on Node objects. Outgoing edges are stored in
+    CSR form: the links of node u are targets[offsets[u]:offsets[u + 1]]
+    with matching weights/directions. A reverse CSR (rev_offsets,
+    rev_sources, rev_edges) lists the incoming edges of each node as
+    indexes into the forward arrays.
+
+    The NumPy arrays are the compact storage; planners read the cached
+    array.array mirrors from adjacency()/reverse_adjacency(), which index
+    element by element from Python as fast as lists (NumPy scalars are
+    much slower) while keeping 4-8 bytes per entry instead of a pointer
+    plus a boxed int or float. The Node objects stay with the Mall, which
+    edits through them; nodes only points at them.
+    """
+
+    def __init__(self, num_floors: int, rows: int, columns: int,
+                 offsets, targets, weights, directions, types, nodes=None):
+        self.num_floors = num_floors
+        self.rows = rows
+        self.columns = columns
+        self.num_nodes = rows * columns * num_floors
+
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.directions = np.asarray(directions, dtype=np.uint8)
+        self.types = np.asarray(types, dtype=np.uint8)
+
+        # id -> (row, column, f_number); derived from the id layout
+        ids = np.arange(self.num_nodes, dtype=np.int64)
+        self.floor_of = (ids % num_floors).astype(np.int32)
+        self.column_of = ((ids // num_floors) % columns).astype(np.int32)
+        self.row_of = (ids // (num_floors * columns)).astype(np.int32)
+
+        # id -> Node, only kept for turning id paths back into display paths
+        self.nodes = nodes
+
+        # bumped by every in-place edit, so caches built on the view can tell
+        self.version = 0
+
+        self._build_reverse()
+        self._lists = None
+        self._reverse_lists = None
+        self._scaled = None
+        self._reverse_scaled = None
+
+    @classmethod
+    def from_mall(cls, mall) -> "CompiledMall":
+        """Freezes the current object graph of mall."""
+        num_floors, rows, columns = mall.num_floors, mall.rows, mall.columns
+        n = rows * columns * num_floors
+
+        def node_id(node):
+            return (node.row * columns + node.column) * num_floors + node.f_number
+
+        nodes = [None] * n
+        for floor in mall.floors:
+            for row in floor.grid:
+                for node in row:
+                    nodes[node_id(node)] = node
+
+        offsets = [0] * (n + 1)
+        targets, weights, directions = [], [], []
+        types = [TYPE_CODES["obstacle"]] * n
+
+        for u in range(n):
+            node = nodes[u]
+            if node is not None:
+                types[u] = TYPE_CODES.get(node.node_type, TYPE_CODES["generic"])
+                for link in node.get_neighbors():
+                    if link.node.node_type == "obstacle":
+                        continue
+                    targets.append(node_id(link.node))
+                    weights.append(link.weight)
+                    directions.append(DIRECTION_CODES[link.direction])
+            offsets[u + 1] = len(targets)
+
+        return cls(num_floors, rows, columns, offsets, targets, weights,
+                   directions, types, nodes=nodes)
+
+    def _build_reverse(self):
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int32),
+                            np.diff(self.offsets))
+        order = np.argsort(self.targets, kind="stable")
+        counts = np.bincount(self.targets, minlength=self.num_nodes)
+
+        self.rev_offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.rev_offsets[1:])
+        self.rev_sources = sources[order]
+        self.rev_edges = order.astype(np.int64)
+        # forward edge index -> its slot in the reverse arrays
+        self.rev_slot = np.empty_like(self.rev_edges)
+        self.rev_slot[self.rev_edges] = np.arange(len(self.rev_edges), dtype=np.int64)
+
+    def id_of(self, node) -> int:
+        return (node.row * self.columns + node.column) * self.num_floors + node.f_number
+
+    def node_of(self, node_id: int):
+        return self.nodes[node_id] if self.nodes is not None else None
+
+    def to_nodes(self, ids):
+        """Maps a path of ids back onto the Node objects it was compiled from."""
+        return [self.nodes[i] for i in ids]
+
+    def type_name(self, node_id: int) -> str:
+        return NODE_TYPES[self.types[node_id]]
+
+    def adjacency(self):
+        """Returns cached (offsets, targets, weights, rows, columns) as array.array mirrors."""
+        if self._lists is None:
+            self._lists = (
+                array("q", self.offsets.tobytes()),
+                array("i", self.targets.tobytes()),
+                array("d", self.weights.tobytes()),
+                array("i", self.row_of.tobytes()),
+                array("i", self.column_of.tobytes()),
+            )
+        return self._lists
+
+    def reverse_adjacency(self):
+        """Returns cached (rev_offsets, rev_sources, rev_weights) as array.array mirrors."""
+        if self._reverse_lists is None:
+            self._reverse_lists = (
+                array("q", self.rev_offsets.tobytes()),
+                array("i", self.rev_sources.tobytes()),
+                array("d", self.weights[self.rev_edges].tobytes()),
+            )
+        return self._reverse_lists
+
+    def scaled_weights(self, reverse: bool = False):
+        """
+        Returns cached (scale, weights): the forward edge weights times the
+        smallest power of two that makes every finite one an integer, as a
+        list of ints (inf stays inf). With reverse=True the weights are in
+        reverse-CSR order, matching reverse_adjacency(). (None, None) if
+        the weights have no such scale. Used by the bucket-queue searches.
+        """
+        if self._scaled is None:
+            scale = integer_scale(self.weights)
+            if scale is None:
+                self._scaled = (None, None)
+            else:
+                self._scaled = (scale, [int(w * scale) if w != float('inf') else w
+                                        for w in self.weights.tolist()])
+        if not reverse:
+            return self._scaled
+        if self._reverse_scaled is None:
+            scale, scaled = self._scaled
+            self._reverse_scaled = (scale, None if scale is None
+                                    else [scaled[edge] for edge in self.rev_edges.tolist()])
+        return self._reverse_scaled
+
+    def set_weight(self, u: int, v: int, weight: float) -> bool:
+        """Sets the weight of the u -> v edge(s); returns whether any exist."""
+        changed = False
+        for edge in range(int(self.offsets[u]), int(self.offsets[u + 1])):
+            if self.targets[edge] == v:
+                self._write_weight(edge, weight)
+                changed = True
+        return changed
+
+    def block_node(self, node_id: int):
+        """
+        Turns node_id into an obstacle by giving every edge into or out of
+        it an infinite weight. Returns the (u, v) pairs that changed.
+        """
+        changed = []
+        for edge in range(int(self.offsets[node_id]), int(self.offsets[node_id + 1])):
+            if self.weights[edge] != float('inf'):
+                self._write_weight(edge, float('inf'))
+                changed.append((node_id, int(self.targets[edge])))
+
+        for slot in range(int(self.rev_offsets[node_id]), int(self.rev_offsets[node_id + 1])):
+            edge = int(self.rev_edges[slot])
+            if self.weights[edge] != float('inf'):
+                self._write_weight(edge, float('inf'))
+                changed.append((int(self.rev_sources[slot]), node_id))
+
+        self.types[node_id] = TYPE_CODES["obstacle"]
+        self.version += 1
+        return changed
+
+    def _write_weight(self, edge: int, weight: float):
+        self.version += 1
+        self.weights[edge] = weight
+        self._scaled = None
+        self._reverse_scaled = None
+        if self._lists is not None:
+            self._lists[2][edge] = weight
+        if self._reverse_lists is not None:
+            self._reverse_lists[2][self.rev_slot[edge]] = weight
+
+    def memory_bytes(self) -> int:
+        """
+        Size of the array storage plus whichever adjacency mirrors have been
+        built (excluding the Node objects and the bucket-queue weight lists).
+        """
+        arrays = (self.offsets, self.targets, self.weights, self.directions, self.types,
+                  self.floor_of, self.row_of, self.column_of,
+                  self.rev_offsets, self.rev_sources, self.rev_edges, self.rev_slot)
+        mirrors = (self._lists or ()) + (self._reverse_lists or ())
+        return sum(a.nbytes for a in arrays) + sum(m.itemsize * len(m) for m in mirrors)
@@ -0,0 +1,351 @@
+import numpy as np
+from mallcomponents.compiled import TYPE_CODES, DIRECTION_CODES
+
+# edge kinds, for the portal throughput limits
+WALK, ELEVATOR, STAIRS = 0, 1, 2
+
+
+class CrowdSimulation:
+    """
+    Tick-based movement of many shoppers through one mall.
+
+    Every shopper follows a precomputed node path from its start through
+    its shopping list, read off the mall's cached per-store flow fields
+    (see Mall.flow_field), so planning costs one reverse Dijkstra per
+    store rather than one search per shopper. Time
+    advances in ticks of 1 / ticks_per_unit cost units, so with the
+    default of 2 a floor step takes 2 ticks, an elevator ride 3 and a
+    stair flight 5. All state lives in NumPy arrays indexed by shopper,
+    and a tick is a fixed number of array operations no matter how many
+    shoppers there are.
+
+    Congestion is modelled as throughput:
+      - cell_capacity      shoppers that may enter one cell per tick
+                           (stores and the start cell are unlimited)
+      - elevator_capacity  shoppers that may leave one elevator cell for
+                           another floor per tick
+      - stairs_capacity    the same for a stair cell
+    Shoppers that are not admitted wait where they are and try again the
+    next tick, in a random order so nobody is starved. Limits on entries
+    rather than on standing occupancy cannot deadlock two crowds walking
+    into each other. occupancy counts the shoppers on (or walking into)
+    each cell.
+
+    Paths are kept in one flat buffer (node, outgoing edge, owner and
+    store-stop flag per position); a shopper is a [step, end] slice of it.
+    apply_changes() takes the (u, v) edges a mall edit returns and replans
+    only the shoppers whose remaining path uses one of them; the mall has
+    already dropped the flow fields the edit touched, so only those are
+    rebuilt.
+    """
+
+    def __init__(self, mall, cell_capacity: int = 2, elevator_capacity: int = 4,
+                 stairs_capacity: int = 2, ticks_per_unit: int = 2, dwell: int = 0,
+                 seed: int = 0):
+        self.mall = mall
+        self.graph = graph = mall.compile()
+        self.ticks_per_unit = ticks_per_unit
+        self.dwell = dwell
+        self.rng = np.random.default_rng(seed)
+        self.time = 0
+
+        n = graph.num_nodes
+        # (u, v) -> edge index, through sorted u * n + v keys
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(graph.offsets))
+        keys = sources * n + graph.targets
+        self.edge_order = np.argsort(keys, kind="stable")
+        self.edge_keys = keys[self.edge_order]
+
+        self.edge_kind = np.full(len(graph.targets), WALK, dtype=np.int8)
+        directions = graph.directions
+        for name in ("up_floor", "down_floor"):
+            self.edge_kind[directions == DIRECTION_CODES[name]] = ELEVATOR
+        for name in ("up_stairs", "down_stairs"):
+            self.edge_kind[directions == DIRECTION_CODES[name]] = STAIRS
+        unlimited = np.iinfo(np.int32).max
+        self.kind_capacity = np.array([unlimited, elevator_capacity, stairs_capacity], dtype=np.int64)
+
+        self.capacity = np.full(n, cell_capacity, dtype=np.int64)
+        for name in ("store", "start"):
+            self.capacity[graph.types == TYPE_CODES[name]] = unlimited
+        self.occupancy = np.zeros(n, dtype=np.int64)
+
+        # path buffer, one entry per path position
+        self.path_node = np.zeros(0, dtype=np.int64)
+        self.path_edge = np.zeros(0, dtype=np.int64)    # edge to the next position, -1 at the end
+        self.path_owner = np.zeros(0, dtype=np.int64)
+        self.path_stop = np.zeros(0, dtype=bool)         # a store on the shopper's list
+
+        # per shopper
+        self.node = np.zeros(0, dtype=np.int64)          # cell it is on or walking into
+        self.previous = np.zeros(0, dtype=np.int64)      # cell it last left, -1 before its first step
+        self.step = np.zeros(0, dtype=np.int64)          # buffer position of node
+        self.end = np.zeros(0, dtype=np.int64)           # buffer position of its last cell
+        self.remaining = np.zeros(0, dtype=np.int64)     # ticks until it reaches node
+        self.active = np.zeros(0, dtype=bool)
+        self.stranded = np.zeros(0, dtype=bool)          # no path left after an edit
+        self.waited = np.zeros(0, dtype=np.int64)        # ticks spent not admitted
+        self.finished_at = np.zeros(0, dtype=np.int64)   # tick it reached its last store, -1 before
+
+    def __len__(self):
+        return len(self.node)
+
+    # --- planning -----------------------------------------------------------
+
+    def add_shoppers(self, starts, shopping_lists) -> np.ndarray:
+        """
+        Adds one shopper per (start node, list of store nodes), visiting
+        the stores in list order. Returns the new shopper ids; shoppers
+        that cannot reach their stores are added as stranded.
+        """
+        graph = self.graph
+        first = len(self)
+        count = len(starts)
+        ids = np.arange(first, first + count, dtype=np.int64)
+
+        self.check_graph()
+        self.node = np.concatenate([self.node, [graph.id_of(s) for s in starts]]).astype(np.int64)
+        for name, fill, dtype in (("previous", -1, np.int64), ("step", 0, np.int64), ("end", 0, np.int64),
+                                  ("remaining", 0, np.int64), ("active", True, bool),
+                                  ("stranded", False, bool), ("waited", 0, np.int64),
+                                  ("finished_at", -1, np.int64)):
+            setattr(self, name, np.concatenate([getattr(self, name), np.full(count, fill, dtype=dtype)]))
+        np.add.at(self.occupancy, self.node[ids], 1)
+
+        routes = [[graph.id_of(store) for store in stores] for stores in shopping_lists]
+        self._assign(ids, routes)
+        return ids
+
+    def _assign(self, shoppers, routes):
+        """Plans node[a] -> routes[i] for every shopper a and writes the paths."""
+        legs = set()
+        for a, route in zip(shoppers.tolist(), routes):
+            previous = int(self.node[a])
+            for store in route:
+                legs.add((previous, store))
+                previous = store
+        answers = self._leg_paths(legs)
+
+        nodes, stops, owners = [], [], []
+        placed, starts, ends, failed = [], [], [], []
+        offset = len(self.path_node)
+        for a, route in zip(shoppers.tolist(), routes):
+            previous = int(self.node[a])
+            path, stop = [previous], [False]
+            for store in route:
+                leg = answers.get((previous, store))
+                if leg is None:
+                    failed.append(a)
+                    break
+                path.extend(leg[1:])
+                stop.extend([False] * (len(leg) - 1))
+                stop[-1] = True
+                previous = store
+            else:
+                placed.append(a)
+                starts.append(offset)
+                ends.append(offset + len(path) - 1)
+                nodes.extend(path)
+                stops.extend(stop)
+                owners.extend([a] * len(path))
+                offset += len(path)
+
+        self._append(np.asarray(nodes, dtype=np.int64), np.asarray(stops, dtype=bool),
+                     np.asarray(owners, dtype=np.int64))
+        self.step[placed] = starts
+        self.end[placed] = ends
+
+        if failed:
+            failed = np.asarray(failed, dtype=np.int64)
+            failed = failed[self.active[failed]]
+            self.active[failed] = False
+            self.stranded[failed] = True
+            np.subtract.at(self.occupancy, self.node[failed], 1)
+        self._compact()
+
+    def _leg_paths(self, legs) -> dict:
+        """{(source, store): id path} for the reachable legs, one flow field per store."""
+        by_store = {}
+        for source, store in legs:
+            by_store.setdefault(store, []).append(source)
+        cache = self.mall.flow_field_cache()
+        answers = {}
+        for store, sources in by_store.items():
+            for source, path in zip(sources, cache.get(store).paths(sources)):
+                if path:
+                    answers[(source, store)] = path
+        return answers
+
+    def _append(self, nodes, stops, owners):
+        edges = np.full(len(nodes), -1, dtype=np.int64)
+        if len(nodes) > 1:
+            inner = np.flatnonzero(owners[1:] == owners[:-1])
+            n = self.graph.num_nodes
+            keys = nodes[inner] * n + nodes[inner + 1]
+            edges[inner] = self.edge_order[np.searchsorted(self.edge_keys, keys)]
+        self.path_node = np.concatenate([self.path_node, nodes])
+        self.path_edge = np.concatenate([self.path_edge, edges])
+        self.path_owner = np.concatenate([self.path_owner, owners])
+        self.path_stop = np.concatenate([self.path_stop, stops])
+
+    def _compact(self):
+        """Drops buffer positions no active shopper can reach any more."""
+        owner = self.path_owner
+        position = np.arange(len(owner))
+        live = self.active[owner] & (position >= self.step[owner]) & (position <= self.end[owner])
+        if np.count_nonzero(live) * 2 >= len(owner):
+            return
+        new_index = np.cumsum(live) - 1
+        active = np.flatnonzero(self.active)
+        self.step[active] = new_index[self.step[active]]
+        self.end[active] = new_index[self.end[active]]
+        self.path_node = self.path_node[live]
+        self.path_edge = self.path_edge[live]
+        self.path_owner = owner[live]
+        self.path_stop = self.path_stop[live]
+
+    def check_graph(self):
+        """Raises RuntimeError if the mall was recompiled since the simulation was created."""
+        if self.mall.compile() is not self.graph:
+            raise RuntimeError("The mall was recompiled; its edges no longer match this CrowdSimulation.")
+
+    def apply_changes(self, changed) -> np.ndarray:
+        """
+        Replans the shoppers whose remaining path uses one of the changed
+        (u, v) edges (as returned by Mall.place_obstacle, set_edge_weight
+        and close_elevator). Paths that only missed a newly cheaper edge
+        are kept. Shoppers on (or walking into) a cell that became an
+        obstacle step back to the cell they came from (a free neighbor
+        if they have not moved yet) and are replanned from there; only
+        those without such a cell end up stranded. Returns the replanned
+        shopper ids.
+        """
+        self.check_graph()
+        if not changed:
+            return np.zeros(0, dtype=np.int64)
+        evicted = self._evict()
+        n = self.graph.num_nodes
+        keys = np.array([u * n + v for u, v in changed], dtype=np.int64)
+        slots = np.minimum(np.searchsorted(self.edge_keys, keys), len(self.edge_keys) - 1)
+        edges = self.edge_order[slots[self.edge_keys[slots] == keys]]
+
+        positions = np.flatnonzero(np.isin(self.path_edge, edges))
+        owners = self.path_owner[positions]
+        hit = self.active[owners] & (positions >= self.step[owners]) & (positions < self.end[owners])
+        shoppers = np.union1d(owners[hit], evicted)
+        if len(shoppers):
+            self.replan(shoppers)
+        return shoppers
+
+    def _evict(self) -> np.ndarray:
+        """Moves the active shoppers off cells that became obstacles; returns their ids."""
+        graph = self.graph
+        obstacle = TYPE_CODES["obstacle"]
+        evicted = np.flatnonzero(self.active & (graph.types[self.node] == obstacle))
+        for a in evicted.tolist():
+            node = int(self.node[a])
+            back = int(self.previous[a])
+            if back < 0 or graph.types[back] == obstacle:
+                free = [int(v) for v in graph.targets[graph.offsets[node]:graph.offsets[node + 1]]
+                        if graph.types[v] != obstacle]
+                back = free[0] if free else node
+            self.occupancy[node] -= 1
+            self.occupancy[back] += 1
+            self.node[a] = back
+            self.previous[a] = node
+            self.remaining[a] = self.ticks_per_unit if back != node else 0
+        return evicted
+
+    def replan(self, shoppers):
+        """Plans new paths from where the shoppers are through their stores not yet reached."""
+        self.check_graph()
+        shoppers = np.asarray(shoppers, dtype=np.int64)
+        stops = np.flatnonzero(self.path_stop)
+        owners = self.path_owner[stops]
+        wanted = np.isin(owners, shoppers) & (stops > self.step[owners]) & (stops <= self.end[owners])
+        routes = {a: [] for a in shoppers.tolist()}
+        for a, node in zip(owners[wanted].tolist(), self.path_node[stops[wanted]].tolist()):
+            routes[a].append(node)
+        self._assign(shoppers, [routes[a] for a in shoppers.tolist()])
+
+    # --- simulation ---------------------------------------------------------
+
+    def tick(self) -> dict:
+        """Advances every shopper by one tick and returns the tick's counts."""
+        self.time += 1
+        remaining = self.remaining
+        np.subtract(remaining, 1, out=remaining, where=remaining > 0)
+
+        ready = self.active & (remaining == 0)
+        arrived = ready & (self.step == self.end)
+        finished = np.flatnonzero(arrived)
+        if len(finished):
+            self.active[finished] = False
+            self.finished_at[finished] = self.time
+            np.subtract.at(self.occupancy, self.node[finished], 1)
+
+        shoppers = np.flatnonzero(ready & ~arrived)
+        # random order, then first come first served within every limit
+        shoppers = shoppers[self.rng.permutation(len(shoppers))]
+        position = self.step[shoppers]
+        edge = self.path_edge[position]
+        current = self.path_node[position]
+        following = self.path_node[position + 1]
+        weight = self.graph.weights[edge]
+
+        admitted = np.isfinite(weight)
+        kind = self.edge_kind[edge]
+        portal = admitted & (kind != WALK)
+        if portal.any():
+            admitted[portal] = _admit(current[portal], self.kind_capacity[kind[portal]])
+        if admitted.any():
+            admitted[admitted] = _admit(following[admitted], self.capacity[following[admitted]])
+
+        moving = shoppers[admitted]
+        blocked = shoppers[~admitted]
+        self.waited[blocked] += 1
+        if len(moving):
+            position = position[admitted] + 1
+            np.subtract.at(self.occupancy, current[admitted], 1)
+            np.add.at(self.occupancy, following[admitted], 1)
+            duration = np.maximum(np.ceil(weight[admitted] * self.ticks_per_unit), 1).astype(np.int64)
+            if self.dwell:
+                duration += self.dwell * self.path_stop[position]
+            self.step[moving] = position
+            self.previous[moving] = current[admitted]
+            self.node[moving] = following[admitted]
+            remaining[moving] = duration
+
+        return {
+            "tick": self.time,
+            "moved": len(moving),
+            "blocked": len(blocked),
+            "finished": len(finished),
+            "active": int(np.count_nonzero(self.active)),
+        }
+
+    def run(self, ticks: int = None) -> int:
+        """Ticks until every shopper is done (or for at most ticks ticks); returns ticks run."""
+        count = 0
+        while self.active.any() and (ticks is None or count < ticks):
+            self.tick()
+            count += 1
+        return count
+
+
+def _admit(keys, limits) -> np.ndarray:
+    """
+    For candidates in priority order, True for the first limits[i]
+    candidates of every key (all candidates with the same key share one
+    limit).
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    first = np.empty(len(order), dtype=bool)
+    first[:1] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=first[1:])
+    group_start = np.flatnonzero(first)
+    rank = np.arange(len(order)) - np.repeat(group_start, np.diff(np.append(group_start, len(order))))
+    admitted = np.empty(len(order), dtype=bool)
+    admitted[order] = rank < limits[order]
+    return admitted
@@ -0,0 +1,101 @@
+import numpy as np
+from algorithms.dijkstra import shortest_distances
+from mallcomponents.compiled import TYPE_CODES
+from utils.search_stats import SearchStats
+
+class DistanceTable:
+    """
+    Lazily filled table of exact network distances and shortest paths
+    between the mall's points of interest (start node, stores, elevators,
+    stairs).
+
+    The first lookup from a source runs one single-source Dijkstra and
+    keeps its distance and parent arrays; later lookups are O(1) array
+    reads. A row asked for with targets stops once they are all settled,
+    and then answers exactly every node no farther than the farthest of
+    them (its radius); a lookup beyond that re-runs the row in full.
+    fill() computes every POI row up front, and expansions() reports
+    what the rows for a set of nodes cost. The table belongs to one
+    compiled graph and is dropped by the Mall whenever the mall is edited.
+    """
+
+    POI_TYPES = ("start", "store", "elevator", "stairs")
+
+    def __init__(self, graph):
+        self.graph = graph
+        codes = {TYPE_CODES[name] for name in self.POI_TYPES}
+        self.pois = [v for v, t in enumerate(graph.types.tolist()) if t in codes]
+        self.rows = {}      # source id -> (distance array, parent array)
+        self.radius = {}    # source id -> distance up to which its row is exact
+        self.settled = {}   # source id -> nodes its Dijkstra expanded
+
+    def _row(self, source: int, targets=None):
+        """
+        The row of source, exact at least for targets (every node if
+        None); computed, or re-run in full, when the cached one is not.
+        """
+        row = self.rows.get(source)
+        if row is not None:
+            radius = self.radius[source]
+            if radius == float('inf') or (targets is not None
+                                          and (row[0][list(targets)] <= radius).all()):
+                return row
+            targets = None
+
+        stats = SearchStats()
+        distance, parent = shortest_distances(self.graph, source, with_parents=True,
+                                              until=targets, stats=stats)
+        row = (np.asarray(distance, dtype=np.float64), np.asarray(parent, dtype=np.int32))
+        self.rows[source] = row
+        self.settled[source] = stats.expansions
+        # a search stopped early has settled everything up to its last target;
+        # one with an unreachable target ran to the end
+        reached = row[0][list(targets)] if targets is not None else ()
+        self.radius[source] = (float(reached.max()) if len(reached) and np.isfinite(reached).all()
+                               else float('inf'))
+        return row
+
+    def fill(self):
+        """Computes the rows of every point of interest."""
+        for source in self.pois:
+            self._row(source)
+        return self
+
+    def distance(self, node_a, node_b) -> float:
+        """Shortest network distance from node_a to node_b (inf if unreachable)."""
+        target = self.graph.id_of(node_b)
+        distance, _ = self._row(self.graph.id_of(node_a), [target])
+        return float(distance[target])
+
+    def path(self, node_a, node_b) -> list:
+        """Shortest path from node_a to node_b as Node objects ([] if unreachable)."""
+        source, target = self.graph.id_of(node_a), self.graph.id_of(node_b)
+        distance, parent = self._row(source, [target])
+        if distance[target] == float('inf'):
+            return []
+
+        path = [target]
+        while path[-1] != source:
+            path.append(int(parent[path[-1]]))
+        return self.graph.to_nodes(path[::-1])
+
+    def expansions(self, nodes) -> int:
+        """
+        Nodes expanded by the Dijkstra rows of nodes as cached (full rows
+        for nodes without one), counting rows that were already cached
+        too, so callers asking for the same rows report the same work
+        whichever of them filled the table first.
+        """
+        ids = {self.graph.id_of(n) for n in nodes}
+        for source in ids:
+            if source not in self.rows:
+                self._row(source)
+        return sum(self.settled[source] for source in ids)
+
+    def matrix(self, nodes) -> np.ndarray:
+        """
+        Pairwise distance matrix between nodes (rows are sources); each
+        row only searches until the other nodes are settled.
+        """
+        ids = [self.graph.id_of(n) for n in nodes]
+        return np.array([self._row(a, ids)[0][ids] for a in ids])
@@ -1,14 +1,13 @@
 import random
-from collections import deque
 from interfaces.nodes import Node
 from mallcomponents.node_connectivity import * # type: ignore
 from nodecomponents.stores import Store
 from nodecomponents.static_obstacles import Obstacle
-from mallcomponents.node_connectivity import is_fully_connected_3d
+from mallcomponents.node_connectivity import can_block_node, replace_cell
 
 class Floor():
 
-    def __init__(self, rows: int, columns: int, f_number: int = 0):
+    def __init__(self, rows: int, columns: int, f_number: int = 0, grid: list = None):
         self.rows = rows
         self.columns = columns
         self.f_number = f_number
@@ -16,11 +15,17 @@ class Floor():
 
 
         self.perimeter: list[Node] = [] 
+        self.perimeter_index = {}   # (row, column) -> its positions in perimeter
         self.stores = []  
         self.elevators = [] 
         self.stairs = [] 
 
-        # Generating floor grid #
+        # Generating floor grid (or adopting an already linked one) #
+        if grid is not None:
+            self.grid = grid
+            self.build_perimeter_list()
+            return
+
         self.grid = [[Node(i, j, self.f_number) for j in range(self.columns)] for i in range(self.rows)]
         self.build_perimeter_list()
 
@@ -41,6 +46,10 @@ class Floor():
             self.perimeter.append(self.grid[i][0])                  # left col
             self.perimeter.append(self.grid[i][self.columns - 1])   # right col
 
+        self.perimeter_index = {}
+        for index, node in enumerate(self.perimeter):
+            self.perimeter_index.setdefault((node.row, node.column), []).append(index)
+
 
     def get_node(self, row: int, column: int) -> Node:
         if 0 <= row < self.rows and 0 <= column < self.columns:
@@ -49,6 +58,18 @@ class Floor():
             raise IndexError("Node coordinates out of bounds")
 
 
+    def replace_node(self, row: int, column: int, node: Node):
+        """
+        Puts node into the grid at (row, column) and updates only the links
+        (and perimeter entry) of that cell, instead of reconnecting the floor.
+        """
+        old = self.grid[row][column]
+        self.grid[row][column] = node
+        for index in self.perimeter_index.get((row, column), ()):
+            self.perimeter[index] = node
+        replace_cell(self.grid, old, node, self.rows, self.columns)
+
+
     def place_stores(self, count: int):
         valid_spots = [
             node for node in self.perimeter
@@ -61,11 +82,9 @@ class Floor():
 
         for index, node in enumerate(valid_spots[:count]):
             store = Store(node.row, node.column, self.f_number, name=f"Store-{index}", has_goal_item=False)
-            self.grid[node.row][node.column] = store
+            self.replace_node(node.row, node.column, store)
             self.stores.append(store)
 
-        connect_nodes(self.grid, self.rows, self.columns)
-
 
     def place_agent_start(self):
         valid_spots = [
@@ -87,11 +106,17 @@ class Floor():
 
 
     def place_obstacles(self, count: int, all_stores: list[Store], start_node: Node):
-
+        """
+        Places up to count obstacles on interior generic nodes, skipping any
+        candidate that would cut a store off from start_node. Each candidate
+        is checked with can_block_node, which only explores the region around
+        it, so placement no longer re-floods the whole mall per obstacle.
+        Call after stores, elevators and stairs are linked.
+        """
         viable_nodes = []
-        for row in self.grid:
-            for node in row:
-                if node.node_type == "generic" and node not in self.perimeter:
+        for row in self.grid[1:self.rows - 1]:
+            for node in row[1:self.columns - 1]:
+                if node.node_type == "generic":
                     viable_nodes.append(node)
 
         # Filter out nodes that block store/start/elevator/stair entries
@@ -103,61 +128,43 @@ class Floor():
         ]
 
         random.shuffle(viable_nodes)
+        required = set(all_stores)
+        required.add(start_node)
         placed = 0
 
         for node in viable_nodes:
             if placed >= count:
                 break
-            r, c = node.row, node.column
 
-            original = self.grid[r][c]
-            obstacle = Obstacle(r, c, self.f_number)
-            self.grid[r][c] = obstacle
-
-            if is_fully_connected_3d(start_node, all_stores):
-                placed += 1
-            else:
-                self.grid[r][c] = original
+            if not can_block_node(node, required):
+                continue
 
+            r, c = node.row, node.column
+            self.replace_node(r, c, Obstacle(r, c, self.f_number))
+            placed += 1
 
         return placed
 
 
     def place_single_obstacle(self, row: int, column: int, start: Node, stores: list[Store]) -> bool:
-        
-        # Temporarily place obstacle
-        original = self.grid[row][column]
-        obstacle = Obstacle(row, column, self.f_number)
-        self.grid[row][column] = obstacle
-
-        # Remove node from neighbors neighbor lists (outgoing edges)
-        for neighbor_link in original.get_neighbors():
-            neighbor = neighbor_link.node
-            reverse_dir = {
-                "up": "down", "down": "up",
-                "left": "right", "right": "left"
-            }.get(neighbor_link.direction)
-            if reverse_dir:
-                neighbor.remove_neighbor(reverse_dir)
-                neighbor.add_neighbor(reverse_dir, obstacle)
-
-        # Check connectivity
-        if is_fully_connected(start, stores, self.grid):
-            return True
-        else:
-            # Revert obstacle placement and restore neighbor links
-            for neighbor_link in original.get_neighbors():
-                neighbor = neighbor_link.node
-                reverse_dir = {
-                    "up": "down", "down": "up",
-                    "left": "right", "right": "left"
-                }.get(neighbor_link.direction)
-                if reverse_dir:
-                    neighbor.remove_neighbor(reverse_dir)
-                    neighbor.add_neighbor(reverse_dir, original)
-            self.grid[row][column] = original 
+        """
+        Turns one generic node into an obstacle if every store stays
+        reachable from start; returns whether the obstacle was placed.
+        Links closed since generation (infinite weight) do not count
+        towards reachability.
+        """
+        node = self.grid[row][column]
+        if node.node_type != "generic":
             return False
 
+        required = set(stores)
+        required.add(start)
+        if not can_block_node(node, required, closed_links=True):
+            return False
+
+        self.replace_node(row, column, Obstacle(row, column, self.f_number))
+        return True
+
 
     def print_floor_layout(self, path_nodes=None):
         """
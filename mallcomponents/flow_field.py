@@ -0,0 +1,156 @@
+from collections import OrderedDict
+import numpy as np
+from algorithms.dijkstra import shortest_distances
+
+# default memory budget of a mall's flow field cache
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+
+class FlowField:
+    """
+    Reverse shortest-path field towards one target (usually a store).
+
+    One Dijkstra over the reversed edges (so one-way stair links are
+    respected) gives, for every node of every floor,
+      - distance[v]  the exact network distance from v to the target
+      - next_hop[v]  the next node on a shortest path from v (-1 at the
+                     target and for nodes that cannot reach it)
+    so a shopper anywhere reads its next step in O(1).
+    """
+
+    def __init__(self, graph, target: int):
+        self.graph = graph
+        self.target = target
+        distance, parent = shortest_distances(graph, target, reverse=True, with_parents=True)
+        self.distance = np.asarray(distance, dtype=np.float64)
+        self.next_hop = np.asarray(parent, dtype=np.int32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.distance.nbytes + self.next_hop.nbytes
+
+    def next_step(self, node_id: int) -> int:
+        return int(self.next_hop[node_id])
+
+    def path(self, node_id: int) -> list:
+        """Node ids from node_id to the target ([] if it cannot get there)."""
+        return self.paths([node_id])[0]
+
+    def paths(self, sources) -> list:
+        """
+        Paths for many sources at once: all of them follow next_hop in
+        lock step, one NumPy gather per step.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        target = self.target
+        reachable = np.isfinite(self.distance[sources])
+        current = np.where(reachable, sources, target)
+        steps = [current]
+        while (current != target).any():
+            current = np.where(current == target, target, self.next_hop[current])
+            steps.append(current)
+
+        matrix = np.stack(steps, axis=1)
+        lengths = np.argmax(matrix == target, axis=1) + 1
+        return [matrix[i, :length].tolist() if ok else []
+                for i, (length, ok) in enumerate(zip(lengths.tolist(), reachable.tolist()))]
+
+    def repair(self, changed) -> bool:
+        """
+        Brings the field up to date with edited (u, v) edges (their new
+        weights are already in the graph) if the edit does not touch the
+        part of the field anyone depends on; returns False if the field
+        has to be rebuilt.
+
+        An edge that now gives some node a shorter way, or a slower edge
+        on the shortest-path tree whose tail other nodes route through,
+        changes distances all over the field. A slower tree edge out of a
+        leaf (a node no other node routes through, e.g. a dead-end cell
+        that became an obstacle) only changes that node, which is
+        recomputed from its own links.
+        """
+        offsets, targets, weights, _, _ = self.graph.adjacency()
+        distance, next_hop = self.distance, self.next_hop
+
+        stale = set()
+        for u, v in changed:
+            weight = min(weights[e] for e in range(offsets[u], offsets[u + 1]) if targets[e] == v)
+            if distance[v] + weight < distance[u]:
+                return False
+            if next_hop[u] == v:
+                stale.add(u)
+
+        for u in stale:
+            if np.any(next_hop == u):
+                return False
+        for u in stale:
+            if any(targets[e] in stale for e in range(offsets[u], offsets[u + 1])):
+                return False
+
+        for u in stale:
+            best, hop = float('inf'), -1
+            for e in range(offsets[u], offsets[u + 1]):
+                d = weights[e] + distance[targets[e]]
+                if d < best:
+                    best, hop = d, targets[e]
+            distance[u] = best
+            next_hop[u] = hop
+        return True
+
+
+class FlowFieldCache:
+    """
+    Memory-bounded LRU cache of FlowFields for one compiled graph.
+
+    get() builds a field on a miss and evicts the least recently used
+    fields while the cache holds more than max_bytes of arrays (the field
+    just built is always kept). invalidate() gets the changed edges of a
+    mall edit and repairs or drops only the fields the edit touches.
+    """
+
+    def __init__(self, graph, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.graph = graph
+        self.max_bytes = max_bytes
+        self.fields = OrderedDict()     # target id -> FlowField, least recent first
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = self.dropped = 0
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, target):
+        return target in self.fields
+
+    def get(self, target: int) -> FlowField:
+        field = self.fields.get(target)
+        if field is not None:
+            self.hits += 1
+            self.fields.move_to_end(target)
+            return field
+
+        self.misses += 1
+        field = FlowField(self.graph, target)
+        self.fields[target] = field
+        self.nbytes += field.nbytes
+        self.shrink(keep=1)
+        return field
+
+    def shrink(self, keep: int = 0):
+        """Evicts least recently used fields until the budget is met (or only keep are left)."""
+        while self.nbytes > self.max_bytes and len(self.fields) > keep:
+            _, field = self.fields.popitem(last=False)
+            self.nbytes -= field.nbytes
+            self.evictions += 1
+
+    def invalidate(self, changed):
+        """Repairs the fields a mall edit leaves mostly intact and drops the rest."""
+        if not changed:
+            return
+        for target in list(self.fields):
+            if not self.fields[target].repair(changed):
+                self.nbytes -= self.fields.pop(target).nbytes
+                self.dropped += 1
+
+    def clear(self):
+        self.fields.clear()
+        self.nbytes = 0
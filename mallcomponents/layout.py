@@ -0,0 +1,445 @@
+import numpy as np
+from mallcomponents.compiled import CompiledMall, DIRECTION_CODES, TYPE_CODES
+from mallcomponents.mall import Mall
+from mallcomponents.snapshot import SNAPSHOT_FORMAT, build_mall, write_snapshot
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:     # scipy is optional; fall back to the NumPy labeling
+    connected_components = None
+
+GENERIC = TYPE_CODES["generic"]
+START = TYPE_CODES["start"]
+STORE = TYPE_CODES["store"]
+ELEVATOR = TYPE_CODES["elevator"]
+STAIRS = TYPE_CODES["stairs"]
+OBSTACLE = TYPE_CODES["obstacle"]
+
+# link weights, as passed to add_neighbor by node_connectivity
+HALL_WEIGHT = 1.0
+ELEVATOR_WEIGHT = 1.5
+STAIRS_WEIGHT = 2.5
+
+# (direction, row step, column step)
+HALL_STEPS = (("up", -1, 0), ("down", 1, 0), ("left", 0, -1), ("right", 0, 1))
+
+
+class LayoutGenerator:
+    """
+    Array-based alternative to Mall.run_mall_setup.
+
+    All layout work happens on a (floors, rows, columns) grid of type codes:
+    candidate cells are boolean masks, placements are drawn from a seeded
+    numpy Generator, links are built as whole edge arrays, and reachability
+    is checked by labeling connected components of the edge list. The
+    placement rules follow the object generator (start/stores/elevators on
+    the perimeter, stairs in the interior with the upper flight one column
+    to the right, obstacles on interior cells away from entrances) but the
+    random draws differ, so a seed gives a different mall than make_mall.
+
+    Obstacles are placed in one draw; if that cuts the start, a store, an
+    elevator or a stair off from the start, an L-shaped corridor is
+    cleared from the cut-off part to the start's component on that floor
+    and the check is repeated. Clearing lowers the density below
+    obstacle_density; MallLayout.obstacle_counts has the real numbers.
+
+    generate() returns a MallLayout, which compiles straight to a
+    CompiledMall and only builds Node objects when to_mall() is called.
+    """
+
+    def __init__(self, num_floors: int, rows: int, columns: int,
+                 stores_per_floor: int = 0, obstacles_per_floor: int = None,
+                 store_density: float = 0.0, obstacle_density: float = None,
+                 num_elevators: int = 0, num_stairs: int = 0,
+                 elevator_density: float = 0.0, stairs_density: float = 0.0):
+        self.num_floors = num_floors
+        self.rows = rows
+        self.columns = columns
+        self.settings = {
+            "stores_per_floor": stores_per_floor,
+            "obstacles_per_floor": obstacles_per_floor,
+            "store_density": store_density,
+            "obstacle_density": obstacle_density,
+            "num_elevators": num_elevators,
+            "num_stairs": num_stairs,
+            "elevator_density": elevator_density,
+            "stairs_density": stairs_density,
+        }
+
+    # --- placement counts (same rules as Mall) ---
+
+    def _count(self, fixed, density, default, pool, zero_is_unset=True):
+        # None is always unset; the obstacle settings take an explicit 0
+        if fixed is not None and (fixed > 0 or not zero_is_unset):
+            return fixed
+        elif density is not None and (density > 0 or not zero_is_unset):
+            return int(pool * density)
+        return int(pool * default)
+
+    def generate(self, seed=None) -> "MallLayout":
+        rng = np.random.default_rng(seed)
+        F, R, C = self.num_floors, self.rows, self.columns
+        s = self.settings
+        perimeter_size = 2 * C + 2 * (R - 2)
+
+        rows = np.arange(R)[:, None]
+        columns = np.arange(C)[None, :]
+        perimeter = (rows == 0) | (rows == R - 1) | (columns == 0) | (columns == C - 1)
+        corner = ((rows == 0) | (rows == R - 1)) & ((columns == 0) | (columns == C - 1))
+        interior = ~perimeter
+        entry_spots = perimeter & ~corner
+
+        types = np.full((F, R, C), GENERIC, dtype=np.uint8)
+
+        # agent start
+        agent_start_floor = int(rng.integers(F))
+        spots = self._choose(rng, entry_spots, 1)
+        if not len(spots):
+            raise RuntimeError("No valid perimeter node for agent start.")
+        start_r, start_c = divmod(int(spots[0]), C)
+        types[agent_start_floor, start_r, start_c] = START
+
+        # elevators: the same perimeter cell on every floor
+        count = self._count(s["num_elevators"], s["elevator_density"], 0.05, perimeter_size)
+        free_everywhere = (types == GENERIC).all(axis=0)
+        elevator_cells = self._choose(rng, entry_spots & free_everywhere, count)
+        er, ec = np.divmod(elevator_cells, C)
+        types[:, er, ec] = ELEVATOR
+
+        # stairs: lower flight at (r, c) on f, upper at (r, c + 1) on f + 1
+        stairs = [[] for _ in range(F)]
+        count = self._count(s["num_stairs"], s["stairs_density"], 0.05, perimeter_size)
+        for f in range(F - 1):
+            mask = np.zeros((R, C), dtype=bool)
+            mask[2:R - 2, 2:C - 2] = ((types[f, 2:R - 2, 2:C - 2] == GENERIC)
+                                      & (types[f + 1, 2:R - 2, 3:C - 1] == GENERIC))
+            cells = self._choose(rng, mask, count)
+            sr, sc = np.divmod(cells, C)
+            types[f, sr, sc] = STAIRS
+            types[f + 1, sr, sc + 1] = STAIRS
+            stairs[f].extend(zip(sr.tolist(), sc.tolist()))
+            stairs[f + 1].extend(zip(sr.tolist(), (sc + 1).tolist()))
+
+        # stores on free perimeter cells
+        stores = []
+        count = self._count(s["stores_per_floor"], s["store_density"], 0.2, perimeter_size)
+        for f in range(F):
+            cells = self._choose(rng, entry_spots & (types[f] == GENERIC), count)
+            sr, sc = np.divmod(cells, C)
+            types[f, sr, sc] = STORE
+            stores.append(list(zip(sr.tolist(), sc.tolist())))
+
+        # obstacles on interior cells that do not touch an entrance or stair
+        special = (types != GENERIC) & (types != OBSTACLE)
+        touches = np.zeros_like(special)
+        touches[:, 1:, :] |= special[:, :-1, :]
+        touches[:, :-1, :] |= special[:, 1:, :]
+        touches[:, :, 1:] |= special[:, :, :-1]
+        touches[:, :, :-1] |= special[:, :, 1:]
+        count = self._count(s["obstacles_per_floor"], s["obstacle_density"], 0.25, R * C - perimeter_size,
+                            zero_is_unset=False)
+        for f in range(F):
+            cells = self._choose(rng, interior & (types[f] == GENERIC) & ~touches[f], count)
+            types[f].flat[cells] = OBSTACLE
+
+        layout = MallLayout(F, R, C, self.settings, types, agent_start_floor,
+                            (start_r, start_c), stores, elevator_cells, stairs)
+        layout.connect(rng)
+
+        all_stores = [(f, r, c) for f, floor_stores in enumerate(stores) for r, c in floor_stores]
+        if all_stores:
+            layout.goal = all_stores[int(rng.integers(len(all_stores)))]
+        return layout
+
+    @staticmethod
+    def _choose(rng, mask, count):
+        """Up to count flat indexes of true cells of mask, in random order."""
+        cells = np.flatnonzero(mask)
+        count = min(max(count, 0), len(cells))
+        return rng.choice(cells, size=count, replace=False) if count else cells[:0]
+
+
+class MallLayout:
+    """
+    A generated mall as arrays: types[f, r, c] holds the type code of each
+    cell and the links are kept in the same CSR layout (and id order) as
+    CompiledMall. compile() returns the array view the planners use;
+    to_mall() builds the full object-graph Mall; save() writes a snapshot
+    Mall.load can read without ever building the objects here.
+    """
+
+    def __init__(self, num_floors, rows, columns, settings, types, agent_start_floor,
+                 start, stores, elevator_cells, stairs):
+        self.num_floors = num_floors
+        self.rows = rows
+        self.columns = columns
+        self.settings = settings
+        self.types = types
+        self.agent_start_floor = agent_start_floor
+        self.start = start                # (row, column) on agent_start_floor
+        self.stores = stores              # per floor, [(row, column)] in placement order
+        self.elevator_cells = elevator_cells
+        self.stairs = stairs              # per floor, [(row, column)] in placement order
+        self.goal = None                  # (f, row, column) of the goal store
+        self.cleared = 0                  # obstacles removed to keep the mall connected
+        self.fallbacks = 0                # floors connect() had to clear entirely
+
+        # id = (row * columns + column) * num_floors + f_number, as in CompiledMall
+        self.ids = (np.arange(rows * columns, dtype=np.int64).reshape(rows, columns)[None, :, :]
+                    * num_floors + np.arange(num_floors, dtype=np.int64)[:, None, None])
+        self.offsets = self.targets = self.weights = self.directions = None
+        self._graph = None
+
+    def id_of(self, f_number: int, row: int, column: int) -> int:
+        return (row * self.columns + column) * self.num_floors + f_number
+
+    @property
+    def obstacle_counts(self) -> list:
+        """Obstacles left on each floor, after connect() cleared its corridors."""
+        return (self.types == OBSTACLE).sum(axis=(1, 2)).tolist()
+
+    def obstacle_density(self) -> float:
+        """Share of the interior cells that hold an obstacle, over all floors."""
+        interior = max(self.rows - 2, 0) * max(self.columns - 2, 0) * self.num_floors
+        return sum(self.obstacle_counts) / interior if interior else 0.0
+
+    def types_by_id(self) -> np.ndarray:
+        return np.ascontiguousarray(self.types.transpose(1, 2, 0)).reshape(-1)
+
+    # --- links ---
+
+    def build_links(self):
+        """Builds the CSR link arrays from the current cell types."""
+        F, R, C = self.num_floors, self.rows, self.columns
+        types, ids = self.types, self.ids
+        walkable = types != OBSTACLE
+
+        rows = np.arange(R)[:, None]
+        columns = np.arange(C)[None, :]
+        interior = (rows > 0) & (rows < R - 1) & (columns > 0) & (columns < C - 1)
+        side = (rows > 0) & (rows < R - 1)
+        # perimeter cells only link inwards, exactly like connect_nodes
+        allowed = {
+            "up": interior | (rows == R - 1),
+            "down": interior | (rows == 0),
+            "left": interior | (side & (columns == C - 1)),
+            "right": interior | (side & (columns == 0)),
+        }
+
+        sources, heads, codes, weights = [], [], [], []
+
+        def add(src_mask, src_ids, dst_ids, direction, weight):
+            sources.append(src_ids[src_mask])
+            heads.append(dst_ids[src_mask])
+            codes.append(np.full(int(src_mask.sum()), DIRECTION_CODES[direction], dtype=np.uint8))
+            weights.append(np.full(len(sources[-1]), weight))
+
+        for direction, dr, dc in HALL_STEPS:
+            src = (slice(None), slice(max(-dr, 0), R - max(dr, 0)), slice(max(-dc, 0), C - max(dc, 0)))
+            dst = (slice(None), slice(max(dr, 0), R - max(-dr, 0)), slice(max(dc, 0), C - max(-dc, 0)))
+            mask = walkable[src] & walkable[dst] & allowed[direction][src[1:]][None]
+            add(mask, ids[src], ids[dst], direction, HALL_WEIGHT)
+
+        elevator = types == ELEVATOR
+        shaft = elevator[:-1] & elevator[1:]
+        add(shaft, ids[:-1], ids[1:], "up_floor", ELEVATOR_WEIGHT)
+        add(shaft, ids[1:], ids[:-1], "down_floor", ELEVATOR_WEIGHT)
+
+        stair = types == STAIRS
+        flight = stair[:-1, :, :-1] & stair[1:, :, 1:]
+        add(flight, ids[:-1, :, :-1], ids[1:, :, 1:], "up_stairs", STAIRS_WEIGHT)
+        add(flight, ids[1:, :, 1:], ids[:-1, :, :-1], "down_stairs", STAIRS_WEIGHT)
+
+        src = np.concatenate(sources)
+        dst = np.concatenate(heads)
+        direction = np.concatenate(codes)
+        weight = np.concatenate(weights)
+
+        # lock the stairs: a lower flight keeps left + up_stairs, an upper
+        # flight right + down_stairs; links back into a dropped link go too
+        n = F * R * C
+        type_of = self.types_by_id()
+        is_stair = type_of[src] == STAIRS
+        lower = np.zeros(n, dtype=bool)
+        lower[src[direction == DIRECTION_CODES["up_stairs"]]] = True
+        keep_lower = (direction == DIRECTION_CODES["left"]) | (direction == DIRECTION_CODES["up_stairs"])
+        keep_upper = (direction == DIRECTION_CODES["right"]) | (direction == DIRECTION_CODES["down_stairs"])
+        dropped = is_stair & np.where(lower[src], ~keep_lower, ~keep_upper)
+        back = np.isin(dst * n + src, src[dropped] * n + dst[dropped])
+        keep = ~(dropped | back)
+        src, dst, direction, weight = src[keep], dst[keep], direction[keep], weight[keep]
+
+        # CSR order: by source id, then direction code (the add_neighbor order)
+        order = np.lexsort((direction, src))
+        self.targets = dst[order].astype(np.int32)
+        self.directions = direction[order]
+        self.weights = weight[order]
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.offsets[1:])
+        self._graph = None
+
+    def connect(self, rng=None, max_rounds: int = 32):
+        """
+        Builds the links and clears obstacles until the start, every store,
+        elevator and (enterable) stair share one connected component. Corridors lead to
+        the nearest connected cell first and to random ones (drawn from rng)
+        if that did not help, e.g. because a stair sat on the corridor.
+
+        Every round clears at least one obstacle, but nothing bounds how
+        many rounds random corridors need, so after max_rounds the floors
+        that still hold a cut-off node are cleared of obstacles entirely.
+        Only a mall that is disconnected without any obstacles raises.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        F, R, C = self.num_floors, self.rows, self.columns
+        start_id = self.id_of(self.agent_start_floor, *self.start)
+        required = [(self.agent_start_floor,) + tuple(self.start)]
+        required += [(f, r, c) for f in range(F) for r, c in self.stores[f]]
+        required += [(f, int(r), int(c)) for f in range(F)
+                     for r, c in zip(*np.divmod(self.elevator_cells, C))]
+        # a flight squeezed between other flights has no hall entry at all
+        required += [(f, r, c) for f in range(F) for r, c in self.stairs[f]
+                     if self.types[(f,) + self._entry_cell(f, r, c)] != STAIRS]
+
+        for attempt in range(max_rounds + 2):
+            self.build_links()
+            labels = self.components()
+            main = labels[start_id]
+            cut_off = {}
+            for f, r, c in required:
+                label = labels[self.id_of(f, r, c)]
+                if label != main:
+                    cut_off.setdefault((f, label), (r, c))
+            if not cut_off:
+                return
+
+            if attempt > max_rounds:
+                raise RuntimeError("Could not connect every store to the agent start.")
+            if attempt == max_rounds:
+                for f in {f for f, _ in cut_off}:
+                    blocked = self.types[f] == OBSTACLE
+                    self.cleared += int(blocked.sum())
+                    self.types[f][blocked] = GENERIC
+                self.fallbacks += 1
+                continue
+
+            by_floor = labels[self.ids]     # (F, R, C) component labels
+            hall = np.zeros((R, C), dtype=bool)
+            hall[1:R - 1, 1:C - 1] = True
+            for (f, _), (r, c) in cut_off.items():
+                r, c = self._entry_cell(f, r, c)
+                reachable = np.flatnonzero((by_floor[f] == main) & (self.types[f] == GENERIC) & hall)
+                if not len(reachable):
+                    continue
+                tr, tc = np.divmod(reachable, C)
+                if attempt == 0:
+                    target = int(np.argmin(np.abs(tr - r) + np.abs(tc - c)))
+                else:
+                    target = int(rng.integers(len(reachable)))
+                self._clear_corridor(f, r, c, int(tr[target]), int(tc[target]),
+                                     rows_first=attempt % 2 == 0)
+
+    def _entry_cell(self, f, r, c):
+        """The walkable cell a required node is entered from."""
+        R, C = self.rows, self.columns
+        if r == 0:
+            return 1, c
+        if r == R - 1:
+            return R - 2, c
+        if c == 0:
+            return r, 1
+        if c == C - 1:
+            return r, C - 2
+        if self.types[f, r, c] == STAIRS:
+            # a lower flight is entered from its left, an upper from its right
+            upper = f > 0 and c > 0 and self.types[f - 1, r, c - 1] == STAIRS
+            return (r, c + 1) if upper else (r, c - 1)
+        return r, c
+
+    def _clear_corridor(self, f, r0, c0, r1, c1, rows_first: bool):
+        """Clears the obstacles on an L-shaped corridor between two cells."""
+        floor = self.types[f]
+        if rows_first:
+            segments = (floor[r0, min(c0, c1):max(c0, c1) + 1], floor[min(r0, r1):max(r0, r1) + 1, c1])
+        else:
+            segments = (floor[min(r0, r1):max(r0, r1) + 1, c0], floor[r1, min(c0, c1):max(c0, c1) + 1])
+        for segment in segments:
+            blocked = segment == OBSTACLE
+            self.cleared += int(blocked.sum())
+            segment[blocked] = GENERIC
+
+    def components(self) -> np.ndarray:
+        """Connected-component label of every node id, ignoring link direction."""
+        n = self.num_floors * self.rows * self.columns
+        src = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.offsets))
+        dst = self.targets.astype(np.int64)
+        if connected_components is not None:
+            graph = coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n))
+            return connected_components(graph, directed=False)[1]
+
+        # hook every root onto the smallest root across an edge, then
+        # pointer-jump to the roots, until no edge joins two trees
+        labels = np.arange(n, dtype=np.int64)
+        while True:
+            a, b = labels[src], labels[dst]
+            low, high = np.minimum(a, b), np.maximum(a, b)
+            joins = low != high
+            if not joins.any():
+                return labels
+            np.minimum.at(labels, high[joins], low[joins])
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+
+    # --- outputs ---
+
+    def compile(self) -> CompiledMall:
+        """The CompiledMall of this layout, without Node objects."""
+        if self._graph is None:
+            self._graph = CompiledMall(self.num_floors, self.rows, self.columns,
+                                       self.offsets, self.targets, self.weights,
+                                       self.directions, self.types_by_id())
+        return self._graph
+
+    def snapshot_meta(self) -> dict:
+        C = self.columns
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "num_floors": self.num_floors,
+            "rows": self.rows,
+            "columns": C,
+            "settings": dict(self.settings),
+            "agent_start_floor": self.agent_start_floor,
+            "start": self.id_of(self.agent_start_floor, *self.start),
+            "goal": self.id_of(*self.goal) if self.goal is not None else None,
+            "floors": [
+                {
+                    "stores": [self.id_of(f, r, c) for r, c in self.stores[f]],
+                    "store_names": [f"Store-{index}" for index in range(len(self.stores[f]))],
+                    "elevators": [self.id_of(f, int(r), int(c))
+                                  for r, c in zip(*np.divmod(self.elevator_cells, C))],
+                    "stairs": [self.id_of(f, r, c) for r, c in self.stairs[f]],
+                }
+                for f in range(self.num_floors)
+            ],
+        }
+
+    def arrays(self) -> dict:
+        return {
+            "types": self.types_by_id(),
+            "offsets": self.offsets,
+            "targets": self.targets,
+            "weights": self.weights,
+            "directions": self.directions,
+        }
+
+    def save(self, path: str):
+        """Writes the layout as a mall snapshot (see Mall.load)."""
+        write_snapshot(path, self.snapshot_meta(), self.arrays())
+
+    def to_mall(self, mall_cls=Mall) -> Mall:
+        """Builds the object-graph Mall (already compiled) of this layout."""
+        return build_mall(mall_cls, self.snapshot_meta(), self.arrays())
@@ -1,9 +1,15 @@
 import random
 from mallcomponents.floor import Floor
-from mallcomponents.node_connectivity import connect_nodes, is_corner, add_elevator_vertical_neighbors, update_stair_neighbors
+from mallcomponents.node_connectivity import is_corner, add_elevator_vertical_neighbors, update_stair_neighbors
 from nodecomponents.elevators import Elevator
 from nodecomponents.stairs import Stairs
 from nodecomponents.goal_logic import assign_goal_item_to_store
+from mallcomponents.compiled import CompiledMall
+from mallcomponents.distance_table import DistanceTable
+from mallcomponents.flow_field import FlowField, FlowFieldCache
+from mallcomponents.snapshot import save_mall, load_mall
+from algorithms.landmarks import LandmarkTable
+from algorithms.batch import plan_batch
 
 ############################       For Printing Purposes      ###################################
 from PIL import Image, ImageDraw, ImageFont
@@ -42,10 +48,11 @@ def save_layout_as_png(text: str, filename: str = "mall_layout.png", font_size:
 
 class Mall:
     def __init__(self, num_floors: int, rows: int, columns: int, 
-                stores_per_floor: int = 0, obstacles_per_floor: int = 0,
-                store_density: float = 0.0, obstacle_density: float = 0.0,
+                stores_per_floor: int = 0, obstacles_per_floor: int = None,
+                store_density: float = 0.0, obstacle_density: float = None,
                 num_elevators: int = 0, num_stairs: int = 0,
-                elevator_density: float = 0.0, stairs_density: float = 0.0):
+                elevator_density: float = 0.0, stairs_density: float = 0.0,
+                agent_start_floor: int = None):
         
         self.num_floors = num_floors
         self.rows = rows
@@ -67,7 +74,13 @@ class Mall:
         self.stairs_density = stairs_density
 
         self.floors = []
-        self.agent_start_floor = random.randint(0, num_floors - 1)
+        if agent_start_floor is None:
+            agent_start_floor = random.randint(0, num_floors - 1)
+        self.agent_start_floor = agent_start_floor
+        self.graph = None
+        self.landmarks = None
+        self.distances = None
+        self.flow_fields = None
     
     def build_base_floors(self):
         """Builds the base floors of the mall."""
@@ -116,12 +129,8 @@ class Mall:
         for i, (e_row, e_column) in enumerate(selected_nodes):
             for floor in self.floors:
                 elevator = Elevator(row=e_row, column=e_column, f_number=floor.f_number)
-                floor.grid[e_row][e_column] = elevator  
+                floor.replace_node(e_row, e_column, elevator)
                 floor.elevators.append(elevator)
-
-        for floor in self.floors:
-            connect_nodes(floor.grid, floor.rows, floor.columns)
-            floor.build_perimeter_list()
         
 
     def get_stairs_placement_count(self, floor: Floor):
@@ -156,18 +165,13 @@ class Mall:
             for row, column in valid_nodes[:count]:
                 # Place lower stairs
                 lower = Stairs(row=row, column=column, f_number=lower_floor.f_number)
-                lower_floor.grid[row][column] = lower
+                lower_floor.replace_node(row, column, lower)
                 lower_floor.stairs.append(lower)
 
                 # Place upper stairs
                 upper = Stairs(row=row, column=column + 1, f_number=upper_floor.f_number)
-                upper_floor.grid[row][column + 1] = upper
+                upper_floor.replace_node(row, column + 1, upper)
                 upper_floor.stairs.append(upper)
-
-        # Connect stairs on each floor to their neighbors
-        for floor in self.floors:
-            connect_nodes(floor.grid, floor.rows, floor.columns)
-            floor.build_perimeter_list()
                     
 
     def get_all_stores(self):
@@ -192,15 +196,26 @@ class Mall:
 
         viable_node_count = self.nodes_per_floor - len(floor.perimeter)  # Exclude perimeter nodes
 
-        if self.obstacles > 0:
+        if self.obstacles is not None:
             return self.obstacles
-        elif self.obstacle_density > 0:
+        elif self.obstacle_density is not None:
             return int(viable_node_count * self.obstacle_density)
         else:
             return int(viable_node_count * 0.25)
         # Default to 25% of the viable floor nodes if no specific count or density is provided
+        # (None leaves a setting unset, so 0 really means an obstacle-free floor)
 
     def populate_floors(self):
+        """Places the stores on every floor."""
+        for floor in self.floors:
+            store_count = self.get_store_placement_count(floor)
+            floor.place_stores(count=store_count)
+
+    def place_obstacles(self):
+        """
+        Places obstacles on every floor once all stores and floor links
+        exist, so each floor keeps every store on any floor reachable.
+        """
         # grab the one start node (on whatever floor the agent began)
         start = self.floors[self.agent_start_floor].start_node
 
@@ -208,10 +223,6 @@ class Mall:
         all_stores = self.get_all_stores()
 
         for floor in self.floors:
-            # place stores as before
-            store_count = self.get_store_placement_count(floor)
-            floor.place_stores(count=store_count)
-
             obstacle_count = self.get_obstacle_placement_count(floor)
             floor.place_obstacles(
                 count=obstacle_count,
@@ -225,17 +236,150 @@ class Mall:
         self.place_agent()
         self.place_elevators()
         self.place_stairs()
-
-        for floor in self.floors:
-            connect_nodes(floor.grid, floor.rows, floor.columns)
-            floor.build_perimeter_list()
-
         self.populate_floors()
-        assign_goal_item_to_store(self.get_all_stores())
 
         add_elevator_vertical_neighbors(self.floors)
         update_stair_neighbors(self.floors)
 
+        self.place_obstacles()
+        assign_goal_item_to_store(self.get_all_stores())
+        self.graph = None
+        self.landmarks = None
+        self.distances = None
+        self.flow_fields = None
+
+    def compile(self) -> CompiledMall:
+        """
+        Returns the array-backed view of the mall used by the planners,
+        freezing the current object graph on first use.
+        """
+        if self.graph is None:
+            self.graph = CompiledMall.from_mall(self)
+        return self.graph
+
+    def save(self, path: str):
+        """
+        Saves the mall as a binary snapshot directory (compiled graph as
+        .npy arrays plus a small meta.json), see mallcomponents.snapshot.
+        """
+        save_mall(self, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Mall":
+        """
+        Loads a snapshot written by save(). The arrays are memory-mapped
+        copy-on-write and the mall comes back already compiled.
+        """
+        return load_mall(cls, path)
+
+    def distance_table(self) -> DistanceTable:
+        """
+        Returns the cached POI distance/path table, creating it on first
+        use. Rows are filled lazily by single-source searches.
+        """
+        if self.distances is None:
+            self.distances = DistanceTable(self.compile())
+        return self.distances
+
+    def flow_field_cache(self, max_bytes: int = None) -> FlowFieldCache:
+        """
+        Returns the LRU cache of per-store flow fields, creating it on first
+        use; max_bytes changes its memory budget. Unlike the distance table
+        it survives edits: only the fields an edit touches are dropped.
+        """
+        graph = self.compile()
+        if self.flow_fields is None or self.flow_fields.graph is not graph:
+            self.flow_fields = FlowFieldCache(graph)
+        if max_bytes is not None:
+            self.flow_fields.max_bytes = max_bytes
+            self.flow_fields.shrink()
+        return self.flow_fields
+
+    def flow_field(self, target_node) -> FlowField:
+        """
+        Reverse shortest-path field towards target_node (usually a store):
+        the distance to it and the next step from every node, built by one
+        reverse Dijkstra and cached.
+        """
+        return self.flow_field_cache().get(self.compile().id_of(target_node))
+
+    def build_landmarks(self, count: int = 8) -> LandmarkTable:
+        """
+        Precomputes landmark distance tables (elevators and stairs first) so
+        every planner can use the floor-aware ALT heuristic on this mall.
+        """
+        graph = self.compile()
+        start = self.floors[self.agent_start_floor].start_node
+        self.landmarks = LandmarkTable.build(graph, count=count, anchor=graph.id_of(start))
+        return self.landmarks
+
+    def plan_batch(self, queries, paths: bool = True, queue: str = "heap") -> list:
+        """
+        Answers many shoppers at once: queries is a list of (start_node,
+        goal_nodes) pairs, and the result has one list per query of
+        {"goal", "path", "cost"} dicts for the reachable goals, sorted by
+        cost. Queries sharing a start or a store share one search, see
+        algorithms.batch.
+        """
+        return plan_batch(self.compile(), queries, paths=paths, queue=queue)
+
+    def place_obstacle(self, f_number: int, row: int, column: int):
+        """
+        Places one obstacle in a finished mall, refusing any that would cut
+        a store off from the agent start (closed links do not count as a
+        way through) or that is not on a generic cell;
+        a refused obstacle returns None. If the mall is compiled, the view
+        is updated in place and the changed (u, v) edge ids are returned so
+        an incremental planner can repair its search ([] if it is not).
+        """
+        floor = self.floors[f_number]
+        start = self.floors[self.agent_start_floor].start_node
+        if not floor.place_single_obstacle(row, column, start, self.get_all_stores()):
+            return None
+        self.distances = None
+        if self.graph is None:
+            return []
+
+        obstacle = floor.grid[row][column]
+        node_id = self.graph.id_of(obstacle)
+        self.graph.nodes[node_id] = obstacle
+        changed = self.graph.block_node(node_id)
+        if self.flow_fields is not None:
+            self.flow_fields.invalidate(changed)
+        return changed
+
+    def set_edge_weight(self, node_a, node_b, weight: float):
+        """
+        Changes the weight of the link node_a -> node_b (e.g. a stair flight
+        getting slower). Use float('inf') to close a link. Returns the
+        changed (u, v) edge ids of the compiled view.
+        """
+        for link in node_a.get_neighbors():
+            if link.node is node_b:
+                if weight < link.weight:
+                    # landmark bounds only stay admissible while costs go up
+                    self.landmarks = None
+                link.weight = weight
+        self.distances = None
+        if self.graph is None:
+            return []
+
+        u, v = self.graph.id_of(node_a), self.graph.id_of(node_b)
+        changed = [(u, v)] if self.graph.set_weight(u, v, weight) else []
+        if self.flow_fields is not None:
+            self.flow_fields.invalidate(changed)
+        return changed
+
+    def close_elevator(self, row: int, column: int):
+        """Closes the elevator shaft at (row, column) on every floor."""
+        changed = []
+        for floor in self.floors:
+            elevator = floor.grid[row][column]
+            for link in elevator.get_neighbors():
+                if link.direction in ("up_floor", "down_floor"):
+                    changed.extend(self.set_edge_weight(elevator, link.node, float('inf')))
+        return changed
+
     def print_mall_layout(self, to_file = None):
 
         center_width = self.columns * 5
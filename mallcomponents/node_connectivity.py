@@ -10,31 +10,100 @@ OPP_DIR = {
 }
 
 def connect_nodes(grid, rows, columns):
+    """ Rebuild the horizontal links of every node on a floor grid """
     for i in range(rows):
         for j in range(columns):
-            node = grid[i][j]
-            node.neighbors.clear()
+            link_cell(grid, grid[i][j], rows, columns)
 
-            if node.node_type == "obstacle":
+
+def link_cell(grid, node, rows, columns):
+    """ (Re)build the horizontal links of one node from its grid neighbors """
+    i, j = node.row, node.column
+    node.neighbors.clear()
+
+    if node.node_type == "obstacle":
+        return
+
+    if i == 0 and grid[i + 1][j].node_type != "obstacle":
+        node.add_neighbor("down", grid[i + 1][j])
+    elif i == rows - 1 and grid[i - 1][j].node_type != "obstacle":
+        node.add_neighbor("up", grid[i - 1][j])
+    elif j == 0 and grid[i][j + 1].node_type != "obstacle":
+        node.add_neighbor("right", grid[i][j + 1])
+    elif j == columns - 1 and grid[i][j - 1].node_type != "obstacle":
+        node.add_neighbor("left", grid[i][j - 1])
+    else:
+        if grid[i - 1][j].node_type != "obstacle":
+            node.add_neighbor("up", grid[i - 1][j])
+        if grid[i + 1][j].node_type != "obstacle":
+            node.add_neighbor("down", grid[i + 1][j])
+        if grid[i][j - 1].node_type != "obstacle":
+            node.add_neighbor("left", grid[i][j - 1])
+        if grid[i][j + 1].node_type != "obstacle":
+            node.add_neighbor("right", grid[i][j + 1])
+
+
+def replace_cell(grid, old, new, rows, columns):
+    """
+    Update the links around one cell after grid[row][column] was swapped
+    from old to new, touching nothing else on the floor:
+      - new gets its own horizontal links (none for an obstacle)
+      - grid neighbors that linked to old now link to new, keeping the
+        link's position and weight, or drop the link if new is an obstacle
+      - if old was an obstacle, neighbors get the link to new that a full
+        connect_nodes pass would give them (perimeter cells only link
+        inward, stairs only on their open side)
+    Vertical links (elevators, stairs) of other nodes are left alone.
+    """
+    link_cell(grid, new, rows, columns)
+
+    i, j = new.row, new.column
+    for r, c, direction in ((i - 1, j, "down"), (i + 1, j, "up"),
+                            (i, j - 1, "right"), (i, j + 1, "left")):
+        if 0 <= r < rows and 0 <= c < columns:
+            nbr = grid[r][c]
+            if new.node_type == "obstacle":
+                nbr.neighbors = [link for link in nbr.neighbors if link.node is not old]
                 continue
+            linked = False
+            for link in nbr.neighbors:
+                if link.node is old:
+                    link.node = new
+                    linked = True
+            if nbr.node_type == "stairs" and not links_toward(nbr, direction, rows, columns):
+                # a stair's closed side has no links either way
+                new.remove_neighbor(OPP_DIR[direction])
+            elif (not linked and old.node_type == "obstacle" and nbr.node_type != "obstacle"
+                  and links_toward(nbr, direction, rows, columns)):
+                insert_horizontal_link(nbr, direction, new)
 
-            if i == 0 and grid[i + 1][j].node_type != "obstacle":
-                node.add_neighbor("down", grid[i + 1][j])
-            elif i == rows - 1 and grid[i - 1][j].node_type != "obstacle":
-                node.add_neighbor("up", grid[i - 1][j])
-            elif j == 0 and grid[i][j + 1].node_type != "obstacle":
-                node.add_neighbor("right", grid[i][j + 1])
-            elif j == columns - 1 and grid[i][j - 1].node_type != "obstacle":
-                node.add_neighbor("left", grid[i][j - 1])
-            else:
-                if grid[i - 1][j].node_type != "obstacle":
-                    node.add_neighbor("up", grid[i - 1][j])
-                if grid[i + 1][j].node_type != "obstacle":
-                    node.add_neighbor("down", grid[i + 1][j])
-                if grid[i][j - 1].node_type != "obstacle":
-                    node.add_neighbor("left", grid[i][j - 1])
-                if grid[i][j + 1].node_type != "obstacle":
-                    node.add_neighbor("right", grid[i][j + 1])
+
+# order link_cell adds horizontal links in
+HORIZONTAL = ("up", "down", "left", "right")
+
+
+def links_toward(node, direction, rows, columns) -> bool:
+    """ Whether a walkable node gets a horizontal link in direction when its cell is linked """
+    if node.node_type == "stairs":
+        vertical = {link.direction for link in node.get_neighbors()}
+        if "up_stairs" in vertical:
+            return direction == "left"
+        if "down_stairs" in vertical:
+            return direction == "right"
+        return True
+    inward = get_inward_direction(node.row, node.column, rows, columns)
+    return inward is None or inward == direction
+
+
+def insert_horizontal_link(node, direction, target):
+    """ Adds node -> target where link_cell would have put it among node's links """
+    rank = HORIZONTAL.index(direction)
+    index = 0
+    while (index < len(node.neighbors) and node.neighbors[index].direction in HORIZONTAL
+           and HORIZONTAL.index(node.neighbors[index].direction) < rank):
+        index += 1
+    node.add_neighbor(direction, target)
+    node.neighbors.insert(index, node.neighbors.pop())
 
 
 def add_inward_neighbor(grid, node, rows, columns):
@@ -49,6 +118,8 @@ def add_inward_neighbor(grid, node, rows, columns):
         grid[i][j + 1] if inward_dir == "right" else
         grid[i][j - 1]
     )
+    if any(link.node is neighbor for link in node.get_neighbors()):
+        return
     node.add_neighbor(inward_dir, neighbor)
 
 def is_fully_connected(start_node, store_nodes, grid):
@@ -74,24 +145,97 @@ def is_fully_connected(start_node, store_nodes, grid):
 
     return True
 
-def is_fully_connected_3d(start_node, store_nodes):
+def can_block_node(node, required, closed_links: bool = False) -> bool:
     """
-    Return True if every node in store_nodes is reachable from start_node
-    via ANY neighbor links (horizontal, elevator, or stairs).
+    Return True if turning node into an obstacle keeps every node in
+    required (start + stores) connected to each other.
+
+    Instead of re-flooding the whole mall, one BFS is grown from each
+    neighbor of node in lockstep. Searches that meet are merged; a search
+    that runs dry has found a whole component of the mall without node.
+    Such a component is harmless if it holds no required node, decides
+    the answer if it holds some, and once a single search is left every
+    required node is on its side. The cost is bounded by the smaller
+    sides of the cut rather than the mall size.
+
+    The searches treat the mall as undirected, which holds for a freshly
+    generated mall. Pass closed_links=True once links may have been
+    closed (Mall.set_edge_weight(..., inf), Mall.close_elevator): only
+    links open both ways (see is_open) then connect anything. That is
+    conservative, it may refuse an obstacle that one-way links would
+    have tolerated, or one next to stores the closures already cut off.
     """
-    visited = set()
-    queue   = deque([start_node])
-    visited.add(start_node)
+    seeds = []
+    for link in node.get_neighbors():
+        nbr = link.node
+        if (nbr.node_type != "obstacle" and (not closed_links or is_open(node, link))
+                and all(nbr is not s for s in seeds)):
+            seeds.append(nbr)
+    if len(seeds) <= 1:
+        return True
 
-    while queue:
-        current = queue.popleft()
-        for link in current.get_neighbors():
-            nbr = link.node
-            if nbr not in visited and nbr.node_type != "obstacle":
-                visited.add(nbr)
-                queue.append(nbr)
+    total_required = len(required)
+    owner = {node: -1}
+    parent = list(range(len(seeds)))
+    frontiers = []
+    found = []
+    for index, seed in enumerate(seeds):
+        owner[seed] = index
+        frontiers.append(deque([seed]))
+        found.append(1 if seed in required else 0)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
 
-    return all(store in visited for store in store_nodes)
+    alive = list(range(len(seeds)))
+    while len(alive) > 1:
+        for i in list(alive):
+            if parent[i] != i:
+                continue
+            queue = frontiers[i]
+            if not queue:
+                # search i is a closed component of the mall without node
+                if found[i] == 0:
+                    alive.remove(i)
+                    if len(alive) == 1:
+                        break
+                    continue
+                return found[i] == total_required
+
+            current = queue.popleft()
+            for link in current.get_neighbors():
+                nbr = link.node
+                if nbr.node_type == "obstacle" or (closed_links and not is_open(current, link)):
+                    continue
+                other = owner.get(nbr)
+                if other is None:
+                    owner[nbr] = i
+                    queue.append(nbr)
+                    if nbr in required:
+                        found[i] += 1
+                elif other != -1:
+                    root = find(other)
+                    if root != i:
+                        # two searches met: merge root into i
+                        parent[root] = i
+                        queue.extend(frontiers[root])
+                        frontiers[root] = deque()
+                        found[i] += found[root]
+                        alive.remove(root)
+            if len(alive) == 1:
+                break
+
+    return True
+
+
+def is_open(node, link) -> bool:
+    """ Whether the link node -> link.node and its way back both have a finite weight """
+    if link.weight == float('inf'):
+        return False
+    return any(back.node is node and back.weight != float('inf') for back in link.node.neighbors)
 
 
 def is_blocking_entry(node, grid, inward_direction_func):
@@ -0,0 +1,231 @@
+"""
+Binary mall snapshots.
+
+A snapshot is a directory holding the compiled graph as .npy arrays
+
+    types.npy       uint8  cell type code per node id
+    offsets.npy     int64  CSR row offsets
+    targets.npy     int32  CSR edge heads (horizontal and portal links)
+    weights.npy     float64 edge weights
+    directions.npy  uint8  edge direction codes
+
+and a small meta.json with the mall settings and the ordered store /
+elevator / stair lists, the start node and the goal store. Both live in
+a version subdirectory named by the CURRENT file, which a writer swaps
+atomically once a new version is complete. Loading maps the arrays
+copy-on-write, so worker processes loading the same snapshot share its
+pages until they edit the mall, and rebuilds the object graph straight
+from the CSR without re-running generation.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from interfaces.nodes import Node
+from mallcomponents.compiled import CompiledMall, DIRECTIONS, TYPE_CODES
+from mallcomponents.floor import Floor
+from nodecomponents.elevators import Elevator
+from nodecomponents.neighbors import Neighbor
+from nodecomponents.stairs import Stairs
+from nodecomponents.static_obstacles import Obstacle
+from nodecomponents.stores import Store
+
+SNAPSHOT_FORMAT = 1
+ARRAYS = ("types", "offsets", "targets", "weights", "directions")
+POINTER = "CURRENT"
+
+# Mall.__init__ argument -> Mall attribute holding it
+MALL_SETTINGS = {
+    "stores_per_floor": "stores",
+    "obstacles_per_floor": "obstacles",
+    "store_density": "store_density",
+    "obstacle_density": "obstacle_density",
+    "num_elevators": "num_elevators",
+    "num_stairs": "num_stairs",
+    "elevator_density": "elevator_density",
+    "stairs_density": "stairs_density",
+}
+
+
+def save_mall(mall, path: str):
+    """ Writes mall as a snapshot directory at path (replacing any old one) """
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    goal = next((s for s in mall.get_all_stores() if s.has_goal_item), None)
+
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "num_floors": mall.num_floors,
+        "rows": mall.rows,
+        "columns": mall.columns,
+        "settings": {arg: getattr(mall, attr) for arg, attr in MALL_SETTINGS.items()},
+        "agent_start_floor": mall.agent_start_floor,
+        "start": graph.id_of(start) if start is not None else None,
+        "goal": graph.id_of(goal) if goal is not None else None,
+        "floors": [
+            {
+                "stores": [graph.id_of(s) for s in floor.stores],
+                "store_names": [s.name for s in floor.stores],
+                "elevators": [graph.id_of(e) for e in floor.elevators],
+                "stairs": [graph.id_of(s) for s in floor.stairs],
+            }
+            for floor in mall.floors
+        ],
+    }
+    write_snapshot(path, meta, {name: getattr(graph, name) for name in ARRAYS})
+
+
+def write_snapshot(path: str, meta: dict, arrays: dict):
+    """
+    Writes meta and the ARRAYS as a new version directory inside the
+    snapshot directory path, then points path/CURRENT at it with an
+    atomic rename, so a reader always finds one complete snapshot. The
+    version the pointer replaced is removed afterwards (load_mall retries
+    if it loses that race). Concurrent writers each publish a complete
+    snapshot and the last rename wins; a version two writers both
+    displace may be left behind.
+    """
+    os.makedirs(path, exist_ok=True)
+    version = tempfile.mkdtemp(prefix="v-", dir=path)
+    pointer = None
+    try:
+        for name in ARRAYS:
+            np.save(os.path.join(version, name + ".npy"), arrays[name])
+        with open(os.path.join(version, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        previous = current_version(path)
+        fd, pointer = tempfile.mkstemp(prefix=".current-", dir=path)
+        with os.fdopen(fd, "w") as f:
+            f.write(os.path.basename(version))
+        os.replace(pointer, os.path.join(path, POINTER))
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        if pointer is not None and os.path.exists(pointer):
+            os.remove(pointer)
+        raise
+    if previous is not None and previous != os.path.basename(version):
+        shutil.rmtree(os.path.join(path, previous), ignore_errors=True)
+
+
+def current_version(path: str):
+    """ Name of the version directory path/CURRENT points at (None if there is none) """
+    try:
+        with open(os.path.join(path, POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_exists(path: str) -> bool:
+    return current_version(path) is not None
+
+
+def load_mall(mall_cls, path: str):
+    """
+    Loads a snapshot written by save_mall into a new mall_cls instance,
+    with its compiled view already built on the mapped arrays. If a
+    writer replaces the snapshot while it is being opened, the load is
+    retried on the new version.
+    """
+    while True:
+        version = current_version(path)
+        if version is None:
+            raise FileNotFoundError(f"No mall snapshot at {path}")
+        try:
+            return load_version(mall_cls, os.path.join(path, version))
+        except FileNotFoundError:
+            if current_version(path) == version:
+                raise
+
+
+def load_version(mall_cls, path: str):
+    """ Loads one version directory of a snapshot """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported mall snapshot format: {meta.get('format')}")
+
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="c") for name in ARRAYS}
+    return build_mall(mall_cls, meta, arrays)
+
+
+def build_mall(mall_cls, meta: dict, arrays: dict):
+    """
+    Builds the object graph of a mall_cls instance from snapshot meta and
+    compiled-graph arrays (in the order of ARRAYS), and attaches a
+    compiled view on those arrays.
+    """
+    num_floors, rows, columns = meta["num_floors"], meta["rows"], meta["columns"]
+
+    mall = mall_cls(num_floors=num_floors, rows=rows, columns=columns,
+                    agent_start_floor=meta["agent_start_floor"], **meta["settings"])
+
+    store_names = {}
+    for floor_meta in meta["floors"]:
+        store_names.update(zip(floor_meta["stores"], floor_meta["store_names"]))
+
+    # cells
+    types = arrays["types"].tolist()
+    nodes = [None] * len(types)
+    grids = []
+    for f in range(num_floors):
+        grid = []
+        for r in range(rows):
+            row = []
+            for c in range(columns):
+                node_id = (r * columns + c) * num_floors + f
+                node = _make_node(types[node_id], r, c, f, store_names.get(node_id, ""))
+                nodes[node_id] = node
+                row.append(node)
+            grid.append(row)
+        grids.append(grid)
+
+    # links, in their original order
+    obstacle = TYPE_CODES["obstacle"]
+    offsets = arrays["offsets"].tolist()
+    targets = arrays["targets"].tolist()
+    weights = arrays["weights"].tolist()
+    directions = arrays["directions"].tolist()
+    for u, node in enumerate(nodes):
+        if types[u] == obstacle:
+            continue
+        links = node.neighbors
+        for edge in range(offsets[u], offsets[u + 1]):
+            v = targets[edge]
+            if types[v] != obstacle:
+                links.append(Neighbor(DIRECTIONS[directions[edge]], nodes[v], weights[edge]))
+
+    for f, grid in enumerate(grids):
+        floor = Floor(rows, columns, f_number=f, grid=grid)
+        floor_meta = meta["floors"][f]
+        floor.stores = [nodes[i] for i in floor_meta["stores"]]
+        floor.elevators = [nodes[i] for i in floor_meta["elevators"]]
+        floor.stairs = [nodes[i] for i in floor_meta["stairs"]]
+        mall.floors.append(floor)
+
+    if meta["start"] is not None:
+        mall.floors[mall.agent_start_floor].start_node = nodes[meta["start"]]
+    if meta["goal"] is not None:
+        nodes[meta["goal"]].has_goal_item = True
+
+    mall.graph = CompiledMall(num_floors, rows, columns,
+                              arrays["offsets"], arrays["targets"], arrays["weights"],
+                              arrays["directions"], arrays["types"], nodes=nodes)
+    return mall
+
+
+def _make_node(code: int, row: int, column: int, f_number: int, name: str):
+    if code == TYPE_CODES["generic"]:
+        return Node(row, column, f_number)
+    if code == TYPE_CODES["start"]:
+        return Node(row, column, f_number, node_type="start")
+    if code == TYPE_CODES["store"]:
+        return Store(row, column, f_number, name=name)
+    if code == TYPE_CODES["elevator"]:
+        return Elevator(row, column, f_number)
+    if code == TYPE_CODES["stairs"]:
+        return Stairs(row, column, f_number)
+    return Obstacle(row, column, f_number)
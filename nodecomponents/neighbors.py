@@ -1,6 +1,8 @@
 from interfaces.edges import Edge
 
 class Neighbor(Edge):
+    __slots__ = ("direction", "node")
+
     def __init__(self, direction: str, node: "Node", weight: float = 1.0):
         super().__init__(weight)
         self.direction = direction
@@ -1,6 +1,8 @@
 from interfaces.nodes import Node
 
 class Obstacle(Node):
+    __slots__ = ()
+
     def __init__(self, row, column, f_number=0):
         super().__init__(row, column, f_number, node_type="obstacle")
 
@@ -1,6 +1,8 @@
 from interfaces.nodes import Node
 
 class Store(Node):
+    __slots__ = ("has_goal_item",)
+
     def __init__(self, row: int, column: int, f_number: int = 0, name: str = "", has_goal_item: bool = False):
         super().__init__(row, column, f_number, name=name, node_type="store")
         self.has_goal_item = has_goal_item
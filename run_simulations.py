@@ -1,11 +1,22 @@
+import argparse
 import csv
+import hashlib
+import json
+import os
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from mallcomponents.mall                 import Mall
+from mallcomponents.layout               import LayoutGenerator
+from mallcomponents.snapshot             import snapshot_exists
 from agents.astar_agent                  import AStarAgent
 from agents.mgastar_agent                import MultiGoalAStarAgent
 from agents.dstarlite_agent              import DStarLiteAgent
+from agents.bidirectional_astar_agent    import BidirectionalAStarAgent
+from agents.jps_agent                    import JumpPointAgent
+from algorithms.store_order              import StoreOrdering
+from utils.search_stats                  import SearchStats
 
 
 def compute_path_cost(path):
@@ -18,9 +29,31 @@ def compute_path_cost(path):
     return cost
 
 
-def make_mall(seed, **kwargs):
-    random.seed(seed)
-    m = Mall(
+# bump when generation changes, so cached snapshots of older malls are not reused
+CACHE_VERSION = 2
+
+
+def snapshot_path(cache_dir, seed, cfg):
+    """Snapshot directory of the mall generated for (seed, cfg)."""
+    key = json.dumps([CACHE_VERSION, cfg], sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"mall-{digest}-seed{seed}")
+
+
+def make_mall(seed, cache_dir=None, generator="objects", **kwargs):
+    """
+    Generates the mall for seed, or with cache_dir, loads its snapshot
+    (generating and saving it on the first request). generator="arrays"
+    builds the layout with the NumPy LayoutGenerator instead of
+    Mall.run_mall_setup (a different mall for the same seed).
+    """
+    if cache_dir is not None:
+        key = kwargs if generator == "objects" else dict(kwargs, generator=generator)
+        path = snapshot_path(cache_dir, seed, key)
+        if snapshot_exists(path):
+            return Mall.load(path)
+
+    params = dict(
         num_floors=kwargs.get("num_floors", 3),
         rows=kwargs.get("rows", 20),
         columns=kwargs.get("columns", 20),
@@ -29,132 +62,369 @@ def make_mall(seed, **kwargs):
         num_elevators=kwargs.get("num_elevators", 2),
         num_stairs=kwargs.get("num_stairs", 2)
     )
-    m.run_mall_setup()
+    if generator == "arrays":
+        m = LayoutGenerator(**params).generate(seed).to_mall()
+    else:
+        random.seed(seed)
+        m = Mall(**params)
+        m.run_mall_setup()
+        m.compile()
+    if cache_dir is not None:
+        m.save(path)
     return m
 
 
+ALGORITHMS = (
+    ("A*", AStarAgent),
+    ("MultiGoal-A*", MultiGoalAStarAgent),
+    ("D* Lite", DStarLiteAgent),
+    ("Bidirectional A*", BidirectionalAStarAgent),
+    ("JPS", JumpPointAgent),
+)
+AGENTS = tuple(agent_cls for _, agent_cls in ALGORITHMS)
+
+# store visiting orders: Manhattan distance from the start (every store
+# planned from the start), or a StoreOrdering route (planned leg by leg)
+ORDERINGS = ("manhattan", "route")
+
+# columns of batch_results.csv; the first nine identify the (config, seed, generator).
+# path_length/path_cost mean the same for every ordering: the shortest
+# start -> store paths of the stores tried, in the agent's order, up to
+# the goal store. Route agents walk their legs store to store instead;
+# walk_length/walk_cost add up those legs (empty for "manhattan", where
+# every search starts at the start). expanded counts the agent's own
+# searches only; setup_expanded is the DistanceTable work a "route"
+# ordering read (0 for "manhattan"), whether or not an earlier agent had
+# already paid for it.
+RESULT_FIELDS = [
+    "seed", "elevators", "stairs", "rows", "columns",
+    "num_floors", "stores_per_floor", "obstacle_density", "generator",
+    "algorithm", "expanded", "setup_expanded", "path_length", "path_cost",
+    "walk_length", "walk_cost", "ends_at", "time",
+    *SearchStats.FIELDS
+]
+TASK_FIELDS = RESULT_FIELDS[:9]
+
+
+def algorithm_name(agent):
+    # exact class first: agents may subclass one another
+    for name, agent_cls in ALGORITHMS:
+        if type(agent) is agent_cls:
+            return name
+    for name, agent_cls in ALGORITHMS:
+        if isinstance(agent, agent_cls):
+            return name
+    raise ValueError("Unknown agent type")
+
+
+def agent_label(name, ordering="manhattan"):
+    """Algorithm column of an agent's rows; non-default orderings are tagged."""
+    return name if ordering == "manhattan" else f"{name} ({ordering})"
+
+
+def start_to_store_totals(mall, start, stores):
+    """
+    (length, cost) of the shortest start -> store paths of stores, read
+    from the mall's DistanceTable; unreachable stores add nothing.
+    """
+    table = mall.distance_table()
+    length, cost = 0, 0.0
+    for store in stores:
+        path = table.path(start, store)
+        if path:
+            length += len(path)
+            cost += table.distance(start, store)
+    return length, cost
+
+
 def run_agent(mall, agent):
     start = mall.floors[mall.agent_start_floor].start_node
     goals = mall.get_all_stores()
+    algorithm = algorithm_name(agent)
+    ordering = getattr(agent, "ordering", None)
+    if ordering is not None:
+        algorithm = agent_label(algorithm, "route")
 
-    if isinstance(agent, AStarAgent):
-        algorithm = "A*"
-    elif isinstance(agent, MultiGoalAStarAgent):
-        algorithm = "MultiGoal-A*"
-    elif isinstance(agent, DStarLiteAgent):
-        algorithm = "D* Lite"
-    else:
-        raise ValueError("Unknown agent type") 
-
+    stats = SearchStats()
     t0 = time.perf_counter()
     path, expanded, length, cost = agent.run(
         env=mall,
         start_node=start,
-        goal_nodes=goals
+        goal_nodes=goals,
+        stats=stats
     )
     compute_time = time.perf_counter() - t0
 
+    walk_length = walk_cost = None
+    if ordering is not None:
+        # the stores the agent tried: its route up to the goal store
+        tried = ordering.route
+        for i, store in enumerate(tried):
+            if getattr(store, "has_goal_item", False):
+                tried = tried[:i + 1]
+                break
+        walk_length, walk_cost = length, cost
+        length, cost = start_to_store_totals(mall, start, tried)
+
     return {
         "algorithm":   algorithm,
         "expanded":    expanded,
+        "setup_expanded": ordering.setup_expanded if ordering is not None else 0,
         "time":        compute_time,
         "path_length": length,
         "path_cost":   cost,
+        "walk_length": walk_length,
+        "walk_cost":   walk_cost,
         "ends_at":     (path[-1].row, path[-1].column, path[-1].f_number)
-                       if path else None
+                       if path else None,
+        **stats.as_dict()
     }
 
-def main():
-    SEEDS   = list(range(10))
-    CONFIGS = [
-        {"num_floors": 3, "rows": 20, "columns": 20, "stores_per_floor": 10, "obstacle_density": 0.2, "num_elevators": 5, "num_stairs": 5},
-        {"num_floors": 4, "rows": 55, "columns": 55, "stores_per_floor": 20, "obstacle_density": 0.40, "num_elevators": 6, "num_stairs": 6}
-    ]
-    agents_list = [
-        AStarAgent(),
-        MultiGoalAStarAgent(),
-        DStarLiteAgent()
-    ]
-    all_results = []
-
-    # --- Run all simulations ---
-    for cfg in CONFIGS:
-        for seed in SEEDS:
-            mall = make_mall(seed, **cfg)
-            for agent in agents_list:
-                res = run_agent(mall, agent)
-                res.update({
-                    "seed": seed,
-                    "elevators": cfg["num_elevators"],
-                    "stairs": cfg["num_stairs"],
-                    "rows": cfg["rows"],
-                    "columns": cfg["columns"],
-                    "num_floors": cfg["num_floors"],
-                    "stores_per_floor": cfg["stores_per_floor"],
-                    "obstacle_density": cfg["obstacle_density"]
-                })
-                all_results.append(res)
-
-    # --- Compute summaries ---
+
+def task_columns(cfg, seed, generator="objects"):
+    """The TASK_FIELDS of every result row of one (config, seed) task."""
+    return {
+        "seed": seed,
+        "elevators": cfg["num_elevators"],
+        "stairs": cfg["num_stairs"],
+        "rows": cfg["rows"],
+        "columns": cfg["columns"],
+        "num_floors": cfg["num_floors"],
+        "stores_per_floor": cfg["stores_per_floor"],
+        "obstacle_density": cfg["obstacle_density"],
+        "generator": generator
+    }
+
+
+def row_key(row, algorithm=None):
+    """
+    (config, seed, generator, algorithm) key of a result row, in the string
+    form the row has when read back from the CSV.
+    """
+    return tuple(str(row[field]) for field in TASK_FIELDS) + (algorithm or row["algorithm"],)
+
+
+def run_task(task):
+    """
+    Runs the agents named in algorithms (all of them if None) on the mall
+    of one (config, seed) pair.
+    make_mall reseeds the RNG from the seed alone, so a task produces the
+    same mall and results whichever worker runs it, and in whatever order.
+    With a cache_dir the mall comes from its snapshot when there is one.
+    """
+    cfg, seed, cache_dir, generator, algorithms, ordering = task
+    mall = make_mall(seed, cache_dir=cache_dir, generator=generator, **cfg)
+    results = []
+    for name, agent_cls in ALGORITHMS:
+        if algorithms is not None and name not in algorithms:
+            continue
+        agent = agent_cls() if ordering == "manhattan" else agent_cls(ordering=StoreOrdering())
+        res = run_agent(mall, agent)
+        res.update(task_columns(cfg, seed, generator))
+        results.append(res)
+    return results
+
+
+def iter_sweep(configs, seeds, workers=None, cache_dir=None, generator="objects", done=(),
+               algorithms=None, ordering="manhattan"):
+    """
+    Runs every (config, seed) task, on a pool of worker processes unless
+    workers == 1, and yields (task index, results) as each task finishes.
+    Only the agents named in algorithms run (all of them if None); agents
+    whose row_key is in done are skipped, and so are tasks with nothing
+    left to run. ordering picks the agents' store order (see ORDERINGS).
+    workers defaults to the number of CPUs.
+    """
+    tasks = []
+    for cfg in configs:
+        for seed in seeds:
+            columns = task_columns(cfg, seed, generator)
+            todo = tuple(name for name, _ in ALGORITHMS
+                         if (algorithms is None or name in algorithms)
+                         and row_key(columns, agent_label(name, ordering)) not in done)
+            if todo:
+                tasks.append((cfg, seed, cache_dir, generator, todo, ordering))
+    if not tasks:
+        return
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) == 1:
+        for i, task in enumerate(tasks):
+            yield i, run_task(task)
+        return
+
+    # submit the biggest malls first so no worker is left with a large
+    # task at the end
+    def size(i):
+        cfg = tasks[i][0]
+        return cfg["num_floors"] * cfg["rows"] * cfg["columns"]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = {pool.submit(run_task, tasks[i]): i
+                   for i in sorted(range(len(tasks)), key=size, reverse=True)}
+        for future in as_completed(futures):
+            # drop finished futures so their results are not kept around
+            yield futures.pop(future), future.result()
+
+
+def run_sweep(configs, seeds, workers=None, cache_dir=None, generator="objects", algorithms=None,
+              ordering="manhattan"):
+    """
+    Runs every (config, seed) task and returns the results in
+    (config, seed, agent) order. See iter_sweep.
+    """
+    per_task = dict(iter_sweep(configs, seeds, workers=workers, cache_dir=cache_dir,
+                               generator=generator, algorithms=algorithms, ordering=ordering))
+    return [res for i in sorted(per_task) for res in per_task[i]]
+
+
+def drop_partial_row(path):
+    """Cuts a last line that a crash left half-written off the file at path."""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                pos = pos - step + newline + 1
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+
+def read_done(path):
+    """
+    Keys (see row_key) of the result rows already in the CSV at path,
+    after dropping a half-written last row. Raises ValueError if the file
+    was written with different columns.
+    """
+    if not os.path.exists(path):
+        return set()
+    drop_partial_row(path)
+    if os.path.getsize(path) == 0:
+        return set()
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != RESULT_FIELDS:
+            raise ValueError(f"{path} has different columns; cannot resume into it")
+        return {row_key(row) for row in reader}
+
+
+def summarize(path):
+    """Per-(algorithm, config) averages of the result rows in the CSV at path."""
     summary = {}
-    for r in all_results:
-        key = (
-            r["algorithm"], r["elevators"], r["stairs"],
-            r["rows"], r["columns"], r["num_floors"],
-            r["stores_per_floor"], r["obstacle_density"]
-        )
-        stats = summary.setdefault(key, {
-            "count": 0,
-            "sum_len": 0,
-            "sum_cost": 0.0,
-            "sum_exp": 0,
-            "sum_time": 0.0
-        })
-        stats["count"] += 1
-        stats["sum_len"] += r["path_length"]
-        stats["sum_cost"] += r["path_cost"]
-        stats["sum_exp"] += r["expanded"]
-        stats["sum_time"] += r["time"]
+    with open(path, newline="") as f:
+        for r in csv.DictReader(f):
+            key = (
+                r["algorithm"], int(r["elevators"]), int(r["stairs"]),
+                int(r["rows"]), int(r["columns"]), int(r["num_floors"]),
+                int(r["stores_per_floor"]), float(r["obstacle_density"]), r["generator"]
+            )
+            stats = summary.setdefault(key, {
+                "count": 0,
+                "sum_len": 0,
+                "sum_cost": 0.0,
+                "sum_exp": 0,
+                "sum_setup": 0,
+                "sum_time": 0.0
+            })
+            stats["count"] += 1
+            stats["sum_len"] += int(r["path_length"])
+            stats["sum_cost"] += float(r["path_cost"])
+            stats["sum_exp"] += int(r["expanded"])
+            stats["sum_setup"] += int(r["setup_expanded"])
+            stats["sum_time"] += float(r["time"])
+    return summary
 
-    # --- Print summary grouped by config ---
+
+def print_summary(summary):
     printed_configs = set()
-    for (alg, e, s, rows, cols, floors, spf, odens), stats in summary.items():
-        config_key = (e, s, rows, cols, floors, spf, odens)
+    for (alg, e, s, rows, cols, floors, spf, odens, gen), stats in sorted(summary.items(),
+                                                                           key=lambda item: item[0][1:]):
+        config_key = (e, s, rows, cols, floors, spf, odens, gen)
         if config_key not in printed_configs:
             printed_configs.add(config_key)
             
             print("\n" + "-" * 72)
             print("--- Setup ---".center(72))
             print(f"{'Floors':<8} {'Rows':<6} {'Cols':<6} {'Stores/Floor':<15} "
-                  f"{'Obst. Density':<15} {'Elevators':<10} {'Stairs':<8}")
+                  f"{'Obst. Density':<15} {'Elevators':<10} {'Stairs':<8} {'Generator':<9}")
             print(f"{floors:>6} {rows:>6} {cols:>6} {spf:>14} "
-                  f"{odens:>16.2f} {e:>10} {s:>8}")
+                  f"{odens:>16.2f} {e:>10} {s:>8} {gen:>9}")
 
             print("\n" + "--- Averages ---".center(72))
-            print(f"{'Alg':<15} {'Avg Len':>10} {'Avg Cost':>10} "
-                  f"{'Avg Exp':>12} {'Avg Time(s)':>14}")
+            print(f"{'Alg':<24} {'Avg Len':>10} {'Avg Cost':>10} "
+                  f"{'Avg Exp':>12} {'Avg Setup':>12} {'Avg Time(s)':>14}")
 
         cnt = stats["count"]
         avg_len = stats["sum_len"] / cnt
         avg_cost = stats["sum_cost"] / cnt
         avg_exp = stats["sum_exp"] / cnt
+        avg_setup = stats["sum_setup"] / cnt
         avg_time = stats["sum_time"] / cnt
 
-        print(f"{alg:<15} {avg_len:10.2f} {avg_cost:10.2f} "
-              f"{avg_exp:12.2f} {avg_time:14.4f}")
+        print(f"{alg:<24} {avg_len:10.2f} {avg_cost:10.2f} "
+              f"{avg_exp:12.2f} {avg_setup:12.2f} {avg_time:14.4f}")
     print("-" * 72 + "\n") 
 
-    # --- Save to CSV ---
-    with open("batch_results.csv", "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            "seed", "elevators", "stairs", "rows", "columns",
-            "num_floors", "stores_per_floor", "obstacle_density",
-            "algorithm", "expanded", "path_length", "path_cost", "ends_at", "time"
-        ])
-        writer.writeheader()
-        writer.writerows(all_results)
-
-    print("\nWrote batch_results.csv")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the agent comparison sweep.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: number of CPUs, 1 runs in-process)")
+    parser.add_argument("--cache", default=None, metavar="DIR",
+                        help="load/save generated malls as snapshots in DIR")
+    parser.add_argument("--generator", choices=("objects", "arrays"), default="objects",
+                        help="mall generator: Mall.run_mall_setup or the NumPy LayoutGenerator")
+    parser.add_argument("--algorithms", default=None,
+                        help="comma-separated subset of: " + ", ".join(name for name, _ in ALGORITHMS))
+    parser.add_argument("--ordering", choices=ORDERINGS, default="manhattan",
+                        help="store visiting order: Manhattan distance from the start, or a "
+                             "shortest route over exact distances (rows tagged '(route)'; the "
+                             "chained walk is in walk_length/walk_cost, the distance table work "
+                             "in setup_expanded)")
+    parser.add_argument("--output", default="batch_results.csv",
+                        help="CSV file the results are streamed to")
+    parser.add_argument("--resume", action="store_true",
+                        help="keep the rows already in --output and skip their "
+                             "(config, seed, generator, algorithm) runs")
+    args = parser.parse_args()
+
+    algorithms = None
+    if args.algorithms:
+        algorithms = [name.strip() for name in args.algorithms.split(",") if name.strip()]
+        unknown = [name for name in algorithms if name not in dict(ALGORITHMS)]
+        if unknown:
+            parser.error(f"unknown algorithm(s): {', '.join(unknown)}")
+
+    SEEDS   = list(range(10))
+    CONFIGS = [
+        {"num_floors": 3, "rows": 20, "columns": 20, "stores_per_floor": 10, "obstacle_density": 0.2, "num_elevators": 5, "num_stairs": 5},
+        {"num_floors": 4, "rows": 55, "columns": 55, "stores_per_floor": 20, "obstacle_density": 0.40, "num_elevators": 6, "num_stairs": 6}
+    ]
+
+    # --- Run all simulations, appending each task's rows as it finishes ---
+    done = read_done(args.output) if args.resume else set()
+    if done:
+        print(f"Resuming: {len(done)} result rows already in {args.output}")
+    with open(args.output, "a" if done else "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if not done:
+            writer.writeheader()
+            f.flush()
+        for _, results in iter_sweep(CONFIGS, SEEDS, workers=args.workers, cache_dir=args.cache,
+                                     generator=args.generator, done=done,
+                                     algorithms=algorithms, ordering=args.ordering):
+            writer.writerows(results)
+            f.flush()
+
+    # --- Print summary grouped by config ---
+    print_summary(summarize(args.output))
+    print(f"\nWrote {args.output}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+import pytest
+from tests.helpers import build_mall
+
+
+@pytest.fixture(params=[0, 1, 2])
+def mall(request):
+    return build_mall(request.param)
@@ -0,0 +1,37 @@
+import random
+from mallcomponents.mall import Mall
+from mallcomponents.compiled import TYPE_CODES
+
+
+def build_mall(seed, num_floors=3, rows=14, columns=16, stores_per_floor=5,
+               obstacle_density=0.2, num_elevators=2, num_stairs=2):
+    random.seed(seed)
+    mall = Mall(num_floors=num_floors, rows=rows, columns=columns,
+                stores_per_floor=stores_per_floor, obstacle_density=obstacle_density,
+                num_elevators=num_elevators, num_stairs=num_stairs)
+    mall.run_mall_setup()
+    return mall
+
+
+def path_cost(graph, path):
+    """Cost of a Node path on the compiled view (inf if two cells are not linked)."""
+    ids = [graph.id_of(n) for n in path]
+    cost = 0.0
+    for u, v in zip(ids, ids[1:]):
+        edges = [graph.weights[e] for e in range(graph.offsets[u], graph.offsets[u + 1])
+                 if graph.targets[e] == v]
+        cost += min(edges, default=float('inf'))
+    return cost
+
+
+def open_cells(graph):
+    """Ids of the cells a shopper can stand on."""
+    return [v for v in range(graph.num_nodes) if graph.types[v] != TYPE_CODES["obstacle"]]
+
+
+def query_pairs(graph, count, seed):
+    """count (source, target) pairs of open cells, the first one with source == target."""
+    rng = random.Random(seed)
+    cells = open_cells(graph)
+    source = rng.choice(cells)
+    return [(source, source)] + [tuple(rng.sample(cells, 2)) for _ in range(count - 1)]
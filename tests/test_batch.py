@@ -0,0 +1,67 @@
+import random
+import pytest
+from algorithms.batch import group_queries, shortest_paths
+from algorithms.dijkstra import shortest_distances
+from tests.helpers import open_cells, path_cost
+
+
+def random_queries(mall, count, seed):
+    graph = mall.compile()
+    rng = random.Random(seed)
+    cells = open_cells(graph)
+    stores = mall.get_all_stores()
+    starts = [graph.nodes[v] for v in rng.sample(cells, 4)]
+    return [(rng.choice(starts), rng.sample(stores, rng.randint(1, 4))) for _ in range(count)]
+
+
+def test_group_queries_covers_every_pair():
+    rng = random.Random(1)
+    pairs = {(rng.randrange(8), rng.randrange(20)) for _ in range(60)}
+    covered = set()
+    for direction, root, others in group_queries(pairs):
+        covered |= {(root, o) if direction == "forward" else (o, root) for o in others}
+    assert covered == pairs
+
+
+@pytest.mark.parametrize("queue", ["heap", "buckets"])
+def test_plan_batch_matches_dijkstra(mall, queue):
+    graph = mall.compile()
+    queries = random_queries(mall, 25, seed=2)
+    results = mall.plan_batch(queries, queue=queue)
+    assert len(results) == len(queries)
+
+    for (start, goals), reached in zip(queries, results):
+        distance = shortest_distances(graph, graph.id_of(start))
+        expected = {graph.id_of(g) for g in goals if distance[graph.id_of(g)] != float('inf')}
+        assert {graph.id_of(r["goal"]) for r in reached} == expected
+        assert [r["cost"] for r in reached] == sorted(r["cost"] for r in reached)
+        for r in reached:
+            goal = graph.id_of(r["goal"])
+            assert r["cost"] == pytest.approx(distance[goal])
+            assert r["path"][0] is start and graph.id_of(r["path"][-1]) == goal
+            assert path_cost(graph, r["path"]) == pytest.approx(distance[goal])
+
+
+def test_plan_batch_without_paths(mall):
+    queries = random_queries(mall, 10, seed=3)
+    with_paths = mall.plan_batch(queries)
+    without = mall.plan_batch(queries, paths=False)
+    for a, b in zip(with_paths, without):
+        assert [r["cost"] for r in a] == [r["cost"] for r in b]
+        assert all(r["path"] is None for r in b)
+
+
+def test_shortest_paths_with_shared_targets(mall):
+    graph = mall.compile()
+    stores = [graph.id_of(s) for s in mall.get_all_stores()]
+    sources = open_cells(graph)[:30]
+    pairs = [(s, t) for s in sources for t in stores[:2]]
+    answers = shortest_paths(graph, pairs)
+    for s, t in pairs:
+        expected = shortest_distances(graph, s)[t]
+        if expected == float('inf'):
+            assert (s, t) not in answers
+        else:
+            cost, path = answers[(s, t)]
+            assert cost == pytest.approx(expected)
+            assert path[0] == s and path[-1] == t
@@ -0,0 +1,130 @@
+import math
+import random
+from algorithms.dijkstra import shortest_distances
+from mallcomponents.compiled import CompiledMall, TYPE_CODES
+from tests.helpers import build_mall, open_cells
+
+
+def test_compiled_view_matches_object_graph(mall):
+    graph = mall.compile()
+    for floor in mall.floors:
+        for row in floor.grid:
+            for node in row:
+                u = graph.id_of(node)
+                assert graph.nodes[u] is node
+                expected = sorted((graph.id_of(link.node), link.weight) for link in node.get_neighbors()
+                                  if link.node.node_type != "obstacle")
+                edges = range(graph.offsets[u], graph.offsets[u + 1])
+                assert sorted((int(graph.targets[e]), float(graph.weights[e])) for e in edges) == expected
+
+
+def test_reverse_csr_lists_incoming_edges(mall):
+    graph = mall.compile()
+    for v in range(graph.num_nodes):
+        slots = range(graph.rev_offsets[v], graph.rev_offsets[v + 1])
+        for slot in slots:
+            assert graph.targets[graph.rev_edges[slot]] == v
+        assert len(slots) == int((graph.targets == v).sum())
+
+
+def test_every_store_reachable_from_start(mall):
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    distance = shortest_distances(graph, graph.id_of(start))
+    assert all(math.isfinite(distance[graph.id_of(s)]) for s in mall.get_all_stores())
+
+
+def test_place_obstacle_blocks_cell_and_keeps_stores_reachable():
+    mall = build_mall(3)
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    stores = [graph.id_of(s) for s in mall.get_all_stores()]
+    rng = random.Random(3)
+    generic = [v for v in open_cells(graph) if graph.types[v] == TYPE_CODES["generic"]]
+
+    placed = 0
+    for v in rng.sample(generic, 40):
+        node = graph.nodes[v]
+        version = graph.version
+        changed = mall.place_obstacle(node.f_number, node.row, node.column)
+        if changed is None:
+            assert graph.types[v] == TYPE_CODES["generic"]
+            continue
+        placed += 1
+        assert graph.types[v] == TYPE_CODES["obstacle"]
+        assert graph.version > version
+        assert all(v in edge for edge in changed)
+        assert all(graph.weights[e] == float('inf')
+                   for e in range(graph.offsets[v], graph.offsets[v + 1]))
+        distance = shortest_distances(graph, graph.id_of(start))
+        assert all(math.isfinite(distance[s]) for s in stores)
+    assert placed > 0
+
+    # the edited view gives the same distances as compiling the edited mall afresh
+    fresh = CompiledMall.from_mall(mall)
+    source = graph.id_of(start)
+    assert shortest_distances(graph, source) == shortest_distances(fresh, source)
+
+
+def test_place_obstacle_after_closing_an_elevator_keeps_stores_reachable():
+    for seed in range(10):
+        mall = build_mall(seed)
+        graph = mall.compile()
+        elevator = mall.floors[0].elevators[0]
+        mall.close_elevator(elevator.row, elevator.column)
+        source = graph.id_of(mall.floors[mall.agent_start_floor].start_node)
+        stores = [graph.id_of(s) for s in mall.get_all_stores()]
+        distance = shortest_distances(graph, source)
+        reachable = [s for s in stores if math.isfinite(distance[s])]
+
+        rng = random.Random(seed)
+        for _ in range(60):
+            mall.place_obstacle(rng.randrange(mall.num_floors), rng.randrange(1, mall.rows - 1),
+                                rng.randrange(1, mall.columns - 1))
+        distance = shortest_distances(graph, source)
+        assert all(math.isfinite(distance[s]) for s in reachable)
+
+
+def test_place_obstacle_refuses_non_generic_cells():
+    mall = build_mall(4)
+    graph = mall.compile()
+    store = mall.get_all_stores()[0]
+    assert mall.place_obstacle(store.f_number, store.row, store.column) is None
+    assert graph.types[graph.id_of(store)] == TYPE_CODES["store"]
+
+
+def test_adjacency_mirrors_match_the_arrays(mall):
+    graph = mall.compile()
+    arrays_only = graph.memory_bytes()
+    offsets, targets, weights, rows, columns = graph.adjacency()
+    assert list(offsets) == graph.offsets.tolist()
+    assert list(targets) == graph.targets.tolist()
+    assert list(weights) == graph.weights.tolist()
+    assert (list(rows), list(columns)) == (graph.row_of.tolist(), graph.column_of.tolist())
+    rev_offsets, rev_sources, rev_weights = graph.reverse_adjacency()
+    assert list(rev_offsets) == graph.rev_offsets.tolist()
+    assert list(rev_sources) == graph.rev_sources.tolist()
+    assert list(rev_weights) == graph.weights[graph.rev_edges].tolist()
+    mirrors = sum(m.itemsize * len(m) for m in graph.adjacency() + graph.reverse_adjacency())
+    assert graph.memory_bytes() == arrays_only + mirrors
+
+
+def test_set_edge_weight_updates_view_and_caches(mall):
+    graph = mall.compile()
+    graph.adjacency()
+    graph.reverse_adjacency()
+    graph.scaled_weights()
+    graph.scaled_weights(reverse=True)
+
+    node = mall.floors[mall.agent_start_floor].start_node
+    link = node.get_neighbors()[0]
+    u, v = graph.id_of(node), graph.id_of(link.node)
+    assert mall.set_edge_weight(node, link.node, 7.0) == [(u, v)]
+
+    fresh = CompiledMall.from_mall(mall)
+    assert graph.adjacency()[2] == fresh.adjacency()[2]
+    assert graph.reverse_adjacency()[2] == fresh.reverse_adjacency()[2]
+    assert graph.scaled_weights(reverse=True) == fresh.scaled_weights(reverse=True)
+    for reverse in (False, True):
+        assert (shortest_distances(graph, u, reverse=reverse, queue="buckets")
+                == shortest_distances(fresh, u, reverse=reverse))
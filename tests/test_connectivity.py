@@ -0,0 +1,56 @@
+import random
+from interfaces.nodes import Node
+from mallcomponents.floor import Floor
+from mallcomponents.node_connectivity import connect_nodes
+from nodecomponents.static_obstacles import Obstacle
+from tests.helpers import build_mall
+
+HORIZONTAL = ("up", "down", "left", "right")
+
+
+def links(floor):
+    """(direction, cell) of every link on the floor, per cell, in link order."""
+    return {(node.row, node.column): [(link.direction, (link.node.row, link.node.column), link.weight)
+                                      for link in node.neighbors]
+            for row in floor.grid for node in row}
+
+
+def test_replace_node_matches_a_full_reconnect():
+    rng = random.Random(0)
+    floor = Floor(9, 11)
+    # connect_nodes only handles perimeter cells whose inward neighbor is walkable
+    cells = [(r, c) for r in range(2, 7) for c in range(2, 9)]
+    for _ in range(300):
+        r, c = rng.choice(cells)
+        if floor.grid[r][c].node_type == "obstacle":
+            floor.replace_node(r, c, Node(r, c, 0))
+        else:
+            floor.replace_node(r, c, Obstacle(r, c, 0))
+        incremental = links(floor)
+        connect_nodes(floor.grid, floor.rows, floor.columns)
+        assert incremental == links(floor)
+
+
+def test_obstacle_round_trip_restores_horizontal_links():
+    for seed in range(6):
+        mall = build_mall(seed, obstacle_density=0.3)
+        rng = random.Random(seed)
+        for floor in mall.floors:
+            before = {cell: [l for l in node_links if l[0] in HORIZONTAL]
+                      for cell, node_links in links(floor).items()}
+            generic = [node for row in floor.grid for node in row if node.node_type == "generic"
+                       and 0 < node.row < floor.rows - 1 and 0 < node.column < floor.columns - 1]
+            for node in rng.sample(generic, min(15, len(generic))):
+                floor.replace_node(node.row, node.column, Obstacle(node.row, node.column, floor.f_number))
+                floor.replace_node(node.row, node.column, Node(node.row, node.column, floor.f_number))
+            after = {cell: [l for l in node_links if l[0] in HORIZONTAL]
+                     for cell, node_links in links(floor).items()}
+            assert after == before
+
+
+def test_perimeter_follows_replaced_cells(mall):
+    for floor in mall.floors:
+        assert len(floor.perimeter) == 2 * floor.columns + 2 * (floor.rows - 2)
+        for node in floor.perimeter:
+            assert floor.grid[node.row][node.column] is node
+        assert sum(node.node_type == "store" for node in floor.perimeter) == len(floor.stores)
@@ -0,0 +1,82 @@
+import random
+import numpy as np
+import pytest
+from algorithms.dijkstra import shortest_distances
+from mallcomponents.compiled import TYPE_CODES
+from mallcomponents.crowd import CrowdSimulation
+from tests.helpers import build_mall
+
+UNLIMITED = 10 ** 6
+
+
+def add_random_shoppers(mall, sim, count, seed):
+    graph = mall.compile()
+    rng = random.Random(seed)
+    generic = [v for v in range(graph.num_nodes) if graph.types[v] == TYPE_CODES["generic"]
+               and graph.offsets[v + 1] > graph.offsets[v]]
+    stores = mall.get_all_stores()
+    starts = [graph.nodes[v] for v in rng.sample(generic, count)]
+    lists = [rng.sample(stores, 2) for _ in range(count)]
+    return starts, lists, sim.add_shoppers(starts, lists)
+
+
+def test_uncongested_shoppers_walk_shortest_routes():
+    mall = build_mall(0)
+    graph = mall.compile()
+    sim = CrowdSimulation(mall, cell_capacity=UNLIMITED, elevator_capacity=UNLIMITED,
+                          stairs_capacity=UNLIMITED)
+    starts, lists, ids = add_random_shoppers(mall, sim, 40, seed=0)
+    sim.run()
+    for a, start, stores in zip(ids.tolist(), starts, lists):
+        stops = [graph.id_of(start)] + [graph.id_of(s) for s in stores]
+        cost = sum(shortest_distances(graph, u)[v] for u, v in zip(stops, stops[1:]))
+        if np.isfinite(cost):
+            # a floor step (1.0) takes 2 ticks; shoppers finish one tick after arriving
+            assert sim.finished_at[a] == 2 * cost + 1
+        else:
+            assert sim.stranded[a]
+    assert (sim.occupancy == 0).all()
+
+
+def test_shoppers_step_off_cells_that_become_obstacles():
+    mall = build_mall(1, rows=20, columns=20)
+    graph = mall.compile()
+    sim = CrowdSimulation(mall, seed=1)
+    add_random_shoppers(mall, sim, 120, seed=1)
+    # starts in sealed-off pockets cannot reach their stores from the outset
+    unreachable = sim.stranded.copy()
+    for _ in range(4):
+        sim.tick()
+
+    rng = random.Random(1)
+    evicted = 0
+    for _ in range(25):
+        occupied = np.flatnonzero((sim.occupancy > 0) & (graph.types == TYPE_CODES["generic"]))
+        cell = int(rng.choice(occupied.tolist()))
+        node = graph.nodes[cell]
+        on_cell = np.flatnonzero(sim.active & (sim.node == cell))
+        changed = mall.place_obstacle(node.f_number, node.row, node.column)
+        if changed is None:
+            continue
+        replanned = sim.apply_changes(changed)
+        evicted += len(on_cell)
+        assert set(on_cell.tolist()) <= set(replanned.tolist())
+        assert not (sim.active & (graph.types[sim.node] == TYPE_CODES["obstacle"])).any()
+        for _ in range(3):
+            sim.tick()
+    assert evicted > 0
+
+    sim.run()
+    assert (sim.stranded == unreachable).all()
+    assert (sim.finished_at[~unreachable] >= 0).all()
+
+
+def test_recompiled_mall_is_refused():
+    mall = build_mall(2)
+    sim = CrowdSimulation(mall)
+    add_random_shoppers(mall, sim, 5, seed=2)
+    mall.graph = None
+    with pytest.raises(RuntimeError):
+        sim.apply_changes([])
+    with pytest.raises(RuntimeError):
+        add_random_shoppers(mall, sim, 5, seed=3)
@@ -0,0 +1,138 @@
+import random
+import pytest
+from algorithms.dijkstra import shortest_distances
+from algorithms.dstarlite import DStarLitePlanner
+from mallcomponents.compiled import CompiledMall, TYPE_CODES
+from tests.helpers import build_mall, path_cost
+
+
+def cuts_off(graph, node_id, source, target):
+    """Whether blocking node_id would leave target unreachable from source."""
+    trial = CompiledMall(graph.num_floors, graph.rows, graph.columns, graph.offsets,
+                         graph.targets, graph.weights.copy(), graph.directions, graph.types.copy())
+    trial.block_node(node_id)
+    return shortest_distances(trial, source, until=[target])[target] == float('inf')
+
+
+def block_cells_on(mall, path, count, keep=None):
+    """
+    Places obstacles on up to count generic cells of path; returns all
+    changed edges. With keep=(source, target) ids, cells whose loss would
+    cut target off from source are skipped.
+    """
+    graph = mall.compile()
+    changed = []
+    for node in path[1:-1]:
+        if count == 0:
+            break
+        if node.node_type != "generic":
+            continue
+        if keep is not None and cuts_off(graph, graph.id_of(node), *keep):
+            continue
+        edges = mall.place_obstacle(node.f_number, node.row, node.column)
+        if edges is not None:
+            changed.extend(edges)
+            count -= 1
+    return changed
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_session_replans_after_obstacles(seed):
+    mall = build_mall(seed)
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    goal = mall.get_all_stores()[seed % 3]
+    planner = DStarLitePlanner()
+    path, _ = planner.plan(mall, start, goal)
+
+    for _ in range(3):
+        planner.update_edges(block_cells_on(mall, path, 2))
+        path, _ = planner.replan()
+        expected = shortest_distances(graph, graph.id_of(goal), reverse=True)[graph.id_of(start)]
+        assert path_cost(graph, path) == pytest.approx(expected)
+        assert all(node.node_type != "obstacle" for node in path)
+
+
+def test_session_follows_a_walking_agent():
+    mall = build_mall(5)
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    goal = mall.get_all_stores()[0]
+    planner = DStarLitePlanner()
+    path, _ = planner.plan(mall, start, goal)
+    rng = random.Random(5)
+
+    position = start
+    while graph.id_of(position) != graph.id_of(goal):
+        position = path[1]
+        planner.move_start(position)
+        if rng.random() < 0.3:
+            keep = (graph.id_of(position), graph.id_of(goal))
+            planner.update_edges(block_cells_on(mall, path[1:], 1, keep=keep))
+        path, _ = planner.replan()
+        to_goal = shortest_distances(graph, graph.id_of(goal), reverse=True)
+        assert graph.id_of(path[0]) == graph.id_of(position)
+        assert path_cost(graph, path) == pytest.approx(to_goal[graph.id_of(position)])
+
+
+def test_set_edge_weight_changes_are_repaired():
+    mall = build_mall(7)
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    goal = mall.get_all_stores()[1]
+    planner = DStarLitePlanner()
+    path, _ = planner.plan(mall, start, goal)
+
+    # make the current path dearer, then one of its edges cheaper again
+    for a, b in zip(path[:4], path[1:5]):
+        planner.update_edges(mall.set_edge_weight(a, b, 9.0))
+    path, _ = planner.replan()
+    a, b = path[0], path[1]
+    planner.update_edges(mall.set_edge_weight(a, b, 0.5))
+    path, _ = planner.replan()
+    expected = shortest_distances(graph, graph.id_of(goal), reverse=True)[graph.id_of(start)]
+    assert path_cost(graph, path) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("reuse_tree", [False, True])
+def test_lowered_weights_drop_stale_landmarks(reuse_tree):
+    for seed in (2, 9):
+        mall = build_mall(seed)
+        graph = mall.compile()
+        rng = random.Random(seed)
+        generic = [v for v in range(graph.num_nodes) if graph.types[v] == TYPE_CODES["generic"]]
+        slow = []
+        for _ in range(40):
+            node = graph.nodes[rng.choice(generic)]
+            for link in node.get_neighbors():
+                if link.weight != float('inf') and link.node.node_type != "obstacle":
+                    mall.set_edge_weight(node, link.node, 5.0)
+                    slow.append((node, link.node))
+        mall.build_landmarks()
+        start = mall.floors[mall.agent_start_floor].start_node
+        goal = rng.choice(mall.get_all_stores())
+        planner = DStarLitePlanner(reuse_tree=reuse_tree)
+        planner.plan(mall, start, goal)
+
+        # the ALT bounds were built on the slow links and overestimate now
+        for a, b in slow:
+            planner.update_edges(mall.set_edge_weight(a, b, 1.0))
+        assert mall.landmarks is None
+
+        path, _ = planner.replan()
+        expected = shortest_distances(graph, graph.id_of(start))[graph.id_of(goal)]
+        assert graph.id_of(path[0]) == graph.id_of(start)
+        assert path_cost(graph, path) == pytest.approx(expected)
+
+
+def test_full_tree_gives_cost_to_goal_everywhere():
+    mall = build_mall(8)
+    graph = mall.compile()
+    goal = mall.get_all_stores()[0]
+    start = mall.floors[mall.agent_start_floor].start_node
+    planner = DStarLitePlanner(full_tree=True)
+    planner.plan(mall, start, goal)
+    to_goal = shortest_distances(graph, graph.id_of(goal), reverse=True)
+    for v in range(graph.num_nodes):
+        if graph.types[v] != TYPE_CODES["obstacle"]:
+            assert planner.cost_to_goal(graph.nodes[v]) == pytest.approx(to_goal[v])
@@ -0,0 +1,92 @@
+import random
+import numpy as np
+import pytest
+from algorithms.dijkstra import shortest_distances
+from mallcomponents.compiled import TYPE_CODES
+from tests.helpers import build_mall, open_cells
+
+
+def check_field(graph, field):
+    expected = np.array(shortest_distances(graph, field.target, reverse=True))
+    assert np.allclose(field.distance, expected)
+    offsets, targets, weights, _, _ = graph.adjacency()
+    for v in np.flatnonzero(np.isfinite(expected) & (np.arange(graph.num_nodes) != field.target)).tolist():
+        hop = field.next_step(v)
+        edge = [weights[e] for e in range(offsets[v], offsets[v + 1]) if targets[e] == hop]
+        assert edge and min(edge) + expected[hop] == pytest.approx(expected[v])
+
+
+def test_flow_field_paths(mall):
+    graph = mall.compile()
+    store = mall.get_all_stores()[0]
+    field = mall.flow_field(store)
+    check_field(graph, field)
+    sources = open_cells(graph)[::7]
+    for source, path in zip(sources, field.paths(sources)):
+        if np.isfinite(field.distance[source]):
+            assert path[0] == source and path[-1] == field.target
+        else:
+            assert path == []
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_cached_fields_stay_exact_through_edits(seed):
+    mall = build_mall(seed)
+    graph = mall.compile()
+    stores = mall.get_all_stores()
+    cache = mall.flow_field_cache()
+    for store in stores:
+        mall.flow_field(store)
+
+    rng = random.Random(seed)
+    generic = [v for v in open_cells(graph) if graph.types[v] == TYPE_CODES["generic"]]
+    edits = 0
+    for v in rng.sample(generic, 30):
+        node = graph.nodes[v]
+        if mall.place_obstacle(node.f_number, node.row, node.column) is not None:
+            edits += 1
+        if rng.random() < 0.3:
+            elevator = next(n for n in mall.floors[0].elevators)
+            link = elevator.get_neighbors()[0]
+            mall.set_edge_weight(elevator, link.node, link.weight + 1.0)
+        for target, field in cache.fields.items():
+            check_field(graph, field)
+    assert edits > 0
+    # fields the edits dropped are rebuilt on the next request
+    for store in stores:
+        check_field(graph, mall.flow_field(store))
+    assert cache.dropped + len(cache) >= len(stores)
+
+
+def test_repair_keeps_fields_that_only_lose_a_leaf():
+    mall = build_mall(4)
+    graph = mall.compile()
+    store = mall.get_all_stores()[0]
+    field = mall.flow_field(store)
+    target = graph.id_of(store)
+    # a generic dead end of the field: nothing routes through it
+    leaves = [v for v in open_cells(graph)
+              if graph.types[v] == TYPE_CODES["generic"] and v != target
+              and np.isfinite(field.distance[v]) and not np.any(field.next_hop == v)]
+    cache = mall.flow_field_cache()
+    placed = None
+    for v in leaves:
+        node = graph.nodes[v]
+        if mall.place_obstacle(node.f_number, node.row, node.column) is not None:
+            placed = v
+            break
+    assert placed is not None
+    assert target in cache and cache.dropped == 0
+    assert cache.get(target).distance[placed] == float('inf')
+    check_field(graph, cache.get(target))
+
+
+def test_cache_respects_memory_budget():
+    mall = build_mall(5)
+    stores = mall.get_all_stores()
+    one = mall.flow_field(stores[0]).nbytes
+    cache = mall.flow_field_cache(max_bytes=3 * one)
+    for store in stores:
+        mall.flow_field(store)
+    assert len(cache) == 3 and cache.nbytes <= 3 * one
+    assert cache.evictions == len(stores) - 3
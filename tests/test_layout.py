@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from algorithms.dijkstra import shortest_distances
+from mallcomponents.compiled import CompiledMall
+from mallcomponents.layout import LayoutGenerator, MallLayout, OBSTACLE
+
+
+def generate(seed, **settings):
+    params = dict(num_floors=3, rows=24, columns=24, stores_per_floor=8,
+                  obstacle_density=0.3, num_elevators=3, num_stairs=3)
+    params.update(settings)
+    return LayoutGenerator(**params).generate(seed)
+
+
+def assert_connected(layout):
+    graph = layout.compile()
+    distance = np.array(shortest_distances(graph, layout.id_of(layout.agent_start_floor, *layout.start)))
+    for f, floor_stores in enumerate(layout.stores):
+        for r, c in floor_stores:
+            assert np.isfinite(distance[layout.id_of(f, r, c)])
+    for cell in layout.elevator_cells.tolist():
+        r, c = divmod(cell, layout.columns)
+        assert all(np.isfinite(distance[layout.id_of(f, r, c)]) for f in range(layout.num_floors))
+
+
+@pytest.mark.parametrize("density", [0.0, 0.2, 0.5])
+def test_generated_malls_are_connected(density):
+    for seed in range(5):
+        layout = generate(seed, obstacle_density=density)
+        assert_connected(layout)
+        assert layout.obstacle_counts == (layout.types == OBSTACLE).sum(axis=(1, 2)).tolist()
+        assert layout.obstacle_density() <= density + 1e-9
+
+
+def test_zero_obstacles_means_none():
+    assert sum(generate(0, obstacle_density=0.0).obstacle_counts) == 0
+    assert sum(generate(0, obstacles_per_floor=0).obstacle_counts) == 0
+    assert sum(generate(0, obstacle_density=None).obstacle_counts) > 0
+
+
+def test_connect_falls_back_to_clearing_floors(monkeypatch):
+    connect = MallLayout.connect
+    monkeypatch.setattr(MallLayout, "connect", lambda self, rng=None, max_rounds=32: connect(self, rng, 0))
+    fallbacks = 0
+    for seed in range(10):
+        layout = generate(seed, obstacle_density=0.6)
+        assert_connected(layout)
+        fallbacks += layout.fallbacks
+    assert fallbacks > 0
+
+
+def test_compiled_layout_matches_its_mall():
+    layout = generate(3)
+    mall = layout.to_mall()
+    fresh = CompiledMall.from_mall(mall)
+    graph = layout.compile()
+    assert (fresh.offsets == graph.offsets).all()
+    assert (fresh.targets == graph.targets).all()
+    assert (fresh.weights == graph.weights).all()
+    assert (fresh.types == graph.types).all()
@@ -0,0 +1,172 @@
+import math
+import random
+import pytest
+from agents.astar_agent import AStarAgent
+from agents.dstarlite_agent import DStarLiteAgent
+from algorithms.astar import AStarPlanner
+from algorithms.bidirectional_astar import BidirectionalAStarPlanner
+from algorithms.dijkstra import shortest_distances
+from algorithms.dstarlite import DStarLitePlanner
+from algorithms.hpastar import HierarchicalPlanner
+from algorithms.jps import JumpPointPlanner
+from algorithms.mgastar import MultiGoalAStarPlanner
+from utils.bucket_queue import BucketQueue
+from utils.search_stats import SearchStats
+from tests.helpers import build_mall, path_cost, query_pairs
+
+PLANNERS = {
+    "astar": AStarPlanner,
+    "astar-buckets": lambda: AStarPlanner(queue="buckets"),
+    "astar-reuse": lambda: AStarPlanner(reuse_tree=True),
+    "bidirectional": BidirectionalAStarPlanner,
+    "bidirectional-alt": lambda: BidirectionalAStarPlanner(build_landmarks=True),
+    "jps": JumpPointPlanner,
+    "dstarlite": DStarLitePlanner,
+    "dstarlite-reuse": lambda: DStarLitePlanner(reuse_tree=True),
+}
+
+
+def check_path(graph, path, source, target, expected):
+    if not math.isfinite(expected):
+        assert path == []
+        return
+    assert graph.id_of(path[0]) == source
+    assert graph.id_of(path[-1]) == target
+    assert path_cost(graph, path) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("landmarks", [False, True])
+@pytest.mark.parametrize("name", PLANNERS)
+def test_single_goal_planners_are_optimal(mall, name, landmarks):
+    graph = mall.compile()
+    if landmarks:
+        mall.build_landmarks()
+    planner = PLANNERS[name]()
+    for source, target in query_pairs(graph, 15, seed=5):
+        expected = shortest_distances(graph, source)[target]
+        path, _ = planner.plan(mall, graph.nodes[source], graph.nodes[target], stats=SearchStats())
+        check_path(graph, path, source, target, expected)
+
+
+@pytest.mark.parametrize("name", ["astar-reuse", "dstarlite-reuse"])
+def test_reused_tree_answers_every_target_of_one_start(mall, name):
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    source = graph.id_of(start)
+    distance = shortest_distances(graph, source)
+    planner = PLANNERS[name]()
+    for store in [start] + mall.get_all_stores() + [start]:
+        path, _ = planner.plan(mall, start, store)
+        check_path(graph, path, source, graph.id_of(store), distance[graph.id_of(store)])
+
+
+def test_reused_tree_is_dropped_after_an_edit():
+    mall = build_mall(6)
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    stores = mall.get_all_stores()
+    planners = [AStarPlanner(reuse_tree=True), DStarLitePlanner(reuse_tree=True)]
+    for planner in planners:
+        planner.plan(mall, start, stores[0])
+
+    source = graph.id_of(start)
+    path, _ = AStarPlanner().plan(mall, start, stores[1])
+    for node in path[1:-1]:
+        if mall.place_obstacle(node.f_number, node.row, node.column) is not None:
+            break
+    distance = shortest_distances(graph, source)
+    for planner in planners:
+        for store in stores:
+            path, _ = planner.plan(mall, start, store)
+            check_path(graph, path, source, graph.id_of(store), distance[graph.id_of(store)])
+
+
+def test_bidirectional_planner_builds_its_own_landmarks():
+    mall = build_mall(3)
+    graph = mall.compile()
+    planner = BidirectionalAStarPlanner(build_landmarks=True)
+    source, target = query_pairs(graph, 2, seed=3)[1]
+    planner.plan(mall, graph.nodes[source], graph.nodes[target])
+    assert mall.landmarks is None
+    table = planner.landmarks
+    assert table is not None and table.graph is graph
+
+    path, _ = AStarPlanner().plan(mall, graph.nodes[source], graph.nodes[target])
+    for node in path[1:-1]:
+        if mall.place_obstacle(node.f_number, node.row, node.column):
+            break
+    path, _ = planner.plan(mall, graph.nodes[source], graph.nodes[target])
+    assert planner.landmarks is not table
+    check_path(graph, path, source, target, shortest_distances(graph, source)[target])
+
+    mall.build_landmarks()
+    planner.plan(mall, graph.nodes[source], graph.nodes[target])
+    assert planner.landmarks_for(mall, graph) is mall.landmarks
+
+
+def test_hierarchical_planner_is_optimal(mall):
+    graph = mall.compile()
+    planner = HierarchicalPlanner()
+    for source, target in query_pairs(graph, 15, seed=7):
+        expected = shortest_distances(graph, source)[target]
+        path, _ = planner.plan(mall, graph.nodes[source], graph.nodes[target])
+        check_path(graph, path, source, target, expected)
+
+
+@pytest.mark.parametrize("agent_class", [AStarAgent, DStarLiteAgent])
+def test_agents_run_with_the_hierarchical_planner(mall, agent_class):
+    start = mall.floors[mall.agent_start_floor].start_node
+    stores = mall.get_all_stores()
+    stats = SearchStats()
+    path, expanded, _, cost = agent_class(planner=HierarchicalPlanner()).run(mall, start, stores, stats=stats)
+    _, _, _, expected = agent_class().run(mall, start, stores)
+    assert path
+    assert cost == pytest.approx(expected)
+    assert stats.expansions == expanded > 0
+    assert stats.pushes >= stats.pops >= stats.expansions
+
+
+@pytest.mark.parametrize("landmarks", [False, True])
+@pytest.mark.parametrize("queue", ["heap", "buckets"])
+def test_multigoal_costs_match_dijkstra(mall, queue, landmarks):
+    graph = mall.compile()
+    if landmarks:
+        mall.build_landmarks()
+    start = mall.floors[mall.agent_start_floor].start_node
+    stores = mall.get_all_stores()
+    distance = shortest_distances(graph, graph.id_of(start))
+    results, _ = MultiGoalAStarPlanner(queue=queue).plan(mall, start, stores)
+    assert len(results) == len({graph.id_of(s) for s in stores})
+    for r in results:
+        goal = graph.id_of(r["goal"])
+        assert r["cost"] == pytest.approx(distance[goal])
+        check_path(graph, r["path"], graph.id_of(start), goal, distance[goal])
+    assert [r["cost"] for r in results] == sorted(r["cost"] for r in results)
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_bucket_dijkstra_matches_heap(mall, reverse):
+    graph = mall.compile()
+    for source, target in query_pairs(graph, 5, seed=9):
+        heap = shortest_distances(graph, source, reverse=reverse)
+        assert shortest_distances(graph, source, reverse=reverse, queue="buckets") == heap
+        until = shortest_distances(graph, source, reverse=reverse, queue="buckets", until=[target])
+        assert until[target] == heap[target]
+
+
+def test_bucket_queue_pops_in_key_order():
+    rng = random.Random(11)
+    queue = BucketQueue()
+    keys = []
+    last = 0
+    for _ in range(500):
+        if queue and rng.random() < 0.4:
+            key, _ = queue.pop()
+            keys.append(key)
+            last = key
+        else:
+            queue.push((last + rng.randint(0, 6), object()))
+    while queue:
+        keys.append(queue.pop()[0])
+    assert keys == sorted(keys)
+    assert len(queue) == 0
@@ -0,0 +1,62 @@
+import csv
+import pytest
+import run_simulations as sweep
+
+CONFIG = {"num_floors": 2, "rows": 10, "columns": 10, "stores_per_floor": 3,
+          "obstacle_density": 0.1, "num_elevators": 1, "num_stairs": 1}
+
+
+def write_rows(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=sweep.RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_resume_keys_include_the_generator(tmp_path):
+    path = tmp_path / "results.csv"
+    rows = sweep.run_sweep([CONFIG], [0, 1], workers=1, algorithms=["A*"])
+    write_rows(path, rows)
+    done = sweep.read_done(str(path))
+    assert len(done) == 2
+
+    # the same configs with the other generator still have everything left to run
+    todo = list(sweep.iter_sweep([CONFIG], [0, 1], workers=1, done=done, algorithms=["A*"],
+                                 generator="arrays"))
+    assert sum(len(results) for _, results in todo) == 2
+    assert list(sweep.iter_sweep([CONFIG], [0, 1], workers=1, done=done, algorithms=["A*"])) == []
+
+
+def test_route_rows_report_their_setup_work():
+    manhattan = sweep.run_sweep([CONFIG], [0], workers=1, algorithms=["A*"])
+    route = sweep.run_sweep([CONFIG], [0], workers=1, algorithms=["A*"], ordering="route")
+    assert manhattan[0]["setup_expanded"] == 0
+    assert route[0]["algorithm"] == "A* (route)"
+    assert route[0]["setup_expanded"] > 0
+
+
+def tried_stores(order):
+    """order up to and including the store with the goal item."""
+    return order[:[s.has_goal_item for s in order].index(True) + 1]
+
+
+def test_path_columns_mean_the_same_for_both_orderings():
+    for seed in range(3):
+        mall = sweep.make_mall(seed, **CONFIG)
+        start = mall.floors[mall.agent_start_floor].start_node
+        table = mall.distance_table()
+
+        def start_to_store_cost(stores):
+            return sum(d for d in (table.distance(start, s) for s in stores) if d != float('inf'))
+
+        ordering = sweep.StoreOrdering()
+        route = sweep.run_agent(mall, sweep.AStarAgent(ordering=ordering))
+        tried = tried_stores(ordering.route)
+        assert route["path_cost"] == pytest.approx(start_to_store_cost(tried))
+        assert route["walk_cost"] >= table.distance(start, tried[-1])
+
+        manhattan = sweep.run_agent(mall, sweep.AStarAgent())
+        tried = tried_stores(sorted(mall.get_all_stores(), key=lambda s: abs(start.row - s.row)
+                                    + abs(start.column - s.column)))
+        assert manhattan["path_cost"] == pytest.approx(start_to_store_cost(tried))
+        assert manhattan["walk_cost"] is None
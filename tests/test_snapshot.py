@@ -0,0 +1,50 @@
+import os
+import numpy as np
+from algorithms.dijkstra import shortest_distances
+from mallcomponents.mall import Mall
+from mallcomponents.snapshot import ARRAYS, POINTER, current_version, snapshot_exists
+from tests.helpers import build_mall
+
+
+def same_graph(a, b):
+    return all(np.array_equal(getattr(a, name), getattr(b, name)) for name in ARRAYS)
+
+
+def test_round_trip(tmp_path):
+    mall = build_mall(0)
+    path = str(tmp_path / "mall")
+    assert not snapshot_exists(path)
+    mall.save(path)
+    assert snapshot_exists(path)
+
+    loaded = Mall.load(path)
+    graph, copy = mall.compile(), loaded.compile()
+    assert same_graph(graph, copy)
+    start = mall.floors[mall.agent_start_floor].start_node
+    loaded_start = loaded.floors[loaded.agent_start_floor].start_node
+    assert copy.id_of(loaded_start) == graph.id_of(start)
+    assert [s.name for s in loaded.get_all_stores()] == [s.name for s in mall.get_all_stores()]
+    assert [s.has_goal_item for s in loaded.get_all_stores()] == [s.has_goal_item for s in mall.get_all_stores()]
+    assert shortest_distances(copy, copy.id_of(loaded_start)) == shortest_distances(graph, graph.id_of(start))
+
+
+def test_overwrite_publishes_one_complete_version(tmp_path):
+    path = str(tmp_path / "mall")
+    first, second = build_mall(1), build_mall(2)
+    first.save(path)
+    old = current_version(path)
+    second.save(path)
+    new = current_version(path)
+    assert new != old
+    assert sorted(os.listdir(path)) == sorted([POINTER, new])
+    assert same_graph(Mall.load(path).compile(), second.compile())
+
+
+def test_loaded_mall_edits_stay_private(tmp_path):
+    path = str(tmp_path / "mall")
+    build_mall(3).save(path)
+    a, b = Mall.load(path), Mall.load(path)
+    node = next(n for floor in a.floors for row in floor.grid[2:-2] for n in row[2:-2]
+                if n.node_type == "generic" and a.place_obstacle(n.f_number, n.row, n.column) is not None)
+    assert a.compile().types[a.compile().id_of(node)] != b.compile().types[b.compile().id_of(node)]
+    assert same_graph(Mall.load(path).compile(), b.compile())
@@ -0,0 +1,81 @@
+import itertools
+import numpy as np
+import pytest
+from algorithms.dijkstra import shortest_distances
+from algorithms.store_order import StoreOrdering, held_karp, nearest_neighbor, route_length, two_opt
+from utils.search_stats import SearchStats
+
+
+def random_distances(n, seed):
+    rng = np.random.default_rng(seed)
+    distance = rng.integers(1, 50, size=(n, n)).astype(float)   # asymmetric
+    np.fill_diagonal(distance, 0.0)
+    return distance
+
+
+def brute_force(distance):
+    return min(route_length(distance, list(p)) for p in itertools.permutations(range(1, len(distance))))
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_held_karp_is_optimal(seed):
+    distance = random_distances(2 + seed % 6, seed)
+    route = held_karp(distance)
+    assert sorted(route) == list(range(1, len(distance)))
+    assert route_length(distance, route) == pytest.approx(brute_force(distance))
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_two_opt_never_lengthens_and_ends_in_a_local_optimum(seed):
+    distance = random_distances(12, seed)
+    start = nearest_neighbor(distance)
+    route = two_opt(distance, start)
+    assert sorted(route) == list(range(1, len(distance)))
+    length = route_length(distance, route)
+    assert length <= route_length(distance, start) + 1e-9
+    for i in range(len(route)):
+        for j in range(i + 1, len(route)):
+            reversed_segment = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+            assert route_length(distance, reversed_segment) >= length - 1e-9
+
+
+@pytest.mark.parametrize("exact_limit", [10, 0])
+def test_ordering_visits_every_store_on_exact_distances(mall, exact_limit):
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    stores = mall.get_all_stores()[:9]
+    ordering = StoreOrdering(exact_limit=exact_limit)
+    order = ordering.order(mall, start, stores + stores[:2])
+    assert sorted(graph.id_of(s) for s in order) == sorted(graph.id_of(s) for s in stores)
+
+    stops = [graph.id_of(start)] + [graph.id_of(s) for s in order]
+    walk = sum(shortest_distances(graph, a)[b] for a, b in zip(stops, stops[1:]))
+    matrix = mall.distance_table().matrix([start, *order])
+    assert walk == pytest.approx(route_length(matrix, list(range(1, len(stops)))))
+    if exact_limit:
+        assert walk == pytest.approx(route_length(matrix, held_karp(matrix)))
+
+    reached = {graph.id_of(start)} | {graph.id_of(s) for s in stores}
+    expected = 0
+    for v in reached:
+        stats = SearchStats()
+        shortest_distances(graph, v, until=reached, stats=stats)
+        expected += stats.expansions
+    assert ordering.setup_expanded == expected
+    assert expected <= sum(int(np.isfinite(shortest_distances(graph, v)).sum()) for v in reached)
+
+
+def test_partial_rows_answer_beyond_their_radius(mall):
+    graph = mall.compile()
+    start = mall.floors[mall.agent_start_floor].start_node
+    stores = mall.get_all_stores()[:3]
+    table = mall.distance_table()
+    table.matrix([start, *stores])
+    source = graph.id_of(start)
+    partial = table.settled[source]
+
+    exact = shortest_distances(graph, source)
+    for node in graph.nodes[::7]:
+        assert table.distance(start, node) == exact[graph.id_of(node)]
+    assert table.radius[source] == float('inf')
+    assert table.settled[source] >= partial
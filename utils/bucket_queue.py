@@ -0,0 +1,82 @@
+import numpy as np
+
+# open-set kinds the planners accept as queue=
+QUEUES = ("heap", "buckets")
+
+# largest power-of-two scale tried when turning edge weights into integers
+MAX_SCALE = 64
+
+
+def integer_scale(weights):
+    """
+    Smallest power of two s such that every finite weight times s is an
+    integer, or None if there is none up to MAX_SCALE. The mall's 1.0 /
+    1.5 / 2.5 links give s = 2. Scaling by a power of two is exact in
+    floating point, so distances divided by s come back unchanged.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    finite = weights[np.isfinite(weights)]
+    if finite.size and finite.min() < 0:
+        return None
+    scale = 1
+    while scale <= MAX_SCALE:
+        scaled = finite * scale
+        if np.array_equal(scaled, np.floor(scaled)):
+            return scale
+        scale *= 2
+    return None
+
+
+def check_queue(queue: str):
+    if queue not in QUEUES:
+        raise ValueError(f"Unknown queue {queue!r}; expected one of {QUEUES}")
+
+
+class BucketQueue:
+    """
+    Monotone bucket queue (Dial's algorithm) for small integer keys.
+
+    Entries are (key, item) pairs like in a heapq list; bucket k holds the
+    items queued with key k and a cursor walks the buckets upwards, so
+    push is O(1) and all pops of a search together cost O(entries + largest
+    key). Keys of searches with consistent heuristics never drop below
+    the last popped key; a smaller key still works but moves the cursor
+    back. Ties are popped last in, first out. An entry with an infinite
+    key (a heuristic that proved the goal unreachable from its item) is
+    dropped, since it could only be popped after every finite one.
+    """
+
+    def __init__(self, entries=()):
+        self.buckets = []
+        self.cursor = 0
+        self.size = 0
+        for entry in entries:
+            self.push(entry)
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def push(self, entry):
+        key, item = entry
+        if key == float('inf'):
+            return
+        buckets = self.buckets
+        if key >= len(buckets):
+            buckets.extend([] for _ in range(key + 1 - len(buckets)))
+        buckets[key].append(item)
+        if key < self.cursor:
+            self.cursor = key
+        self.size += 1
+
+    def pop(self):
+        """Removes and returns a (key, item) entry with the smallest key."""
+        buckets = self.buckets
+        cursor = self.cursor
+        while not buckets[cursor]:
+            cursor += 1
+        self.cursor = cursor
+        self.size -= 1
+        return cursor, buckets[cursor].pop()
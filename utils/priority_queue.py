@@ -0,0 +1,106 @@
+class IndexedPriorityQueue:
+    """
+    Binary min-heap of (key, item) entries that also tracks where each
+    item sits in the heap, so an item's key can be changed or the item
+    removed in O(log n) instead of rebuilding the queue.
+
+    Items must be hashable and comparable (ties on key fall back to the
+    item, exactly like a heapq list of (key, item) tuples).
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.position = {}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def clear(self):
+        self.heap.clear()
+        self.position.clear()
+
+    def top(self):
+        """Returns the (key, item) entry with the smallest key without removing it."""
+        return self.heap[0]
+
+    def top_key(self, default=None):
+        return self.heap[0][0] if self.heap else default
+
+    def push(self, item, key):
+        """Inserts item, or moves it to key if it is already queued."""
+        index = self.position.get(item)
+        if index is None:
+            self.heap.append((key, item))
+            self.position[item] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+            return
+
+        old_key = self.heap[index][0]
+        self.heap[index] = (key, item)
+        if key < old_key:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def pop(self):
+        """Removes and returns the (key, item) entry with the smallest key."""
+        entry = self.heap[0]
+        self._remove_at(0)
+        return entry
+
+    def remove(self, item):
+        """Removes item if it is queued; returns whether it was."""
+        index = self.position.get(item)
+        if index is None:
+            return False
+        self._remove_at(index)
+        return True
+
+    def _remove_at(self, index):
+        heap = self.heap
+        del self.position[heap[index][1]]
+        last = heap.pop()
+        if index < len(heap):
+            heap[index] = last
+            self.position[last[1]] = index
+            if index > 0 and last < heap[(index - 1) >> 1]:
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+
+    def _sift_up(self, index):
+        heap, position = self.heap, self.position
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not entry < heap[parent]:
+                break
+            heap[index] = heap[parent]
+            position[heap[index][1]] = index
+            index = parent
+        heap[index] = entry
+        position[entry[1]] = index
+
+    def _sift_down(self, index):
+        heap, position = self.heap, self.position
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry:
+                break
+            heap[index] = heap[child]
+            position[heap[index][1]] = index
+            index = child
+        heap[index] = entry
+        position[entry[1]] = index
@@ -0,0 +1,57 @@
+import sys
+
+# bytes per slot of a list's pointer array
+POINTER_BYTES = 8
+EMPTY_LIST_BYTES = sys.getsizeof([])
+
+
+class SearchStats:
+    """
+    Search counters with the same meaning for every planner, filled in by
+    plan(..., stats=stats). One object can be passed to several searches
+    (an agent trying store after store); counts add up and peaks keep the
+    maximum.
+
+      pushes       entries put on the open set (including re-keyed ones)
+      pops         entries taken off the open set
+      stale_pops   pops of an outdated entry: a node that was already
+                   expanded (lazy-deletion heaps) or whose key had changed
+                   and was re-queued (D* Lite)
+      expansions   pops that did process a node, pops - stale_pops
+      relaxations  updates of a node's tentative distance: edges that
+                   lowered g (A*), rhs recomputations (D* Lite)
+      peak_open    largest open-set size
+      peak_memory  largest size in bytes of one search's dictionaries and
+                   sets (their hash tables, not the keys and values) plus
+                   the open set's pointer array at its peak
+
+    Planners derive most counts from the state a search leaves behind and
+    only watch the open-set size when stats are given, so stats=None
+    costs nothing.
+    """
+    FIELDS = ("pushes", "pops", "stale_pops", "expansions",
+              "relaxations", "peak_open", "peak_memory")
+    __slots__ = FIELDS
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def record(self, pushes, pops, stale_pops, relaxations, peak_open, tables=()):
+        """Adds the counts of one search; tables are its dicts and sets."""
+        self.pushes += pushes
+        self.pops += pops
+        self.stale_pops += stale_pops
+        self.expansions += pops - stale_pops
+        self.relaxations += relaxations
+        self.peak_open = max(self.peak_open, peak_open)
+        memory = EMPTY_LIST_BYTES + POINTER_BYTES * peak_open
+        memory += sum(sys.getsizeof(table) for table in tables)
+        self.peak_memory = max(self.peak_memory, memory)
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        counts = ", ".join(f"{field}={getattr(self, field)}" for field in self.FIELDS)
+        return f"SearchStats({counts})"